@@ -0,0 +1,97 @@
+"""
+Latency of AuthApi.validate_user with a session per call vs the pooled worker session.
+
+Starts a local stub of the auth service and runs:
+    python -m benchmarks.auth_session --requests 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from contextlib import AsyncExitStack
+from typing import Dict, List, Optional
+
+from aiohttp import ClientSession, web
+
+from src.external_api.auth import AuthApi
+from src.project_utilities.async_session import create_pooled_session
+
+STUB_HOST = '127.0.0.1'
+STUB_PORT = 8765
+STUB_USER = {
+    'id': '2f384bd0-97a7-45e1-9f9f-da79affa8048',
+    'first_name': 'test',
+    'last_name': 'test',
+    'email': 'test@example.com',
+    'is_admin': False,
+}
+
+
+async def stub_user_handler(request: web.Request) -> web.Response:
+    return web.json_response(STUB_USER)
+
+
+async def start_stub_server() -> web.AppRunner:
+    stub_app = web.Application()
+    stub_app.router.add_get('/api/v1/users/me', stub_user_handler)
+    runner = web.AppRunner(stub_app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, STUB_HOST, STUB_PORT).start()
+    return runner
+
+
+def percentile(samples: List[float], rank: float) -> float:
+    ordered = sorted(samples)
+    last_index = len(ordered) - 1
+    return ordered[min(last_index, round(rank / 100 * last_index))]
+
+
+async def timed_call(
+    auth_api: AuthApi,
+    headers: Dict[str, str],
+    semaphore: asyncio.Semaphore,
+    latencies: List[float],
+) -> None:
+    async with semaphore:
+        started = time.perf_counter()
+        await auth_api.validate_user(headers=headers)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def measure(session: Optional[ClientSession], requests: int, concurrency: int) -> List[float]:
+    auth_api = AuthApi(base_url='http://{host}:{port}/api/v1/users/me'.format(host=STUB_HOST, port=STUB_PORT))
+    auth_api.session = session
+    headers = {'Authorization': 'Bearer benchmark'}
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    calls = [timed_call(auth_api, headers, semaphore, latencies) for _ in range(requests)]
+    await asyncio.gather(*calls)
+    return latencies
+
+
+def report(label: str, latencies: List[float]) -> None:
+    print('{label:<10} p50={p50:7.3f}ms p99={p99:7.3f}ms mean={mean:7.3f}ms'.format(
+        label=label,
+        p50=percentile(latencies, 50),
+        p99=percentile(latencies, 99),
+        mean=statistics.mean(latencies),
+    ))
+
+
+async def main(requests: int, concurrency: int) -> None:
+    async with AsyncExitStack() as cleanup:
+        runner = await start_stub_server()
+        cleanup.push_async_callback(runner.cleanup)
+        report('per-call', await measure(None, requests, concurrency))
+        pooled_session = await cleanup.enter_async_context(create_pooled_session())
+        report('pooled', await measure(pooled_session, requests, concurrency))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    arguments = parser.parse_args()
+    logging.disable(logging.INFO)
+    asyncio.run(main(arguments.requests, arguments.concurrency))
@@ -0,0 +1,60 @@
+"""
+Bytes per cached movie and encode/decode cost of every cache codec.
+
+    python -m benchmarks.cache_codecs --actors 300 --rounds 2000
+"""
+import argparse
+import time
+
+import orjson
+
+from src.auxiliary_services.cache_codec import CODECS_BY_NAME, VersionedCodec
+
+
+def build_movie(people: int) -> dict:
+    return {
+        'id': '3d825f60-9fff-4dfe-b294-1a45fa1e115d',
+        'title': 'Star Wars: Episode IV - A New Hope',
+        'description': 'The Imperial Forces, under orders from cruel Darth Vader, hold Princess Leia hostage. ' * 3,
+        'imdb_rating': 8.6,
+        'actors': [
+            {'id': 'actor-{index:06d}'.format(index=index), 'full_name': 'Actor Name {index}'.format(index=index)}
+            for index in range(people)
+        ],
+        'writers': [
+            {'id': 'writer-{index:06d}'.format(index=index), 'full_name': 'Writer Name {index}'.format(index=index)}
+            for index in range(people // 10)
+        ],
+        'directors': [{'full_name': 'George Lucas'}],
+        'genres': [{'name': 'Action'}, {'name': 'Adventure'}, {'name': 'Fantasy'}],
+    }
+
+
+def main(people: int, rounds: int) -> None:
+    movie = build_movie(people)
+    print('legacy orjson: {size} bytes'.format(size=len(orjson.dumps(movie))))
+    for name, codec in CODECS_BY_NAME.items():
+        versioned = VersionedCodec(codec)
+        payload = versioned.encode(movie)
+
+        started = time.perf_counter()
+        for _ in range(rounds):
+            versioned.encode(movie)
+        encode_us = (time.perf_counter() - started) / rounds * 1e6
+
+        started = time.perf_counter()
+        for _ in range(rounds):
+            versioned.decode(payload)
+        decode_us = (time.perf_counter() - started) / rounds * 1e6
+
+        print('{name:<13} {size:>7} bytes  encode={encode:8.1f}us  decode={decode:8.1f}us'.format(
+            name=name, size=len(payload), encode=encode_us, decode=decode_us,
+        ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--actors', type=int, default=300)
+    parser.add_argument('--rounds', type=int, default=2000)
+    arguments = parser.parse_args()
+    main(arguments.actors, arguments.rounds)
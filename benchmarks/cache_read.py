@@ -0,0 +1,88 @@
+"""
+Page read latency of CacheService.get_many: GET pipeline + one EXPIRE per hit vs one read-and-touch script call.
+
+Needs a running Redis (REDIS_HOST/REDIS_PORT from settings):
+    python -m benchmarks.cache_read --rounds 200
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from contextlib import AsyncExitStack
+from functools import partial
+from typing import Awaitable, Callable, Dict, List
+
+import orjson
+from redis.asyncio import Redis
+
+from src.auxiliary_services.cache_service import CacheService, CacheServiceOptions
+from src.core.settings import settings
+
+PAGE_SIZES = (10, 50, 500)
+TTL = 60 * 60
+ACTORS = [
+    {'id': str(index), 'full_name': 'Actor {index}'.format(index=index)}
+    for index in range(10)
+]
+MOVIE_STUB = {
+    'title': 'Benchmark',
+    'description': 'x' * 200,
+    'imdb_rating': 7.5,
+    'actors': ACTORS,
+    'writers': [],
+    'directors': [],
+    'genres': [{'name': 'Drama'}],
+}
+
+PageRead = Callable[[List[str]], Awaitable[object]]
+
+
+async def get_many_with_expire(redis_client: Redis, keys: List[str]) -> Dict[str, dict]:
+    """The previous read path: pipelined GETs, then an EXPIRE round trip per hit."""
+    async with redis_client.pipeline() as pipe:
+        for key in keys:
+            await pipe.get(key)
+        to_extract = await pipe.execute()
+    found = {}
+    for found_key, extractable in zip(keys, to_extract):
+        if extractable:
+            await redis_client.expire(found_key, TTL)
+            found[found_key] = orjson.loads(extractable)
+    return found
+
+
+async def measure(read_page: PageRead, keys: List[str], rounds: int) -> List[float]:
+    latencies = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        await read_page(keys)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+async def main(rounds: int) -> None:
+    redis_client = Redis(host=settings.redis_host, port=settings.redis_port)
+    cache_service = CacheService(redis_client=redis_client, options=CacheServiceOptions(ttl=TTL))
+    keys = ['benchmark:movie:{index}'.format(index=index) for index in range(max(PAGE_SIZES))]
+    async with AsyncExitStack() as cleanup:
+        cleanup.push_async_callback(redis_client.aclose)
+        cleanup.push_async_callback(redis_client.delete, *keys)
+        await cache_service.store_many({key: dict(MOVIE_STUB, id=key) for key in keys})
+        for page_size in PAGE_SIZES:
+            page_keys = keys[:page_size]
+            legacy = await measure(partial(get_many_with_expire, redis_client), page_keys, rounds)
+            touch = await measure(cache_service.get_many, page_keys, rounds)
+            print('page={size:<4} get+expire median={legacy:8.3f}ms  touch median={touch:8.3f}ms'.format(
+                size=page_size,
+                legacy=statistics.median(legacy),
+                touch=statistics.median(touch),
+            ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rounds', type=int, default=200)
+    arguments = parser.parse_args()
+    logging.disable(logging.INFO)
+    asyncio.run(main(arguments.rounds))
@@ -0,0 +1,88 @@
+"""
+CPU cost of building a /collection page from cached movies: pydantic path vs spliced JSON.
+
+The pydantic path mirrors what the endpoints used to do: deserialize_movie_json for every
+cached movie, MovieSummaryResponse objects, then FastAPI validating and serializing the list.
+
+    python -m benchmarks.collection_response --page-size 50 --rounds 500
+"""
+import argparse
+import time
+from typing import Callable, Dict, List, Optional
+
+import orjson
+from pydantic import TypeAdapter
+
+from src.auxiliary_services.movie_search import build_movie_response, build_movie_response_json
+from src.external_api.movie import deserialize_movie_json
+from src.models.movie import MovieSummaryAggregation, MovieSummaryResponse, WatchProgress
+
+response_adapter = TypeAdapter(Optional[List[MovieSummaryResponse]])
+
+
+def crew(role: str, count: int) -> List[dict]:
+    return [
+        {'id': str(person), 'full_name': '{role} {person}'.format(role=role, person=person)}
+        for person in range(count)
+    ]
+
+
+def build_page(page_size: int) -> tuple:
+    cached_movies = {
+        'movie-{index}'.format(index=index): {
+            'id': 'movie-{index}'.format(index=index),
+            'title': 'Movie {index}'.format(index=index),
+            'description': 'Plot of the movie ' * 10,
+            'imdb_rating': 7.1,
+            'actors': crew('Actor', 30),
+            'writers': crew('Writer', 5),
+            'directors': [{'full_name': 'Director'}],
+            'genres': [{'name': 'Drama'}, {'name': 'Comedy'}],
+        }
+        for index in range(page_size)
+    }
+    summaries = [
+        MovieSummaryAggregation(
+            movie_id=movie_id, likes_count=10, user_liked=True, watch_progress=WatchProgress(progress=0.5),
+        )
+        for movie_id in cached_movies
+    ]
+    return summaries, cached_movies
+
+
+def pydantic_page(summaries: List[MovieSummaryAggregation], cached_movies: Dict[str, dict]) -> bytes:
+    movies = {movie_id: deserialize_movie_json(movie) for movie_id, movie in cached_movies.items()}
+    response = build_movie_response(movie_details=summaries, cached_movies=movies)
+    return response_adapter.dump_json(response_adapter.validate_python(response))
+
+
+def spliced_page(summaries: List[MovieSummaryAggregation], cached_movies: Dict[str, dict]) -> bytes:
+    return build_movie_response_json(movie_details=summaries, cached_movies=cached_movies)
+
+
+def time_per_page(render: Callable, summaries: list, cached_movies: dict, rounds: int) -> float:
+    started = time.process_time()
+    for _ in range(rounds):
+        render(summaries, cached_movies)
+    return (time.process_time() - started) / rounds * 1e6
+
+
+def main(page_size: int, rounds: int) -> None:
+    summaries, cached_movies = build_page(page_size)
+    pydantic_body = orjson.loads(pydantic_page(summaries, cached_movies))
+    if pydantic_body != orjson.loads(spliced_page(summaries, cached_movies)):
+        raise RuntimeError('Spliced page differs from the pydantic one')
+
+    before = time_per_page(pydantic_page, summaries, cached_movies, rounds)
+    after = time_per_page(spliced_page, summaries, cached_movies, rounds)
+    print('page={size} pydantic={before:9.1f}us cpu  spliced={after:9.1f}us cpu  x{ratio:.1f}'.format(
+        size=page_size, before=before, after=after, ratio=before / after,
+    ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=500)
+    arguments = parser.parse_args()
+    main(arguments.page_size, arguments.rounds)
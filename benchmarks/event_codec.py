@@ -0,0 +1,94 @@
+"""
+Bytes per event and encode/decode cost of the Kafka event envelope against the former json.dumps values.
+
+Batch sizes are the lz4 frame of --batch-size consecutive values, close to what the producer
+compresses per partition batch with compression_type='lz4'.
+
+    python -m benchmarks.event_codec --rounds 20000 --batch-size 500
+"""
+import argparse
+import json
+import time
+from functools import partial
+from typing import Any, Callable, Dict, List, Tuple
+
+from lz4 import frame as lz4_frame  # type: ignore
+
+from src.auxiliary_services.event_codec import EventCodec, SchemaRegistry
+
+UGC_TOPIC = 'ugc'
+PROGRESS_TOPIC = 'view_progress'
+USERS_COUNT = 97
+
+Transform = Callable[[Any], Any]
+# Encode and decode functions of a value format.
+Format = Tuple[Transform, Transform]
+
+
+def build_events(batch_size: int) -> Dict[str, List[dict]]:
+    return {
+        UGC_TOPIC: [
+            {
+                'user_id': '5f3c1a0e-2b7d-4c2e-9a51-{index:012d}'.format(index=index % USERS_COUNT),
+                'target_id': '3d825f60-9fff-4dfe-b294-{index:012d}'.format(index=index),
+                'is_adding': index % 3 != 0,
+            }
+            for index in range(batch_size)
+        ],
+        PROGRESS_TOPIC: [
+            {
+                'movie': {'id': '3d825f60-9fff-4dfe-b294-{index:012d}'.format(index=index), 'break_point': index * 7},
+                'user': {
+                    'id': '5f3c1a0e-2b7d-4c2e-9a51-{index:012d}'.format(index=index % USERS_COUNT),
+                    'first_name': 'Leia',
+                    'last_name': 'Organa',
+                    'email': 'leia-{index}@alderaan.example'.format(index=index % USERS_COUNT),
+                    'phone': '',
+                    'is_admin': False,
+                },
+            }
+            for index in range(batch_size)
+        ],
+    }
+
+
+def json_encode(event: dict) -> bytes:
+    return json.dumps(event).encode('utf-8')
+
+
+def per_event_us(operation: Transform, inputs: List[Any], rounds: int) -> float:
+    started = time.perf_counter()
+    for round_index in range(rounds):
+        operation(inputs[round_index % len(inputs)])
+    return (time.perf_counter() - started) / rounds * 1e6
+
+
+def main(rounds: int, batch_size: int) -> None:
+    codec = EventCodec(SchemaRegistry.from_directory(), {UGC_TOPIC: 'ugc_event', PROGRESS_TOPIC: 'watch_progress'})
+    for topic, events in build_events(batch_size).items():
+        formats: Dict[str, Format] = {
+            'json.dumps': (json_encode, json.loads),
+            'envelope': (partial(codec.encode, topic), codec.decode),
+        }
+        for format_name, (encode, decode) in formats.items():
+            payloads = [encode(event) for event in events]
+            compressed = lz4_frame.compress(b''.join(payloads))
+            line = '{topic:<14} {name:<10} {size:6.1f} bytes/event  lz4 batch {batch:6.1f} bytes/event'.format(
+                topic=topic,
+                name=format_name,
+                size=sum(map(len, payloads)) / len(payloads),
+                batch=len(compressed) / len(payloads),
+            )
+            print('{line}  encode={encode:6.2f}us  decode={decode:6.2f}us'.format(
+                line=line,
+                encode=per_event_us(encode, events, rounds),
+                decode=per_event_us(decode, payloads, rounds),
+            ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    arguments = parser.parse_args()
+    main(arguments.rounds, arguments.batch_size)
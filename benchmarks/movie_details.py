@@ -0,0 +1,134 @@
+"""
+Latency of the movie detail view: the former $lookup pipeline vs concurrent point lookups.
+
+Seeds synthetic movies with 10, 10k and 1M likes into a scratch database, then times
+MovieDetailedAggregator against the pipeline it replaced. The former pipeline joined every
+like of the movie to every other like, so it is only run up to --legacy-max-likes.
+
+Needs a running MongoDB (MONGO_HOST/MONGO_PORT from settings):
+    python -m benchmarks.movie_details --rounds 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from contextlib import AsyncExitStack
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List
+
+from motor.core import AgnosticClient, AgnosticDatabase
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from src.auxiliary_services.data_aggregation import MovieDetailedAggregator
+from src.core.settings import settings
+from src.db_models.bookmark import BookmarkModel
+from src.db_models.indexes import ensure_indexes
+from src.db_models.like import LikeModel
+from src.db_models.movie_stats import MovieStatsModel
+from src.db_models.watch_progress import WatchProgressModel
+from src.project_utilities.rebuild_movie_stats import rebuild_movie_stats
+
+LIKE_COUNTS = (10, 10000, 1000000)
+INSERT_BATCH_SIZE = 10000
+USER_ID = 'benchmark-user'
+
+
+def legacy_pipeline(user_id: str, movie_id: str) -> List[Dict[str, Any]]:
+    """MovieDetailedAggregator before it was split into point lookups."""
+    return [
+        {'$match': {'target_id': movie_id}},
+        {'$lookup': {'from': 'likes', 'localField': 'target_id', 'foreignField': 'target_id', 'as': 'likes_info'}},
+        {
+            '$lookup': {
+                'from': 'bookmarks', 'localField': 'target_id', 'foreignField': 'movie_id', 'as': 'bookmarks_info',
+            },
+        },
+        {
+            '$project': {
+                'likes_count': {'$size': '$likes_info'},
+                'user_liked': {'$in': [user_id, '$likes_info.user_id']},
+                'bookmarks_count': {'$size': '$bookmarks_info'},
+                'user_bookmarked': {'$in': [user_id, '$bookmarks_info.user_id']},
+            },
+        },
+        {'$limit': 1},
+    ]
+
+
+async def run_legacy_pipeline(database: AgnosticDatabase, movie_id: str) -> List[dict]:
+    pipeline = legacy_pipeline(user_id=USER_ID, movie_id=movie_id)
+    return await database['likes'].aggregate(pipeline).to_list(length=1)
+
+
+async def seed_movie(database: AgnosticDatabase, movie_id: str, likes_count: int) -> None:
+    for batch_start in range(0, likes_count, INSERT_BATCH_SIZE):
+        batch_end = min(batch_start + INSERT_BATCH_SIZE, likes_count)
+        await database['likes'].insert_many(
+            [
+                {'user_id': 'user-{index}'.format(index=index), 'target_id': movie_id, 'target_type': 'movie'}
+                for index in range(batch_start, batch_end)
+            ],
+            ordered=False,
+        )
+    await database['likes'].insert_one({'user_id': USER_ID, 'target_id': movie_id, 'target_type': 'movie'})
+    await database['bookmarks'].insert_one({'user_id': USER_ID, 'movie_id': movie_id})
+    await database['watch_progress'].insert_one({'user_id': USER_ID, 'movie_id': movie_id, 'progress': 0.5})
+
+
+async def measure(read_details: Callable[[], Awaitable[Any]], rounds: int) -> List[float]:
+    latencies = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        await read_details()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def describe(latencies: List[float]) -> str:
+    return 'p50={p50:9.2f}ms max={worst:9.2f}ms'.format(p50=statistics.median(latencies), worst=max(latencies))
+
+
+async def seed_movies(database: AgnosticDatabase) -> None:
+    await ensure_indexes(database)
+    for likes_count in LIKE_COUNTS:
+        await seed_movie(database, 'movie-{count}'.format(count=likes_count), likes_count)
+    await rebuild_movie_stats(database)
+
+
+async def time_movie(database: AgnosticDatabase, likes_count: int, rounds: int, legacy_max_likes: int) -> str:
+    aggregator = MovieDetailedAggregator(
+        movie_stats_model=MovieStatsModel(database),
+        like_model=LikeModel(database),
+        bookmark_model=BookmarkModel(database),
+        progress_source=WatchProgressModel(database),
+    )
+    movie_id = 'movie-{count}'.format(count=likes_count)
+    details = await aggregator.aggregate(user_id=USER_ID, movie_id=movie_id)
+    if details.likes_count != likes_count + 1 or not details.user_liked:
+        raise RuntimeError('Unexpected details of {movie}: {details}'.format(movie=movie_id, details=details))
+    point_lookups = await measure(partial(aggregator.aggregate, user_id=USER_ID, movie_id=movie_id), rounds)
+    line = 'likes={count:>9} point lookups {point}'.format(count=likes_count, point=describe(point_lookups))
+    if likes_count <= legacy_max_likes:
+        legacy = await measure(partial(run_legacy_pipeline, database, movie_id), rounds)
+        line += '  former pipeline {legacy}'.format(legacy=describe(legacy))
+    return line
+
+
+async def main(rounds: int, legacy_max_likes: int) -> None:
+    client: AgnosticClient = AsyncIOMotorClient(settings.mongo_database_url)
+    database = client['benchmark_movie_details']
+    await client.drop_database(database.name)
+    async with AsyncExitStack() as cleanup:
+        cleanup.callback(client.close)
+        cleanup.push_async_callback(client.drop_database, database.name)
+        await seed_movies(database)
+        for likes_count in LIKE_COUNTS:
+            print(await time_movie(database, likes_count, rounds, legacy_max_likes))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--legacy-max-likes', type=int, default=10000)
+    arguments = parser.parse_args()
+    asyncio.run(main(arguments.rounds, arguments.legacy_max_likes))
@@ -0,0 +1,136 @@
+"""
+Consumer throughput of the UGC topic by partition count and event key.
+
+For every partition count, publishes --events like events into a fresh scratch topic, then
+drains it with one consumer per partition in a single consumer group. Every consumer handles
+its records one at a time and spends --processing-time seconds on each, like a consumer that
+writes every event somewhere. Events keyed by user spread over all partitions and the group
+drains them in parallel; events with the former constant key all land in one partition, so
+only one consumer of the group ever gets work however many partitions the topic has.
+
+Needs a running Kafka (KAFKA_HOST/KAFKA_PORT from settings):
+    python -m benchmarks.partition_scaling --events 5000 --partitions 1 4 12
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+from contextlib import AsyncExitStack, ExitStack, closing
+from typing import Callable, Dict, List, NamedTuple
+from uuid import uuid4
+
+from aiokafka import AIOKafkaConsumer, AIOKafkaProducer  # type: ignore
+from kafka.admin import KafkaAdminClient  # type: ignore
+
+from src.auxiliary_services.event_codec import EventCodec, SchemaRegistry
+from src.core.settings import settings
+from src.project_utilities.kafka_admin import ensure_topic_exists
+from src.project_utilities.kafka_headers import event_headers
+
+USERS_COUNT = 1000
+CONSTANT_KEY = 'like'
+
+
+class DrainProgress(NamedTuple):
+    """Records consumed by partition, and when the group got its first one."""
+
+    per_partition: Counter
+    timings: Dict[str, float]
+
+
+def user_key(index: int) -> str:
+    return 'user-{index}'.format(index=index % USERS_COUNT)
+
+
+def constant_key(index: int) -> str:
+    return CONSTANT_KEY
+
+
+async def publish_events(topic: str, events_count: int, make_key: Callable[[int], str]) -> None:
+    codec = EventCodec(SchemaRegistry.from_directory(), {topic: 'ugc_event'})
+    producer = AIOKafkaProducer(**{**settings.kafka_config, 'acks': 1})
+    await producer.start()
+    async with AsyncExitStack() as cleanup:
+        cleanup.push_async_callback(producer.stop)
+        headers = event_headers('like')
+        for index in range(events_count):
+            target_id = 'movie-{index}'.format(index=index)
+            message = {'user_id': user_key(index), 'target_id': target_id, 'is_adding': True}
+            event_key = make_key(index)
+            event_value = codec.encode(topic, message)
+            await producer.send(topic=topic, key=event_key, value=event_value, headers=headers)
+        await producer.flush()
+
+
+async def consume(
+    topic: str,
+    group_id: str,
+    events_count: int,
+    processing_time: float,
+    progress: DrainProgress,
+) -> None:
+    consumer = AIOKafkaConsumer(
+        topic,
+        bootstrap_servers=settings.kafka_bootstrap_servers,
+        group_id=group_id,
+        auto_offset_reset='earliest',
+    )
+    await consumer.start()
+    async with AsyncExitStack() as cleanup:
+        cleanup.push_async_callback(consumer.stop)
+        while sum(progress.per_partition.values()) < events_count:
+            batches = await consumer.getmany(timeout_ms=100)
+            for topic_partition, records in batches.items():
+                progress.timings.setdefault('first_record', time.perf_counter())
+                for _ in records:
+                    await asyncio.sleep(processing_time)
+                    progress.per_partition[topic_partition.partition] += 1
+
+
+async def drain(topic: str, consumers_count: int, events_count: int, processing_time: float) -> str:
+    progress = DrainProgress(per_partition=Counter(), timings={})
+    group_id = 'benchmark-{id}'.format(id=uuid4().hex)
+    await asyncio.gather(*[
+        consume(topic, group_id, events_count, processing_time, progress)
+        for _ in range(consumers_count)
+    ])
+    # Timed from the first record on, the group join and the first rebalance are not part of it.
+    per_partition = progress.per_partition
+    elapsed = time.perf_counter() - progress.timings['first_record']
+    busiest_share = max(per_partition.values()) / events_count
+    return '{rate:9.0f} events/s  busiest partition {share:6.1%}  partitions used {used}'.format(
+        rate=events_count / elapsed,
+        share=busiest_share,
+        used=len(per_partition),
+    )
+
+
+async def run(partition_counts: List[int], events_count: int, processing_time: float) -> None:
+    admin_client = KafkaAdminClient(bootstrap_servers=settings.kafka_bootstrap_servers)
+    with closing(admin_client):
+        for partitions_count in partition_counts:
+            for key_name, make_key in (('user', user_key), ('constant', constant_key)):
+                topic = 'benchmark-partitions-{id}'.format(id=uuid4().hex)
+                ensure_topic_exists(
+                    topic_name=topic,
+                    num_partitions=partitions_count,
+                    bootstrap_servers=settings.kafka_bootstrap_servers,
+                )
+                with ExitStack() as cleanup:
+                    cleanup.callback(admin_client.delete_topics, [topic])
+                    await publish_events(topic, events_count, make_key)
+                    line = await drain(topic, partitions_count, events_count, processing_time)
+                print('partitions={count:>3} key={key:<8} {line}'.format(
+                    count=partitions_count,
+                    key=key_name,
+                    line=line,
+                ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=5000)
+    parser.add_argument('--partitions', type=int, nargs='+', default=[1, 4, 12])
+    parser.add_argument('--processing-time', type=float, default=0.001)
+    arguments = parser.parse_args()
+    asyncio.run(run(arguments.partitions, arguments.events, arguments.processing_time))
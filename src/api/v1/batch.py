@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import JSONResponse
+
+from src.auxiliary_services.ugc_batch_handler import UgcBatchHandler
+from src.core.decorators import catch_broker_exceptions
+from src.dependencies.auth import get_user_from_request_state
+from src.endpoint_services.batch import get_ugc_batch_service
+from src.models.batch import BatchRequest, BatchResponse
+from src.models.user import User
+
+router = APIRouter()
+
+
+@router.post(
+    '/',
+    summary="Batch of user's likes, bookmarks and watching progress",
+    description='Applies lists of movie like, bookmark and progress operations in order and reports per-item results.',
+    response_model=BatchResponse,
+)
+@catch_broker_exceptions
+async def handle_ugc_batch(
+    batch: BatchRequest,
+    user: User = Depends(get_user_from_request_state),
+    batch_service: UgcBatchHandler = Depends(get_ugc_batch_service),
+) -> JSONResponse:
+    batch_result = await batch_service.apply(batch=batch, user=user)
+    return JSONResponse(status_code=status.HTTP_200_OK, content=batch_result.model_dump(mode='json'))
@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, status
-from fastapi.responses import JSONResponse
+from typing import Annotated, List, Optional
+
+from fastapi import APIRouter, Depends, Query, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from src.auxiliary_services.ugc_handler import LikeUgcHandler
-from src.core.decorators import catch_broker_exceptions
+from src.core.decorators import catch_broker_exceptions, catch_collection_exceptions
+from src.core.settings import settings
+from src.db_models.like import LikeDocument
 from src.dependencies.auth import get_user_from_request_state
 from src.endpoint_services.like import get_movie_like_ugc_service, get_review_like_ugc_service
 from src.models.user import User
+from src.project_utilities.ndjson import ndjson_response
+from src.project_utilities.pagination import MAX_PAGE_SIZE, decode_optional_cursor, documents_page_response
 
 router = APIRouter()
 
@@ -76,26 +82,66 @@ async def unlike_review(
 @router.get(
     '/movie/{movie_id}',
     summary='Users likes for movies',
-    description='Likes values for movie.',
+    description='Likes of the movie in pages, the X-Next-Cursor header points to the next page.',
+    response_model=List[LikeDocument],
 )
-@catch_broker_exceptions
+@catch_collection_exceptions
 async def get_movie_likes(
     movie_id: str,
+    page_size: Annotated[int, Query(description='Items on page', ge=1, le=MAX_PAGE_SIZE)] = 50,
+    cursor: Annotated[Optional[str], Query(description='X-Next-Cursor header of the previous page')] = None,
     like_ugc_handler: LikeUgcHandler = Depends(get_movie_like_ugc_service),
-) -> JSONResponse:
-    likes = await like_ugc_handler.find_ugc_content(target_id=movie_id)
-    return JSONResponse(status_code=status.HTTP_200_OK, content=likes)
+) -> Response:
+    likes, last_id = await like_ugc_handler.get_likes_page(
+        target_id=movie_id, page_limit=page_size, after=decode_optional_cursor(cursor),
+    )
+    return documents_page_response(likes, last_id)
+
+
+@router.get(
+    '/movie/{movie_id}/stream',
+    summary='Stream users likes for movies',
+    description='All likes of the movie as newline-delimited JSON.',
+)
+@catch_collection_exceptions
+async def stream_movie_likes(
+    movie_id: str,
+    like_ugc_handler: LikeUgcHandler = Depends(get_movie_like_ugc_service),
+) -> StreamingResponse:
+    return ndjson_response(
+        like_ugc_handler.stream_likes(target_id=movie_id, batch_size=settings.mongo_stream_batch_size),
+    )
 
 
 @router.get(
     '/review/{review_id}',
     summary='Users like for reviews',
-    description='Like values for a review.',
+    description='Likes of the review in pages, the X-Next-Cursor header points to the next page.',
+    response_model=List[LikeDocument],
 )
-@catch_broker_exceptions
+@catch_collection_exceptions
 async def get_review_likes(
     review_id: str,
+    page_size: Annotated[int, Query(description='Items on page', ge=1, le=MAX_PAGE_SIZE)] = 50,
+    cursor: Annotated[Optional[str], Query(description='X-Next-Cursor header of the previous page')] = None,
     like_ugc_handler: LikeUgcHandler = Depends(get_review_like_ugc_service),
-) -> JSONResponse:
-    likes = await like_ugc_handler.find_ugc_content(target_id=review_id)
-    return JSONResponse(status_code=status.HTTP_200_OK, content=likes)
+) -> Response:
+    likes, last_id = await like_ugc_handler.get_likes_page(
+        target_id=review_id, page_limit=page_size, after=decode_optional_cursor(cursor),
+    )
+    return documents_page_response(likes, last_id)
+
+
+@router.get(
+    '/review/{review_id}/stream',
+    summary='Stream users likes for reviews',
+    description='All likes of the review as newline-delimited JSON.',
+)
+@catch_collection_exceptions
+async def stream_review_likes(
+    review_id: str,
+    like_ugc_handler: LikeUgcHandler = Depends(get_review_like_ugc_service),
+) -> StreamingResponse:
+    return ndjson_response(
+        like_ugc_handler.stream_likes(target_id=review_id, batch_size=settings.mongo_stream_batch_size),
+    )
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+
+from src.core.metrics import metrics
+
+router = APIRouter()
+
+
+@router.get(
+    '/',
+    summary="Worker's cache, auth and publishing metrics",
+    description='Counters, gauges and timings collected by the worker that served the request.',
+)
+async def get_metrics() -> dict:
+    return metrics.snapshot()
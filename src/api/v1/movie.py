@@ -1,6 +1,6 @@
 from typing import Annotated, List, Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
 
 from src.auxiliary_services.movie_search import MovieSearch
 from src.core.decorators import catch_collection_exceptions
@@ -10,6 +10,7 @@ from src.endpoint_services.like import get_like_service
 from src.endpoint_services.watch_progress import get_watch_progress_service
 from src.models.movie import MovieDetailedResponse, MovieSummaryResponse
 from src.models.user import User
+from src.project_utilities.pagination import MAX_PAGE_SIZE, page_response
 
 router = APIRouter()
 
@@ -17,53 +18,70 @@ router = APIRouter()
 @router.get(
     '/bookmarks',
     summary="Get user's bookmarks",
+    response_model=Optional[List[MovieSummaryResponse]],
 )
 @catch_collection_exceptions
 async def get_user_bookmarked_movies(
-    page_size: Annotated[int, Query(description='Items on page', ge=1)] = 50,
-    page_number: Annotated[int, Query(description='Page number', ge=0)] = 0,
+    page_size: Annotated[int, Query(description='Items on page', ge=1, le=MAX_PAGE_SIZE)] = 50,
+    page_number: Annotated[int, Query(description='Page number, ignored when cursor is given', ge=0)] = 0,
+    cursor: Annotated[Optional[str], Query(description='X-Next-Cursor header of the previous page')] = None,
     user: User = Depends(get_user_from_request_state),
     search: MovieSearch = Depends(get_bookmark_service),
-) -> Optional[List[MovieSummaryResponse]]:
-    return await search.get_user_movies(user_id=user.id, page_number=page_number, page_limit=page_size)
+) -> Response:
+    page, next_cursor = await search.get_user_movies_json(
+        user_id=user.id, page_number=page_number, page_limit=page_size, cursor=cursor,
+    )
+    return page_response(page, next_cursor)
 
 
 @router.get(
     '/likes',
     summary='Get user liked movies',
+    response_model=Optional[List[MovieSummaryResponse]],
 )
 @catch_collection_exceptions
 async def get_user_liked_movies(
-    page_size: Annotated[int, Query(description='Items on page', ge=1)] = 50,
-    page_number: Annotated[int, Query(description='Page number', ge=0)] = 0,
+    page_size: Annotated[int, Query(description='Items on page', ge=1, le=MAX_PAGE_SIZE)] = 50,
+    page_number: Annotated[int, Query(description='Page number, ignored when cursor is given', ge=0)] = 0,
+    cursor: Annotated[Optional[str], Query(description='X-Next-Cursor header of the previous page')] = None,
     user: User = Depends(get_user_from_request_state),
     search: MovieSearch = Depends(get_like_service),
-) -> Optional[List[MovieSummaryResponse]]:
-    return await search.get_user_movies(user_id=user.id, page_number=page_number, page_limit=page_size)
+) -> Response:
+    page, next_cursor = await search.get_user_movies_json(
+        user_id=user.id, page_number=page_number, page_limit=page_size, cursor=cursor,
+    )
+    return page_response(page, next_cursor)
 
 
 @router.get(
     '/history',
     summary='Get user watched movies',
+    response_model=Optional[List[MovieSummaryResponse]],
 )
 @catch_collection_exceptions
 async def get_user_watched_movies(
-    page_size: Annotated[int, Query(description='Items on page', ge=1)] = 50,
-    page_number: Annotated[int, Query(description='Page number', ge=0)] = 0,
+    page_size: Annotated[int, Query(description='Items on page', ge=1, le=MAX_PAGE_SIZE)] = 50,
+    page_number: Annotated[int, Query(description='Page number, ignored when cursor is given', ge=0)] = 0,
+    cursor: Annotated[Optional[str], Query(description='X-Next-Cursor header of the previous page')] = None,
     user: User = Depends(get_user_from_request_state),
     search: MovieSearch = Depends(get_watch_progress_service),
-) -> Optional[List[MovieSummaryResponse]]:
-    return await search.get_user_movies(user_id=user.id, page_number=page_number, page_limit=page_size)
+) -> Response:
+    page, next_cursor = await search.get_user_movies_json(
+        user_id=user.id, page_number=page_number, page_limit=page_size, cursor=cursor,
+    )
+    return page_response(page, next_cursor)
 
 
 @router.get(
     '/movie/{movie_id}',
     summary="Get detailed info about movie. Included: general ugc, user's ugc",
+    response_model=MovieDetailedResponse,
 )
 @catch_collection_exceptions
 async def get_movie_info(
     movie_id: str,
     user: User = Depends(get_user_from_request_state),
     search: MovieSearch = Depends(get_watch_progress_service),
-) -> MovieDetailedResponse:
-    return await search.get_movie(user_id=user.id, movie_id=movie_id)
+) -> Response:
+    movie = await search.get_movie_json(user_id=user.id, movie_id=movie_id)
+    return Response(content=movie, media_type='application/json')
@@ -1,15 +1,18 @@
-from typing import List
+from typing import Annotated, List, Optional
 
-from fastapi import APIRouter, Depends, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, Query, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from src.auxiliary_services.ugc_handler import ReviewUgcHandler
 from src.core.decorators import catch_broker_exceptions, catch_collection_exceptions
+from src.core.settings import settings
 from src.db_models.review import ReviewDocument
 from src.dependencies.auth import get_user_from_request_state
 from src.endpoint_services.review import get_review_ugc_service
 from src.models.review import DeleteReview, ReviewContent
 from src.models.user import User
+from src.project_utilities.ndjson import ndjson_response
+from src.project_utilities.pagination import MAX_PAGE_SIZE, decode_optional_cursor, documents_page_response
 
 router = APIRouter()
 
@@ -64,10 +67,32 @@ async def update_review_to_movie(
 @router.get(
     '/{movie_id}',
     summary='Get reviews for a movie',
+    description='Reviews of the movie in pages, the X-Next-Cursor header points to the next page.',
+    response_model=List[ReviewDocument],
 )
 @catch_collection_exceptions
 async def get_reviews_for_movie(
     movie_id: str,
+    page_size: Annotated[int, Query(description='Items on page', ge=1, le=MAX_PAGE_SIZE)] = 50,
+    cursor: Annotated[Optional[str], Query(description='X-Next-Cursor header of the previous page')] = None,
     review_ugc_service: ReviewUgcHandler = Depends(get_review_ugc_service),
-) -> List[ReviewDocument]:
-    return await review_ugc_service.get_movie_reviews(movie_id=movie_id)
+) -> Response:
+    reviews, last_id = await review_ugc_service.get_reviews_page(
+        movie_id=movie_id, page_limit=page_size, after=decode_optional_cursor(cursor),
+    )
+    return documents_page_response(reviews, last_id)
+
+
+@router.get(
+    '/{movie_id}/stream',
+    summary='Stream reviews for a movie',
+    description='All reviews of the movie as newline-delimited JSON.',
+)
+@catch_collection_exceptions
+async def stream_reviews_for_movie(
+    movie_id: str,
+    review_ugc_service: ReviewUgcHandler = Depends(get_review_ugc_service),
+) -> StreamingResponse:
+    return ndjson_response(
+        review_ugc_service.stream_reviews(movie_id=movie_id, batch_size=settings.mongo_stream_batch_size),
+    )
@@ -1,14 +1,11 @@
 from typing import Optional
 
-from aiokafka import AIOKafkaProducer  # type: ignore
 from fastapi import APIRouter, Depends
 
 from src.core.decorators import catch_broker_exceptions
-from src.core.settings import settings
 from src.db_models.user import UserDocument, UserModel
 from src.dependencies.auth import get_user_from_request_state
-from src.dependencies.kafka import get_kafka_producer
-from src.endpoint_services.user import get_user_model
+from src.endpoint_services.user import UserUgcHandler, get_user_model, get_user_ugc_service
 from src.models.user import User, UserUpdate
 
 router = APIRouter()
@@ -22,19 +19,11 @@ router = APIRouter()
 async def update_user_information(
     update_info: UserUpdate,
     user: User = Depends(get_user_from_request_state),
-    collection: UserModel = Depends(get_user_model),
-    kafka_producer: AIOKafkaProducer = Depends(get_kafka_producer),
+    user_ugc_handler: UserUgcHandler = Depends(get_user_ugc_service),
 ) -> Optional[UserDocument]:
-    await collection.update_user(user_id=user.id, update_data=update_info)
-
-    message_to_kafka = {
-        'user_id': user.id,
-        'target_id': user.id,
-        'is_adding': True,
-        'additional': '',
-    }
-    await kafka_producer.send(topic=settings.ugc_topic, key='profile', value=message_to_kafka)
-    return await collection.get_user(user_id=user.id)
+    # The update and its event commit together, the document is read once they have.
+    await user_ugc_handler.update_user(user_id=user.id, update_info=update_info)
+    return await user_ugc_handler.get_user(user_id=user.id)
 
 
 @router.get(
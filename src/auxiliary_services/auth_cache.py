@@ -0,0 +1,117 @@
+import hashlib
+import logging
+from datetime import timedelta
+from http import HTTPStatus
+from typing import Dict, Optional, Union
+
+import orjson
+from fastapi import HTTPException
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.core.metrics import metrics
+from src.external_api.auth import AuthApi
+from src.models.user import User
+from src.project_utilities.ttl_lru import TtlLruCache
+
+logger = logging.getLogger(__name__)
+
+NEGATIVE_STATUSES = frozenset((HTTPStatus.UNAUTHORIZED, HTTPStatus.FORBIDDEN))
+
+CachedValidation = Union[User, int]
+
+
+def hash_authorization(authorization: Optional[str]) -> str:
+    return hashlib.sha256((authorization or '').encode()).hexdigest()
+
+
+class CachedAuthValidator:
+    """
+    Two-tier cache of AuthApi.validate_user results keyed by a hash of the Authorization header.
+
+    The first tier is a per-worker LRU, the second one is shared between workers through Redis;
+    accepted tokens are kept for the TTL of `local_cache` in both. Rejected tokens are remembered
+    as their status code for a shorter negative TTL.
+    """
+
+    key_prefix = 'auth:token:'
+
+    def __init__(
+        self,
+        auth_api: AuthApi,
+        redis_client: Optional[Redis],
+        local_cache: TtlLruCache[CachedValidation],
+        negative_ttl: float = 5,
+    ):
+        self.auth_api = auth_api
+        self.redis_client = redis_client
+        self.local_cache = local_cache
+        self.ttl = local_cache.ttl
+        self.negative_ttl = negative_ttl
+
+    async def validate_user(self, headers: Dict[str, str]) -> Optional[User]:
+        token_hash = hash_authorization(headers.get('Authorization'))
+
+        cached = self.local_cache.get(token_hash)
+        if cached is not None:
+            metrics.increment('auth_cache.local.hit')
+            return self._resolve(cached)
+        metrics.increment('auth_cache.local.miss')
+
+        cached = await self._get_shared(token_hash)
+        if cached is not None:
+            metrics.increment('auth_cache.shared.hit')
+            self.local_cache.set(token_hash, cached, ttl=self._ttl_for(cached))
+            return self._resolve(cached)
+        metrics.increment('auth_cache.shared.miss')
+
+        metrics.increment('auth_cache.remote_calls')
+        try:
+            user = await self.auth_api.validate_user(headers=headers)
+        except HTTPException as exc:
+            if exc.status_code in NEGATIVE_STATUSES:
+                await self._remember(token_hash, exc.status_code)
+            raise
+        if user is not None:
+            await self._remember(token_hash, user)
+        return user
+
+    def _ttl_for(self, cached: CachedValidation) -> float:
+        return self.negative_ttl if isinstance(cached, int) else self.ttl
+
+    def _resolve(self, cached: CachedValidation) -> User:
+        if isinstance(cached, int):
+            raise HTTPException(status_code=cached, detail='Authentication Failed')
+        return cached
+
+    async def _remember(self, token_hash: str, validation: CachedValidation) -> None:
+        ttl = self._ttl_for(validation)
+        self.local_cache.set(token_hash, validation, ttl=ttl)
+        if self.redis_client is None:
+            return
+        if isinstance(validation, int):
+            payload = orjson.dumps({'status': validation})
+        else:
+            payload = orjson.dumps({'user': validation.model_dump()})
+        try:
+            await self.redis_client.set(
+                self.key_prefix + token_hash, payload, ex=timedelta(seconds=ttl),
+            )
+        except RedisError:
+            logger.warning('Could not store token validation in redis', exc_info=True)
+
+    async def _get_shared(self, token_hash: str) -> Optional[CachedValidation]:
+        if self.redis_client is None:
+            return None
+        try:
+            payload = await self.redis_client.get(self.key_prefix + token_hash)
+        except RedisError:
+            logger.warning('Could not read token validation from redis', exc_info=True)
+            return None
+        if payload is None:
+            return None
+        stored = orjson.loads(payload)
+        rejected_status = stored.get('status')
+        if rejected_status is not None:
+            return int(rejected_status)
+        return User(**stored['user'])
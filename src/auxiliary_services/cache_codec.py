@@ -0,0 +1,112 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict
+
+import msgpack  # type: ignore
+import orjson
+import zstandard
+from lz4 import frame as lz4_frame  # type: ignore
+
+
+class CacheCodec(ABC):
+    """
+    Serialization format of cached values, identified by the version byte written in front of each entry.
+
+    Version 0 is reserved for CacheService tombstones.
+    """
+
+    name: str
+    version: int
+
+    @abstractmethod
+    def encode(self, to_encode: Any) -> bytes:
+        raise NotImplementedError
+
+    @abstractmethod
+    def decode(self, payload: bytes) -> Any:
+        raise NotImplementedError
+
+
+class OrjsonCodec(CacheCodec):
+    name = 'orjson'
+    version = 1
+
+    def encode(self, to_encode: Any) -> bytes:
+        return orjson.dumps(to_encode)
+
+    def decode(self, payload: bytes) -> Any:
+        return orjson.loads(payload)
+
+
+class MsgpackCodec(CacheCodec):
+    name = 'msgpack'
+    version = 2
+
+    def encode(self, to_encode: Any) -> bytes:
+        return msgpack.packb(to_encode, use_bin_type=True)
+
+    def decode(self, payload: bytes) -> Any:
+        return msgpack.unpackb(payload, raw=False)
+
+
+class ZstdMsgpackCodec(MsgpackCodec):
+    name = 'msgpack+zstd'
+    version = 3
+
+    def __init__(self, level: int = 3):
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def encode(self, to_encode: Any) -> bytes:
+        return self._compressor.compress(super().encode(to_encode))
+
+    def decode(self, payload: bytes) -> Any:
+        return super().decode(self._decompressor.decompress(payload))
+
+
+class Lz4MsgpackCodec(MsgpackCodec):
+    name = 'msgpack+lz4'
+    version = 4
+
+    def encode(self, to_encode: Any) -> bytes:
+        return lz4_frame.compress(super().encode(to_encode))
+
+    def decode(self, payload: bytes) -> Any:
+        return super().decode(lz4_frame.decompress(payload))
+
+
+CODECS: Dict[int, CacheCodec] = {
+    codec.version: codec
+    for codec in (OrjsonCodec(), MsgpackCodec(), ZstdMsgpackCodec(), Lz4MsgpackCodec())
+}
+CODECS_BY_NAME: Dict[str, CacheCodec] = {codec.name: codec for codec in CODECS.values()}
+
+
+class VersionedCodec:
+    """
+    Writes entries as a version byte followed by the payload of the configured codec.
+
+    Any known version can be read back, so the codec can be switched once every worker runs
+    this code. orjson entries are written without a version byte, as plain orjson text like
+    before versioning, so workers of the previous release still read them during a rollout.
+    """
+
+    def __init__(self, codec: CacheCodec):
+        self.codec = codec
+        self._version_prefix = b'' if isinstance(codec, OrjsonCodec) else bytes([codec.version])
+
+    def encode(self, to_encode: Any) -> bytes:
+        return self._version_prefix + self.codec.encode(to_encode)
+
+    def decode(self, payload: bytes) -> Any:
+        codec = CODECS.get(payload[0])
+        if codec is None:
+            return orjson.loads(payload)
+        return codec.decode(payload[1:])
+
+
+def get_codec(name: str = OrjsonCodec.name) -> VersionedCodec:
+    if name not in CODECS_BY_NAME:
+        raise ValueError('Unknown cache codec {name}, expected one of {names}'.format(
+            name=name, names=', '.join(CODECS_BY_NAME),
+        ))
+    return VersionedCodec(CODECS_BY_NAME[name])
@@ -1,48 +1,223 @@
-from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional
+from uuid import uuid4
 
 import orjson
 from redis.asyncio import Redis
+from redis.exceptions import RedisError
 
+from src.auxiliary_services.cache_codec import VersionedCodec, get_codec
+from src.core.metrics import metrics
+from src.core.settings import LOCAL_CACHE_MAX_BYTES, LOCAL_CACHE_MAX_ITEMS
 from src.project_utilities.backoff import backoff_public_methods
+from src.project_utilities.ttl_lru import TtlLruCache
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_RETRY_DELAY = 1
+
+# Version byte 0 is reserved by the codecs for tombstones: entries remembering that a key has no value.
+TOMBSTONE_PAYLOAD = bytes([0])
+
+# GETEX for every key, except that tombstones keep their own, shorter TTL.
+GET_AND_TOUCH = """
+local values = redis.call('mget', unpack(KEYS))
+for index, key in ipairs(KEYS) do
+    if values[index] and values[index] ~= ARGV[2] then
+        redis.call('expire', key, ARGV[1])
+    end
+end
+return values
+"""
+
+
+class Tombstone:
+    def __repr__(self) -> str:
+        return 'TOMBSTONE'
+
+
+TOMBSTONE = Tombstone()
+
+
+def count_redis_lookups(hits: int, lookups: int) -> None:
+    metrics.increment('cache.redis.hit', hits)
+    metrics.increment('cache.redis.miss', lookups - hits)
+
+
+class LocalCacheLayer:
+    """
+    Per-worker copy of the hottest serialized cache entries.
+
+    Workers announce every write on a Redis pub/sub channel, and each worker drops
+    the announced keys from its own layer, so the local copies stay coherent with Redis.
+    """
+
+    def __init__(
+        self,
+        max_items: int = LOCAL_CACHE_MAX_ITEMS,
+        max_bytes: int = LOCAL_CACHE_MAX_BYTES,
+        ttl: float = 60,
+        channel: str = 'cache:invalidate',
+    ):
+        self.entries: TtlLruCache[bytes] = TtlLruCache(max_items=max_items, ttl=ttl, max_bytes=max_bytes)
+        self.channel = channel
+        self.origin = uuid4().hex
+
+    async def publish_invalidation(self, redis_client: Redis, keys: List[str]) -> None:
+        message = orjson.dumps({'origin': self.origin, 'keys': keys})
+        try:
+            await redis_client.publish(self.channel, message)
+        except RedisError:
+            logger.warning('Could not publish cache invalidation', exc_info=True)
+
+    async def listen_invalidations(self, redis_client: Redis) -> None:
+        """Drop keys written by other workers. Runs until cancelled, resubscribing after connection errors."""
+        while True:
+            try:
+                await self._subscribe_invalidations(redis_client)
+            except RedisError:
+                logger.warning('Cache invalidation channel is lost, dropping local cache', exc_info=True)
+                self.entries.clear()
+                await asyncio.sleep(INVALIDATION_RETRY_DELAY)
+
+    async def _subscribe_invalidations(self, redis_client: Redis) -> None:
+        async with redis_client.pubsub() as pubsub:
+            await pubsub.subscribe(self.channel)
+            async for message in pubsub.listen():
+                self._apply_invalidation(message)
+
+    def _apply_invalidation(self, message: dict) -> None:
+        if message.get('type') != 'message':
+            return
+        invalidation = orjson.loads(message['data'])
+        if invalidation['origin'] == self.origin:
+            return
+        for key in invalidation['keys']:
+            self.entries.pop(key)
+        metrics.increment('cache.local.invalidations', len(invalidation['keys']))
+
+
+class CacheServiceOptions(NamedTuple):
+    ttl: int = 300
+    read_batch_size: int = 500
 
 
 @backoff_public_methods()
 class CacheService:
-    def __init__(self, redis_client: Redis, ttl: int = 300):
+    def __init__(
+        self,
+        redis_client: Redis,
+        options: CacheServiceOptions = CacheServiceOptions(),
+        local_layer: Optional[LocalCacheLayer] = None,
+        codec: Optional[VersionedCodec] = None,
+    ):
         self.redis_client = redis_client
-        self.ttl = ttl
+        self.ttl = options.ttl
+        self.local_layer = local_layer
+        self.read_batch_size = options.read_batch_size
+        self.codec = codec or get_codec()
+        self._get_and_touch_script = redis_client.register_script(GET_AND_TOUCH)
 
     async def store_single(self, key: str, to_store: Any, ttl: Optional[int] = None) -> None:
         expiration_shift = ttl or self.ttl
-        serialized_value = orjson.dumps(to_store)
+        serialized_value = self._encode(to_store)
         await self.redis_client.set(key, serialized_value, ex=expiration_shift)
+        await self._store_locally({key: serialized_value})
 
     async def store_many(self, to_store: Dict[str, Any], ttl: Optional[int] = None) -> None:
         expiration_shift = ttl or self.ttl
+        serialized_values = {}
         async with self.redis_client.pipeline() as pipe:
             for key, storable in to_store.items():
-                serialized_value = orjson.dumps(storable)
+                serialized_value = self._encode(storable)
+                serialized_values[key] = serialized_value
                 await pipe.set(key, serialized_value, ex=expiration_shift)
             await pipe.execute()
+        await self._store_locally(serialized_values)
+
+    async def store_tombstones(self, keys: List[str], ttl: int) -> None:
+        """Remember for `ttl` seconds that the keys have no value, reads will return TOMBSTONE for them."""
+        async with self.redis_client.pipeline() as pipe:
+            for key in keys:
+                await pipe.set(key, TOMBSTONE_PAYLOAD, ex=ttl)
+            await pipe.execute()
+        await self._store_locally(dict.fromkeys(keys, TOMBSTONE_PAYLOAD))
 
     async def get_single(self, key: str) -> Optional[Any]:
-        extractable = await self.redis_client.get(key)
+        local_value = self._get_locally(key)
+        if local_value is not None:
+            return self._decode(local_value)
+
+        extractable = (await self._get_and_touch([key]))[0]
+        count_redis_lookups(hits=int(extractable is not None), lookups=1)
         if extractable:
-            await self.redis_client.expire(key, self.ttl)
-            return orjson.loads(extractable)
+            self._fill_locally({key: extractable})
+            return self._decode(extractable)
         return None
 
     async def get_many(self, keys: List[str]) -> Dict[str, Any]:
-        async with self.redis_client.pipeline() as pipe:
-            for key_element in keys:
-                await pipe.get(key_element)
-            to_extract = await pipe.execute()
+        key_extractable_dictionary: Dict[str, Any] = {}
+        remote_keys = []
+        for key in keys:
+            local_value = self._get_locally(key)
+            if local_value is None:
+                remote_keys.append(key)
+            else:
+                key_extractable_dictionary[key] = self._decode(local_value)
+        if not remote_keys:
+            return key_extractable_dictionary
+
+        to_extract = await self._get_and_touch(remote_keys)
 
-        key_extractable_dictionary = {}
-        for key, extractable in zip(keys, to_extract):
+        found = {}
+        for remote_key, extractable in zip(remote_keys, to_extract):
             if extractable:
-                await self.redis_client.expire(key, self.ttl)
-                key_extractable_dictionary[key] = orjson.loads(extractable)
+                found[remote_key] = extractable
+                key_extractable_dictionary[remote_key] = self._decode(extractable)
             else:
-                key_extractable_dictionary[key] = None
+                key_extractable_dictionary[remote_key] = None
+        count_redis_lookups(hits=len(found), lookups=len(remote_keys))
+        self._fill_locally(found)
         return key_extractable_dictionary
+
+    def _decode(self, payload: bytes) -> Any:
+        if payload == TOMBSTONE_PAYLOAD:
+            return TOMBSTONE
+        return self.codec.decode(payload)
+
+    def _encode(self, to_store: Any) -> bytes:
+        serialized_value = self.codec.encode(to_store)
+        metrics.observe('cache.stored_bytes_per_key', len(serialized_value))
+        metrics.increment('cache.stored_bytes', len(serialized_value))
+        return serialized_value
+
+    async def _get_and_touch(self, keys: List[str]) -> List[Optional[bytes]]:
+        """Read values and slide the TTL of the found ones, one round trip per `read_batch_size` keys."""
+        extracted: List[Optional[bytes]] = []
+        for batch_start in range(0, len(keys), self.read_batch_size):
+            extracted.extend(await self._get_and_touch_script(
+                keys=keys[batch_start:batch_start + self.read_batch_size],
+                args=[self.ttl, TOMBSTONE_PAYLOAD],
+            ))
+        return extracted
+
+    def _get_locally(self, key: str) -> Optional[bytes]:
+        if self.local_layer is None:
+            return None
+        local_value = self.local_layer.entries.get(key)
+        metrics.increment('cache.local.hit' if local_value is not None else 'cache.local.miss')
+        return local_value
+
+    def _fill_locally(self, serialized_values: Dict[str, bytes]) -> None:
+        if self.local_layer is None:
+            return
+        for key, serialized_value in serialized_values.items():
+            self.local_layer.entries.set(key, serialized_value)
+        metrics.set_gauge('cache.local.bytes', self.local_layer.entries.current_bytes)
+
+    async def _store_locally(self, serialized_values: Dict[str, bytes]) -> None:
+        if self.local_layer is None:
+            return
+        self._fill_locally(serialized_values)
+        await self.local_layer.publish_invalidation(self.redis_client, list(serialized_values))
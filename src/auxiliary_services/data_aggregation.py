@@ -1,200 +1,312 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
+from bson import ObjectId
+from pymongo import ASCENDING
+
+from src.auxiliary_services.watch_progress_buffer import WatchProgressBuffer
+from src.db_models.bookmark import BookmarkModel
 from src.db_models.like import LikeModel, TargetType
 from src.db_models.mongo_base_model import MongoBaseModel
-from src.models.movie import MovieDetailedAggregation, MovieSummaryAggregation
+from src.db_models.movie_stats import MovieStatsModel
+from src.db_models.user_movie_state import UserMovieStateModel
+from src.db_models.watch_progress import WatchProgressModel
+from src.models.movie import MovieDetailedAggregation, MovieSummaryAggregation, WatchProgress
+from src.project_utilities.pagination import decode_cursor, encode_cursor
+
+MongoQuery = Dict[str, Any]
+PageDocuments = List[Dict[str, Any]]
+Progresses = Dict[str, float]
+
+# The buffer reads through to the model, so progress is read from it whenever it runs.
+ProgressSource = Union[WatchProgressModel, WatchProgressBuffer]
+
+
+def page_stages(
+    match: Dict[str, Any],
+    page_number: int,
+    page_limit: int,
+    after: Optional[ObjectId],
+) -> List[Dict[str, Any]]:
+    """
+    Select a page in _id order.
+
+    With a cursor the page starts right after `after` and is read straight off the
+    (user, _id) index, whatever its depth. `page_number` is only honoured without a cursor.
+    """
+    if after is not None:
+        match = {**match, '_id': {'$gt': after}}
+    stages: List[Dict[str, Any]] = [{'$match': match}, {'$sort': {'_id': ASCENDING}}]
+    if after is None and page_number:
+        stages.append({'$skip': page_number * page_limit})
+    if page_limit:
+        stages.append({'$limit': page_limit})
+    return stages
+
+
+class PageEnricher:
+    """
+    Second phase of a summary page: UGC of every movie on the page at once.
+
+    Like counters, the user's likes and the user's progress are each read with a single
+    indexed $in query, and the three queries run concurrently.
+    """
+
+    def __init__(
+        self,
+        movie_stats_model: MovieStatsModel,
+        like_model: LikeModel,
+        watch_progress_model: WatchProgressModel,
+        progress_buffer: Optional[WatchProgressBuffer] = None,
+    ):
+        self.movie_stats_model = movie_stats_model
+        self.like_model = like_model
+        self.watch_progress_model = watch_progress_model
+        self.progress_buffer = progress_buffer
+
+    def build_queries(self, user_id: str, movie_ids: List[str]) -> Dict[str, MongoQuery]:
+        """Filter of every enrichment query, keyed by the name of the queried collection."""
+        page_movies = {'$in': movie_ids}
+        return {
+            self.movie_stats_model.collection.name: {'_id': page_movies},
+            self.like_model.collection.name: {
+                'target_id': page_movies,
+                'target_type': TargetType.movie.value,
+                'user_id': user_id,
+            },
+            self.watch_progress_model.collection.name: {'user_id': user_id, 'movie_id': page_movies},
+        }
+
+    async def enrich(
+        self,
+        user_id: str,
+        movie_ids: List[str],
+        liked_ids: Optional[Set[str]] = None,
+        progresses: Optional[Progresses] = None,
+    ) -> Dict[str, MovieSummaryAggregation]:
+        """
+        Summaries of the movies keyed by movie id.
+
+        `liked_ids` and `progresses` already known from the page documents skip their query.
+        """
+        if not movie_ids:
+            return {}
+        queries = self.build_queries(user_id=user_id, movie_ids=movie_ids)
+        likes_counts, user_liked_ids, user_progresses = await asyncio.gather(
+            self._read_likes_counts(queries[self.movie_stats_model.collection.name]),
+            self._read_liked_ids(queries[self.like_model.collection.name], known=liked_ids),
+            self._read_progresses(queries[self.watch_progress_model.collection.name], known=progresses),
+        )
+        if self.progress_buffer is not None:
+            buffered_progresses = self.progress_buffer.get_buffered(user_id=user_id, movie_ids=movie_ids)
+            user_progresses = {**user_progresses, **buffered_progresses}
+        return {
+            movie_id: MovieSummaryAggregation(
+                movie_id=movie_id,
+                likes_count=likes_counts.get(movie_id, 0),
+                user_liked=movie_id in user_liked_ids,
+                watch_progress=WatchProgress(progress=user_progresses.get(movie_id, 0)),
+            )
+            for movie_id in movie_ids
+        }
+
+    async def _read_likes_counts(self, query: MongoQuery) -> Dict[str, int]:
+        cursor = self.movie_stats_model.collection.find(query, projection={'likes_count': 1})
+        likes_counts = {}
+        async for stats_doc in cursor:
+            likes_counts[stats_doc['_id']] = stats_doc.get('likes_count', 0)
+        return likes_counts
+
+    async def _read_liked_ids(self, query: MongoQuery, known: Optional[Set[str]]) -> Set[str]:
+        if known is not None:
+            return known
+        cursor = self.like_model.collection.find(query, projection={'_id': 0, 'target_id': 1})
+        return {doc['target_id'] async for doc in cursor}
+
+    async def _read_progresses(self, query: MongoQuery, known: Optional[Progresses]) -> Progresses:
+        if known is not None:
+            return known
+        projection = {'_id': 0, 'movie_id': 1, 'progress': 1}
+        cursor = self.watch_progress_model.collection.find(query, projection=projection)
+        progresses = {}
+        async for progress_doc in cursor:
+            progresses[progress_doc['movie_id']] = progress_doc['progress']
+        return progresses
 
 
 class AbstractSummaryAggregator(ABC):
-    def __init__(self, mongo_model: MongoBaseModel):
+    """
+    Page of movie summaries in two phases.
+
+    The first phase reads the page of movie ids off the user's (user, _id) index,
+    the second resolves their UGC with PageEnricher. With a `progress_buffer`, movies only
+    the buffer knows of yet end the last page: they get their _id, at the end of the order,
+    once flushed.
+    """
+
+    movie_id_field = 'movie_id'
+    page_fields: Tuple[str, ...] = ()
+
+    def __init__(
+        self,
+        mongo_model: MongoBaseModel,
+        enricher: PageEnricher,
+        progress_buffer: Optional[WatchProgressBuffer] = None,
+    ):
         self.mongo_model = mongo_model
+        self.enricher = enricher
+        self.progress_buffer = progress_buffer
 
     @abstractmethod
-    async def aggregate(self, user_id: str, page_number: int = 0, page_limit: int = 0) -> Any:
+    def build_match(self, user_id: str) -> Dict[str, Any]:
         raise NotImplementedError
 
+    def build_pipeline(
+        self,
+        user_id: str,
+        page_number: int = 0,
+        page_limit: int = 0,
+        after: Optional[ObjectId] = None,
+    ) -> List[Dict[str, Any]]:
+        projection = dict.fromkeys((self.movie_id_field, *self.page_fields), 1)
+        return [
+            *page_stages(self.build_match(user_id), page_number=page_number, page_limit=page_limit, after=after),
+            {'$project': projection},
+        ]
+
+    def known_liked_ids(self, documents: PageDocuments) -> Optional[Set[str]]:
+        """Movies of the page the user is known to like without a query, None when unknown."""
+        if 'liked' not in self.page_fields:
+            return None
+        return {doc[self.movie_id_field] for doc in documents if doc.get('liked')}
+
+    def known_progresses(self, documents: PageDocuments) -> Optional[Progresses]:
+        """Progress of the page's movies known without a query, None when unknown."""
+        if 'progress' not in self.page_fields:
+            return None
+        return {doc[self.movie_id_field]: doc.get('progress', 0) for doc in documents}
+
+    async def aggregate(
+        self,
+        user_id: str,
+        page_number: int = 0,
+        page_limit: int = 0,
+        cursor: Optional[str] = None,
+    ) -> List[MovieSummaryAggregation]:
+        """Page of summaries, each carrying the cursor of the page that follows it."""
+        after = decode_cursor(cursor) if cursor else None
+        pipeline = self.build_pipeline(user_id=user_id, page_number=page_number, page_limit=page_limit, after=after)
+        documents = await self.mongo_model.collection.aggregate(pipeline).to_list(length=None)
+        summaries = await self.enricher.enrich(
+            user_id=user_id,
+            movie_ids=[doc[self.movie_id_field] for doc in documents],
+            liked_ids=self.known_liked_ids(documents),
+            progresses=self.known_progresses(documents),
+        )
+        page = []
+        for doc in documents:
+            summary = summaries[doc[self.movie_id_field]]
+            next_cursor = encode_cursor(doc['_id'])
+            page.append(summary.model_copy(update={'cursor': next_cursor}))
+        if not page_limit or len(documents) < page_limit:
+            page.extend(await self._buffered_only(user_id))
+        return page
+
+    async def _buffered_only(self, user_id: str) -> List[MovieSummaryAggregation]:
+        """Summaries of the buffered movies the collection has no page document of yet."""
+        if self.progress_buffer is None:
+            return []
+        buffered_ids = list(self.progress_buffer.get_user_buffered(user_id))
+        if not buffered_ids:
+            return []
+        query = {**self.build_match(user_id), self.movie_id_field: {'$in': buffered_ids}}
+        projection = {'_id': 0, self.movie_id_field: 1}
+        stored = self.mongo_model.collection.find(query, projection=projection)
+        stored_ids = {doc[self.movie_id_field] async for doc in stored}
+        new_ids = [movie_id for movie_id in buffered_ids if movie_id not in stored_ids]
+        summaries = await self.enricher.enrich(user_id=user_id, movie_ids=new_ids)
+        return [summaries[movie_id] for movie_id in new_ids]
+
 
 class MovieDetailedAggregator:
-    def __init__(self, like_model: LikeModel):
+    """
+    UGC details of one movie from indexed point lookups issued concurrently.
+
+    The cost does not depend on how many likes or bookmarks the movie has:
+    counters come from movie_stats, the user's own relations from single-document reads.
+    """
+
+    def __init__(
+        self,
+        movie_stats_model: MovieStatsModel,
+        like_model: LikeModel,
+        bookmark_model: BookmarkModel,
+        progress_source: ProgressSource,
+    ):
+        self.movie_stats_model = movie_stats_model
         self.like_model = like_model
+        self.bookmark_model = bookmark_model
+        self.progress_source = progress_source
 
     async def aggregate(self, user_id: str, movie_id: str) -> MovieDetailedAggregation:
-
-        pipeline: List[Dict[str, Any]] = [
-            {'$match': {'target_id': movie_id}},
-            {
-                '$lookup': {
-                    'from': 'likes',
-                    'localField': 'target_id',
-                    'foreignField': 'target_id',
-                    'as': 'likes_info',
-                },
-            },
-            {
-                '$lookup': {
-                    'from': 'bookmarks',
-                    'localField': 'target_id',
-                    'foreignField': 'movie_id',
-                    'as': 'bookmarks_info',
-                },
-            },
-            {
-                '$lookup': {
-                    'from': 'watch_progress',
-                    'let': {'movie_id': '$target_id', 'user_id': user_id},
-                    'pipeline': [
-                        {'$match': {
-                            '$expr': {
-                                '$and': [
-                                    {'$eq': ['$movie_id', '$$movie_id']},
-                                    {'$eq': ['$user_id', '$$user_id']},
-                                ],
-                            },
-                        }},
-                        {'$limit': 1},
-                    ],
-                    'as': 'watch_progress',
-                },
-            },
-            {
-                '$project': {
-                    'movie_id': '$target_id',
-                    'likes_count': {'$size': '$likes_info'},
-                    'user_liked': {'$in': [user_id, '$likes_info.user_id']},
-                    'bookmarks_count': {'$size': '$bookmarks_info'},
-                    'user_bookmarked': {'$in': [user_id, '$bookmarks_info.user_id']},
-                    'watch_progress': {'$ifNull': [{'$arrayElemAt': ['$watch_progress.progress', 0]}, 0]},
-                },
-            },
-        ]
-        documents = await self.like_model.collection.aggregate(pipeline).to_list(length=1)
-        return MovieDetailedAggregation(**documents[0])
+        movie_stats, user_liked, user_bookmarked, watch_progress = await asyncio.gather(
+            self.movie_stats_model.get_stats(movie_id=movie_id),
+            self.like_model.has_like(user_id=user_id, target_id=movie_id, target_type=TargetType.movie),
+            self.bookmark_model.has_bookmark(user_id=user_id, movie_id=movie_id),
+            self.progress_source.get_progress(user_id=user_id, movie_id=movie_id),
+        )
+        return MovieDetailedAggregation(
+            movie_id=movie_id,
+            likes_count=movie_stats.likes_count,
+            user_liked=user_liked,
+            bookmarks_count=movie_stats.bookmarks_count,
+            user_bookmarked=user_bookmarked,
+            watch_progress=WatchProgress(progress=watch_progress.progress if watch_progress else 0),
+        )
 
 
 class BookmarkSummaryAggregator(AbstractSummaryAggregator):
-    async def aggregate(self, user_id: str, page_number: int = 0, page_limit: int = 0) -> List[MovieSummaryAggregation]:
-        skip_amount = page_number * page_limit
-
-        pipeline: List[Dict[str, Any]] = [
-            {'$match': {'user_id': user_id}},
-            {'$skip': skip_amount},
-            {'$limit': page_limit},
-            {
-                '$lookup': {
-                    'from': 'likes',
-                    'localField': 'movie_id',
-                    'foreignField': 'target_id',
-                    'as': 'likes_info',
-                },
-            },
-            {
-                '$lookup': {
-                    'from': 'watch_progress',
-                    'let': {'movie_id': '$movie_id', 'user_id': '$user_id'},
-                    'pipeline': [
-                        {'$match': {
-                            '$expr': {
-                                '$and': [
-                                    {'$eq': ['$movie_id', '$$movie_id']},
-                                    {'$eq': ['$user_id', '$$user_id']},
-                                ],
-                            },
-                        },
-                        },
-                        {'$limit': 1},
-                    ],
-                    'as': 'watch_progress',
-                },
-            },
-            {
-                '$project': {
-                    'movie_id': 1,
-                    'likes_count': {'$size': '$likes_info'},
-                    'user_liked': {'$in': [user_id, '$likes_info.user_id']},
-                    'watch_progress': {'$ifNull': [{'$arrayElemAt': ['$watch_progress.progress', 0]}, 0]},
-                },
-            },
-        ]
-
-        documents = await self.mongo_model.collection.aggregate(pipeline).to_list(length=None)
-        return [MovieSummaryAggregation(**doc) for doc in documents]
+    def build_match(self, user_id: str) -> Dict[str, Any]:
+        return {'user_id': user_id}
 
 
 class LikesSummaryAggregator(AbstractSummaryAggregator):
-    async def aggregate(self, user_id: str, page_number: int = 0, page_limit: int = 0) -> List[MovieSummaryAggregation]:
-        skip_amount = page_number * page_limit
-
-        pipeline: List[Dict[str, Any]] = [
-            {'$match': {'user_id': user_id, 'target_type': TargetType.movie.value}},
-            {'$skip': skip_amount},
-            {'$limit': page_limit},
-            {
-                '$lookup': {
-                    'from': 'likes',
-                    'localField': 'target_id',
-                    'foreignField': 'target_id',
-                    'as': 'likes_info',
-                },
-            },
-            {
-                '$lookup': {
-                    'from': 'watch_progress',
-                    'let': {'movie_id': '$movie_id', 'user_id': '$user_id'},
-                    'pipeline': [
-                        {'$match': {
-                            '$expr': {
-                                '$and': [
-                                    {'$eq': ['$movie_id', '$$movie_id']},
-                                    {'$eq': ['$user_id', '$$user_id']},
-                                ],
-                            },
-                        },
-                        },
-                        {'$limit': 1},
-                    ],
-                    'as': 'watch_progress',
-                },
-            },
-            {
-                '$project': {
-                    'movie_id': '$target_id',
-                    'likes_count': {'$size': '$likes_info'},
-                    'user_liked': True,
-                    'watch_progress': {'$ifNull': [{'$arrayElemAt': ['$watch_progress.progress', 0]}, 0]},
-                },
-            },
-        ]
+    movie_id_field = 'target_id'
 
-        documents = await self.mongo_model.collection.aggregate(pipeline).to_list(length=None)
-        return [MovieSummaryAggregation(**doc) for doc in documents]
+    def build_match(self, user_id: str) -> Dict[str, Any]:
+        return {'user_id': user_id, 'target_type': TargetType.movie.value}
+
+    def known_liked_ids(self, documents: PageDocuments) -> Optional[Set[str]]:
+        return {doc['target_id'] for doc in documents}
 
 
 class WatchProgressSummaryAggregator(AbstractSummaryAggregator):
-    async def aggregate(self, user_id: str, page_number: int = 0, page_limit: int = 0) -> List[MovieSummaryAggregation]:
-        skip_amount = page_number * page_limit
-
-        pipeline: List[Dict[str, Any]] = [
-            {'$match': {'user_id': user_id}},
-            {'$skip': skip_amount},
-            {'$limit': page_limit},
-            {
-                '$lookup': {
-                    'from': 'likes',
-                    'localField': 'movie_id',
-                    'foreignField': 'target_id',
-                    'as': 'likes_info',
-                },
-            },
-            {
-                '$project': {
-                    'movie_id': '$target_id',
-                    'likes_count': {'$size': '$likes_info'},
-                    'user_liked': {'$in': [user_id, '$likes_info.user_id']},
-                    'watch_progress': '$progress',
-                },
-            },
-        ]
+    page_fields = ('progress',)
 
-        documents = await self.mongo_model.collection.aggregate(pipeline).to_list(length=None)
-        return [MovieSummaryAggregation(**doc) for doc in documents]
+    def build_match(self, user_id: str) -> Dict[str, Any]:
+        return {'user_id': user_id}
+
+
+class UserMovieStateSummaryAggregator(AbstractSummaryAggregator):
+    """
+    Collection page read from user_movie_state.
+
+    The page is a single range scan of the (user_id, <flag>, _id) index, the user's likes
+    and progress come with it and only like counters are left to the enricher.
+    """
+
+    page_fields = ('liked', 'progress')
+
+    def __init__(
+        self,
+        mongo_model: UserMovieStateModel,
+        enricher: PageEnricher,
+        state_flag: str,
+        progress_buffer: Optional[WatchProgressBuffer] = None,
+    ):
+        super().__init__(mongo_model=mongo_model, enricher=enricher, progress_buffer=progress_buffer)
+        self.state_flag = state_flag
+
+    def build_match(self, user_id: str) -> Dict[str, Any]:
+        return {'user_id': user_id, self.state_flag: True}
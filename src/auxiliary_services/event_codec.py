@@ -0,0 +1,167 @@
+import struct
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+import msgpack  # type: ignore
+from pydantic import BaseModel, Field
+
+SCHEMAS_DIRECTORY = Path(__file__).parents[1] / 'schemas'
+
+# Format version of the envelope, then the registry id of the schema the body was written with.
+ENVELOPE_HEADER = struct.Struct('>BH')
+ENVELOPE_VERSION = 1
+# Bodies of topics without a schema are plain msgpack maps.
+SCHEMALESS_ID = 0
+
+
+class EncodedEvent(NamedTuple):
+    topic: str
+    key: str
+    event_type: Optional[str]
+    encoded_value: bytes
+
+
+class SchemaField(BaseModel):
+    name: str
+    type: Any
+    default: Any = Field(default=None)
+    fields: Optional[List['SchemaField']] = Field(default=None)
+
+    @property
+    def is_optional(self) -> bool:
+        return 'default' in self.model_fields_set
+
+
+class EventSchema(BaseModel):
+    id: int
+    name: str
+    version: int
+    doc: str = Field(default='')
+    fields: List[SchemaField]
+
+
+class SchemaRegistry:
+    """
+    Local stand-in for a schema registry: every src/schemas/<name>.v<version>.json file is a schema.
+
+    Ids are never reused, so an event written with any registered version can be read back.
+    """
+
+    def __init__(self, schemas: List[EventSchema]):
+        self._by_id: Dict[int, EventSchema] = {}
+        self._latest_by_name: Dict[str, EventSchema] = {}
+        for schema in schemas:
+            if schema.id == SCHEMALESS_ID or schema.id in self._by_id:
+                raise ValueError('Schema id {id} of {name} is reserved or taken'.format(id=schema.id, name=schema.name))
+            self._by_id[schema.id] = schema
+            latest = self._latest_by_name.get(schema.name)
+            if latest is None or latest.version < schema.version:
+                self._latest_by_name[schema.name] = schema
+
+    @classmethod
+    def from_directory(cls, directory: Path = SCHEMAS_DIRECTORY) -> 'SchemaRegistry':
+        return cls([
+            EventSchema.model_validate_json(schema_path.read_bytes())
+            for schema_path in sorted(directory.glob('*.json'))
+        ])
+
+    def get(self, schema_id: int) -> EventSchema:
+        if schema_id not in self._by_id:
+            raise ValueError('Unknown event schema id {id}'.format(id=schema_id))
+        return self._by_id[schema_id]
+
+    def get_latest(self, name: str) -> EventSchema:
+        if name not in self._latest_by_name:
+            raise ValueError('Unknown event schema {name}'.format(name=name))
+        return self._latest_by_name[name]
+
+
+class LayoutField(NamedTuple):
+    name: str
+    is_optional: bool
+    default: Any
+    nested_layout: Optional['RecordLayout']
+
+
+class RecordLayout:
+    """Schema fields compiled to plain tuples, so encoding a record does no pydantic attribute lookups."""
+
+    def __init__(self, fields: List[SchemaField]):
+        self.names = frozenset(schema_field.name for schema_field in fields)
+        self.fields = [
+            LayoutField(
+                name=schema_field.name,
+                is_optional=schema_field.is_optional,
+                default=schema_field.default,
+                nested_layout=None if schema_field.fields is None else RecordLayout(schema_field.fields),
+            )
+            for schema_field in fields
+        ]
+
+    def pack(self, record: Mapping[str, Any]) -> List[Any]:
+        """Values of the record in schema order, the field names are left out of the payload."""
+        if not self.names.issuperset(record):
+            unknown_names = ', '.join(sorted(record.keys() - self.names))
+            raise ValueError('Fields {names} are not in the event schema'.format(names=unknown_names))
+        return [pack_field(layout_field, record) for layout_field in self.fields]
+
+    def unpack(self, packed_values: List[Any]) -> Dict[str, Any]:
+        record = {}
+        for layout_field, field_value in zip(self.fields, packed_values):
+            if layout_field.nested_layout is not None and field_value is not None:
+                field_value = layout_field.nested_layout.unpack(field_value)
+            record[layout_field.name] = field_value
+        return record
+
+
+def pack_field(layout_field: LayoutField, record: Mapping[str, Any]) -> Any:
+    if layout_field.name not in record and not layout_field.is_optional:
+        raise ValueError('Required field {name} is missing'.format(name=layout_field.name))
+    field_value = record.get(layout_field.name, layout_field.default)
+    if layout_field.nested_layout is not None and field_value is not None:
+        field_value = layout_field.nested_layout.pack(field_value)
+    return field_value
+
+
+# Envelope header of a topic's events and the layout of their schema, None for schemaless topics.
+TopicLayout = Tuple[bytes, Optional[RecordLayout]]
+
+
+class EventCodec:
+    """
+    Encodes Kafka event values as an envelope header followed by a msgpack array of the field values.
+
+    Every topic is written with the latest version of its schema from `topic_schemas`; a reader takes
+    the schema id from the header, so consumers decode events of older versions during a rollout.
+    """
+
+    def __init__(self, registry: SchemaRegistry, topic_schemas: Dict[str, str]):
+        self.registry = registry
+        self._layouts: Dict[int, RecordLayout] = {}
+        self._topic_layouts: Dict[str, TopicLayout] = {}
+        for topic, schema_name in topic_schemas.items():
+            schema = registry.get_latest(schema_name)
+            header = ENVELOPE_HEADER.pack(ENVELOPE_VERSION, schema.id)
+            self._topic_layouts[topic] = (header, self._get_layout(schema.id))
+        self._schemaless: TopicLayout = (ENVELOPE_HEADER.pack(ENVELOPE_VERSION, SCHEMALESS_ID), None)
+        self._packer = msgpack.Packer(use_bin_type=True)
+
+    def encode(self, topic: str, message: Mapping[str, Any]) -> bytes:
+        header, layout = self._topic_layouts.get(topic, self._schemaless)
+        if layout is None:
+            return header + self._packer.pack(message)
+        return header + self._packer.pack(layout.pack(message))
+
+    def decode(self, payload: bytes) -> Dict[str, Any]:
+        envelope_version, schema_id = ENVELOPE_HEADER.unpack_from(payload)
+        if envelope_version != ENVELOPE_VERSION:
+            raise ValueError('Unknown event envelope version {version}'.format(version=envelope_version))
+        body = msgpack.unpackb(payload[ENVELOPE_HEADER.size:], raw=False)
+        if schema_id == SCHEMALESS_ID:
+            return body
+        return self._get_layout(schema_id).unpack(body)
+
+    def _get_layout(self, schema_id: int) -> RecordLayout:
+        if schema_id not in self._layouts:
+            self._layouts[schema_id] = RecordLayout(self.registry.get(schema_id).fields)
+        return self._layouts[schema_id]
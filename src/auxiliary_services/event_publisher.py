@@ -0,0 +1,279 @@
+import asyncio
+import logging
+import time
+from typing import List, Literal, NamedTuple, Optional, Tuple
+
+from aiokafka import AIOKafkaProducer  # type: ignore
+from aiokafka.errors import KafkaError  # type: ignore
+
+from src.auxiliary_services.event_codec import EncodedEvent, EventCodec
+from src.auxiliary_services.spill_log import SpillLog, SpillLogFullError
+from src.core.exceptions import EventQueueOverloadedException
+from src.core.metrics import metrics
+from src.project_utilities.kafka_headers import event_headers
+
+logger = logging.getLogger(__name__)
+
+OverflowPolicy = Literal['block', 'drop', 'shed']
+
+
+class PendingEvent(NamedTuple):
+    topic: str
+    key: str
+    message: dict
+    event_type: Optional[str]
+    enqueued_at: float
+
+
+class EventPublisherOptions(NamedTuple):
+    max_queue_size: int = 10000
+    batch_size: int = 500
+    batch_interval: float = 0.05
+    overflow: OverflowPolicy = 'block'
+    send_timeout: float = 5
+    retry_interval: float = 5
+
+
+def is_delivered(delivery: asyncio.Future) -> bool:
+    return delivery.done() and not delivery.cancelled() and delivery.exception() is None
+
+
+class EventPublisher:
+    """
+    Per-worker Kafka publisher fed by a bounded queue, so request handlers only pay for an enqueue.
+
+    A background task takes events off the queue in batches of up to `batch_size`, or whatever
+    arrived within `batch_interval` seconds of the first one, hands them to the producer and
+    waits for their delivery. When the queue is full, `overflow` decides what happens to new
+    events: 'block' makes the caller wait for room, 'drop' discards them, 'shed' rejects the
+    request with 503 before anything is enqueued. Events are encoded by the background task too,
+    off the request path. The limits, timeouts and `overflow` come in `options`.
+
+    The producer has to wait for acks (acks=1 or 'all'): with acks=0 every delivery succeeds at once.
+    With a `spill_log`, events Kafka does not take within `send_timeout` seconds are appended to it
+    instead of being lost, and so are all new events while it holds any: Kafka is retried every
+    `retry_interval` seconds by replaying the log in order, and new events go to Kafka directly
+    again once it is drained. The queue keeps moving during a broker outage, so requests keep
+    their latency. Delivery of spilled events is at least once.
+    """
+
+    def __init__(
+        self,
+        producer: AIOKafkaProducer,
+        codec: EventCodec,
+        options: EventPublisherOptions = EventPublisherOptions(),
+        spill_log: Optional[SpillLog] = None,
+    ):
+        self.producer = producer
+        self.codec = codec
+        self.options = options
+        self.spill_log = spill_log
+        self._retry_at: float = 0
+        self._queue: asyncio.Queue[PendingEvent] = asyncio.Queue(maxsize=options.max_queue_size)
+        self._publish_loop: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    def start(self) -> None:
+        self._publish_loop = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """
+        Stop the background task and publish, or spill, everything still queued.
+
+        The task is not cancelled: it finishes the batch it has taken and stops once the queue is empty.
+        """
+        self._stopping.set()
+        if self._publish_loop is not None:
+            await asyncio.gather(self._publish_loop, return_exceptions=True)
+        while not self._queue.empty():
+            await self._publish_batch(self._take_queued(self.options.batch_size))
+
+    async def publish(self, topic: str, key: str, message: dict, event_type: Optional[str] = None) -> None:
+        await self.publish_many(topic, [(key, message)], event_type=event_type)
+
+    async def publish_many(
+        self,
+        topic: str,
+        messages: List[Tuple[str, dict]],
+        event_type: Optional[str] = None,
+    ) -> None:
+        free_slots = self._queue.maxsize - self._queue.qsize()
+        if self.options.overflow == 'shed' and len(messages) > free_slots:
+            metrics.increment('events.shed', len(messages))
+            raise EventQueueOverloadedException('Too many events waiting to be published')
+        enqueued_at = time.monotonic()
+        for key, message in messages:
+            event = PendingEvent(
+                topic=topic, key=key, message=message, event_type=event_type, enqueued_at=enqueued_at,
+            )
+            if self.options.overflow == 'block':
+                await self._queue.put(event)
+            elif self._queue.full():
+                metrics.increment('events.dropped')
+            else:
+                self._queue.put_nowait(event)
+        metrics.set_gauge('events.queue_depth', self._queue.qsize())
+
+    async def _run(self) -> None:
+        while True:
+            # Spilled events are replayed even when no new events arrive.
+            wait_timeout = None if self._spill_is_empty() else self.options.retry_interval
+            batch = await self._next_batch(wait_timeout)
+            if not batch and self._stopping.is_set():
+                return
+            try:
+                await self._publish_or_replay(batch)
+            except Exception:
+                logger.exception('Event publishing round failed')
+                metrics.increment('events.failed', len(batch))
+
+    async def _publish_or_replay(self, batch: List[PendingEvent]) -> None:
+        if batch:
+            await self._publish_batch(batch)
+        else:
+            await self._replay_spilled()
+
+    async def _next_batch(self, wait_timeout: Optional[float] = None) -> List[PendingEvent]:
+        """
+        Wait up to `wait_timeout` seconds for an event, then collect more until the batch is full
+        or `batch_interval` is over. Returns an empty batch at once when the publisher is closing
+        and the queue is empty.
+        """
+        first_event = await self._first_event(wait_timeout)
+        if first_event is None:
+            return []
+        batch = [first_event]
+        deadline = time.monotonic() + self.options.batch_interval
+        while len(batch) < self.options.batch_size:
+            batch.extend(self._take_queued(self.options.batch_size - len(batch)))
+            remaining = deadline - time.monotonic()
+            if len(batch) == self.options.batch_size or remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _first_event(self, wait_timeout: Optional[float]) -> Optional[PendingEvent]:
+        """The next queued event, None if none arrives within `wait_timeout` or before close()."""
+        if not self._queue.empty():
+            return self._queue.get_nowait()
+        getter = asyncio.ensure_future(self._queue.get())
+        stopper = asyncio.ensure_future(self._stopping.wait())
+        done, pending = await asyncio.wait(
+            {getter, stopper}, timeout=wait_timeout, return_when=asyncio.FIRST_COMPLETED,
+        )
+        for waiter in pending:
+            waiter.cancel()
+        if getter in done:
+            return getter.result()
+        return None
+
+    def _take_queued(self, limit: int) -> List[PendingEvent]:
+        taken: List[PendingEvent] = []
+        while len(taken) < limit and not self._queue.empty():
+            taken.append(self._queue.get_nowait())
+        return taken
+
+    async def _publish_batch(self, batch: List[PendingEvent]) -> None:
+        encoded_events = self._encode(batch)
+        if await self._replay_spilled():
+            undelivered = await self._deliver(encoded_events)
+        else:
+            undelivered = encoded_events
+        if undelivered:
+            await self._spill(undelivered)
+
+        published_at = time.monotonic()
+        for event in batch:
+            metrics.observe('events.publish_latency', published_at - event.enqueued_at)
+        metrics.set_gauge('events.queue_depth', self._queue.qsize())
+
+    def _encode(self, batch: List[PendingEvent]) -> List[EncodedEvent]:
+        encoded_events = []
+        for pending_event in batch:
+            try:
+                event_value = self.codec.encode(pending_event.topic, pending_event.message)
+            except (TypeError, ValueError):
+                logger.warning('Could not encode an event for %s', pending_event.topic, exc_info=True)
+                metrics.increment('events.failed')
+                continue
+            encoded_events.append(EncodedEvent(
+                topic=pending_event.topic,
+                key=pending_event.key,
+                event_type=pending_event.event_type,
+                encoded_value=event_value,
+            ))
+        return encoded_events
+
+    async def _deliver(self, encoded_events: List[EncodedEvent]) -> List[EncodedEvent]:
+        """
+        Hand the events to the producer in order and wait for their delivery, returns the ones to spill.
+
+        Once the producer does not take an event within `send_timeout`, the rest of the batch is not tried.
+        Events are returned from the first undelivered one on, delivered or not: replaying only the failed
+        ones would put them after later events of the same key.
+        """
+        deliveries: List[asyncio.Future] = []
+        for event_to_send in encoded_events:
+            try:
+                deliveries.append(await asyncio.wait_for(
+                    self.producer.send(
+                        topic=event_to_send.topic,
+                        key=event_to_send.key,
+                        value=event_to_send.encoded_value,
+                        headers=event_headers(event_to_send.event_type),
+                    ),
+                    timeout=self.options.send_timeout,
+                ))
+            except (KafkaError, asyncio.TimeoutError):
+                logger.warning('Kafka did not take an event for %s', event_to_send.topic, exc_info=True)
+                break
+        if deliveries:
+            await asyncio.wait(deliveries, timeout=self.options.send_timeout)
+        first_undelivered = next(
+            (index for index, delivery in enumerate(deliveries) if not is_delivered(delivery)),
+            len(deliveries),
+        )
+        undelivered = encoded_events[first_undelivered:]
+        if undelivered:
+            logger.warning(
+                '%s of %s events are left from the first undelivered one', len(undelivered), len(encoded_events),
+            )
+            self._retry_at = time.monotonic() + self.options.retry_interval
+        metrics.increment('events.published', len(encoded_events) - len(undelivered))
+        return undelivered
+
+    async def _spill(self, undelivered: List[EncodedEvent]) -> None:
+        if self.spill_log is None:
+            metrics.increment('events.failed', len(undelivered))
+            return
+        try:
+            await asyncio.to_thread(self.spill_log.append, undelivered)
+        except (OSError, SpillLogFullError):
+            logger.error('Could not spill %s events', len(undelivered), exc_info=True)
+            metrics.increment('events.failed', len(undelivered))
+            return
+        metrics.increment('spill.spilled', len(undelivered))
+
+    async def _replay_spilled(self) -> bool:
+        """Replay spilled events in order, returns whether new events can go to Kafka directly."""
+        spill_log = self.spill_log
+        if spill_log is None or spill_log.is_empty:
+            return True
+        if time.monotonic() < self._retry_at:
+            return False
+        while not spill_log.is_empty:
+            spilled_events, cursor = await asyncio.to_thread(spill_log.read, self.options.batch_size)
+            if await self._deliver(spilled_events):
+                return False
+            await asyncio.to_thread(spill_log.commit, cursor)
+            metrics.increment('spill.replayed', len(spilled_events))
+            if self._queue.qsize() > self._queue.maxsize // 2:
+                # New events wait behind the rest of the log rather than fill the queue up.
+                return False
+        return True
+
+    def _spill_is_empty(self) -> bool:
+        return self.spill_log is None or self.spill_log.is_empty
@@ -0,0 +1,119 @@
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional, Sequence
+
+import jwt
+from cryptography.hazmat.primitives.serialization import load_pem_public_key
+from fastapi import HTTPException, status
+
+from src.models.user import User
+from src.project_utilities.ttl_lru import TtlLruCache
+
+BEARER_PREFIX = 'Bearer '
+VERIFIED_TOKENS_TTL = 300
+VERIFIED_TOKENS_MAX_ITEMS = 10000
+
+VerificationKeys = Dict[Optional[str], Any]
+
+
+class JwtOptions(NamedTuple):
+    algorithms: Sequence[str] = ('RS256',)
+    audience: Optional[str] = None
+    issuer: Optional[str] = None
+    leeway: int = 0
+    user_id_claim: str = 'sub'
+    cache_ttl: int = VERIFIED_TOKENS_TTL
+    cache_max_items: int = VERIFIED_TOKENS_MAX_ITEMS
+
+
+def extract_bearer_token(authorization: Optional[str]) -> Optional[str]:
+    if not authorization or not authorization.startswith(BEARER_PREFIX):
+        return None
+    return authorization[len(BEARER_PREFIX):].strip()
+
+
+def load_verification_keys(
+    public_key_path: Optional[str] = None,
+    jwks_path: Optional[str] = None,
+) -> VerificationKeys:
+    """Public keys by key id, the key of a PEM file has no id."""
+    keys: VerificationKeys = {}
+    if public_key_path:
+        keys[None] = load_pem_public_key(Path(public_key_path).read_bytes())
+    if jwks_path:
+        jwk_set = jwt.PyJWKSet.from_dict(json.loads(Path(jwks_path).read_text()))
+        for jwk in jwk_set.keys:
+            keys[jwk.key_id] = jwk.key
+    if not keys:
+        raise ValueError('JWT auth mode requires a public key or a JWKS file')
+    return keys
+
+
+def user_from_claims(claims: Dict[str, Any], user_id_claim: str = 'sub') -> User:
+    return User(
+        id=str(claims[user_id_claim]),
+        first_name=claims.get('first_name', ''),
+        last_name=claims.get('last_name', ''),
+        email=claims.get('email', ''),
+        phone=claims.get('phone', ''),
+        is_admin=bool(claims.get('is_admin', False)),
+    )
+
+
+class JwtVerifier:
+    """
+    Verifies signed access tokens locally, without a round trip to the auth service.
+
+    Keys come parsed from load_verification_keys, verified tokens are kept with their User
+    until the token expires (or for `options.cache_ttl` seconds, whichever comes first).
+    """
+
+    def __init__(self, keys: VerificationKeys, options: JwtOptions = JwtOptions()):
+        self.options = options
+        self._keys = keys
+        self._verified_tokens: TtlLruCache[User] = TtlLruCache(
+            max_items=options.cache_max_items, ttl=options.cache_ttl,
+        )
+
+    def accepts(self, authorization: Optional[str]) -> bool:
+        """Tell signed JWTs from opaque tokens, which still have to be checked by the auth service."""
+        token = extract_bearer_token(authorization)
+        return token is not None and token.count('.') == 2
+
+    def verify(self, authorization: Optional[str]) -> User:
+        token = extract_bearer_token(authorization)
+        if token is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication Failed')
+
+        cached_user = self._verified_tokens.get(token)
+        if cached_user is not None:
+            return cached_user
+
+        try:
+            claims = jwt.decode(
+                token,
+                key=self._key_for(jwt.get_unverified_header(token).get('kid')),
+                algorithms=list(self.options.algorithms),
+                audience=self.options.audience,
+                issuer=self.options.issuer,
+                leeway=self.options.leeway,
+            )
+            user = user_from_claims(claims, user_id_claim=self.options.user_id_claim)
+        except (jwt.PyJWTError, KeyError, ValueError):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication Failed')
+
+        expires_at = claims.get('exp')
+        cache_ttl = self._verified_tokens.ttl
+        if expires_at is not None:
+            token_ttl = float(expires_at) + self.options.leeway - time.time()
+            cache_ttl = min(cache_ttl, token_ttl)
+        self._verified_tokens.set(token, user, ttl=cache_ttl)
+        return user
+
+    def _key_for(self, key_id: Optional[str]) -> Any:
+        """Key of the id, or the key without an id for tokens signed with an unknown one."""
+        key = self._keys.get(key_id, self._keys.get(None))
+        if key is None:
+            raise jwt.InvalidKeyError('Unknown key id {kid}'.format(kid=key_id))
+        return key
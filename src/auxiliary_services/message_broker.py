@@ -1,18 +1,92 @@
 from abc import ABC, abstractmethod
+from functools import partial
+from typing import List, Optional, Tuple
 
 from aiokafka import AIOKafkaProducer  # type: ignore
 
+from src.auxiliary_services.event_codec import EventCodec
+from src.auxiliary_services.event_publisher import EventPublisher
+from src.db_models.outbox import OutboxModel
+from src.db_models.transactions import after_commit
+from src.project_utilities.kafka_headers import event_headers
+
+# (key, message) pairs of one event type.
+KeyedMessages = List[Tuple[str, dict]]
+
 
 class AsyncMessageBroker(ABC):
     @abstractmethod
-    async def send(self, key: str, message: dict) -> None:
+    async def send(self, key: str, message: dict, event_type: Optional[str] = None) -> None:
         raise NotImplementedError
 
+    async def send_many(self, messages: KeyedMessages, event_type: Optional[str] = None) -> None:
+        """
+        Send (key, message) pairs of one event type in order.
+
+        Kafka producers only append to their accumulators in send, so back-to-back sends
+        leave in the same produce requests once linger_ms is up.
+        """
+        for key, message in messages:
+            await self.send(key=key, message=message, event_type=event_type)
+
 
 class KafkaAsyncMessageBroker(AsyncMessageBroker):
-    def __init__(self, producer: AIOKafkaProducer, topic: str):
+    def __init__(self, producer: AIOKafkaProducer, codec: EventCodec, topic: str):
         self.producer = producer
+        self.codec = codec
+        self.topic = topic
+
+    async def send(self, key: str, message: dict, event_type: Optional[str] = None) -> None:
+        await self.producer.send(
+            topic=self.topic,
+            key=key,
+            value=self.codec.encode(self.topic, message),
+            headers=event_headers(event_type),
+        )
+
+
+class PublisherMessageBroker(AsyncMessageBroker):
+    """Hands messages to the worker's background publisher instead of awaiting the producer."""
+
+    def __init__(self, publisher: EventPublisher, topic: str):
+        self.publisher = publisher
+        self.topic = topic
+
+    async def send(self, key: str, message: dict, event_type: Optional[str] = None) -> None:
+        await self.publisher.publish(self.topic, key, message, event_type=event_type)
+
+    async def send_many(self, messages: KeyedMessages, event_type: Optional[str] = None) -> None:
+        await self.publisher.publish_many(topic=self.topic, messages=messages, event_type=event_type)
+
+
+class OutboxMessageBroker(AsyncMessageBroker):
+    """Writes messages to the outbox, inside the caller's mongo_transaction when there is one."""
+
+    def __init__(self, outbox_model: OutboxModel, topic: str):
+        self.outbox_model = outbox_model
         self.topic = topic
 
-    async def send(self, key: str, message: dict) -> None:
-        await self.producer.send(topic=self.topic, key=key, value=message)
+    async def send(self, key: str, message: dict, event_type: Optional[str] = None) -> None:
+        await self.send_many([(key, message)], event_type=event_type)
+
+    async def send_many(self, messages: KeyedMessages, event_type: Optional[str] = None) -> None:
+        await self.outbox_model.add_events(topic=self.topic, messages=messages, event_type=event_type)
+
+
+class AfterCommitMessageBroker(AsyncMessageBroker):
+    """
+    Sends through `broker` once the caller's mongo_transaction commits, at once outside of one.
+
+    Events of a Kafka broker cannot be rolled back: sent from inside the transaction, a retried
+    attempt would publish them twice and an aborted one would publish changes that never happened.
+    """
+
+    def __init__(self, broker: AsyncMessageBroker):
+        self.broker = broker
+
+    async def send(self, key: str, message: dict, event_type: Optional[str] = None) -> None:
+        send_event = partial(self.broker.send, key=key, message=message, event_type=event_type)
+        await after_commit(send_event)
+
+    async def send_many(self, messages: KeyedMessages, event_type: Optional[str] = None) -> None:
+        await after_commit(partial(self.broker.send_many, messages=messages, event_type=event_type))
@@ -1,9 +1,19 @@
-from typing import Dict, List, Optional
+import asyncio
+import math
+import time
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
-from src.auxiliary_services.cache_service import CacheService
+import orjson
+from fastapi import HTTPException, status
+
+from src.auxiliary_services.cache_service import TOMBSTONE, CacheService
 from src.auxiliary_services.data_aggregation import AbstractSummaryAggregator, MovieDetailedAggregator
 from src.external_api.movie import MovieApi, deserialize_movie_json
 from src.models.movie import MovieApiResponse, MovieDetailedResponse, MovieSummaryAggregation, MovieSummaryResponse
+from src.project_utilities.background_refresh import BackgroundRefresher
+from src.project_utilities.redis_lock import RedisLock
+from src.project_utilities.single_flight import SingleFlight
 
 
 def get_empty(pairs: dict) -> List[str]:
@@ -14,41 +24,122 @@ def get_empty(pairs: dict) -> List[str]:
     return empty_keys
 
 
+def wrap_cached_movie(movie: dict, soft_ttl: int, hard_ttl: int) -> dict:
+    """
+    Cache entry of a movie: the movie itself, the moment after which it should be refreshed
+    and the moment after which it must not be served anymore.
+    """
+    stored_at = time.time()
+    return {'movie': movie, 'fresh_until': stored_at + soft_ttl, 'expires_at': stored_at + hard_ttl}
+
+
+def unwrap_cached_movie(cached_entry: dict) -> dict:
+    if 'fresh_until' in cached_entry:
+        return cached_entry['movie']
+    return cached_entry
+
+
+def is_expired(cached_entry: Any) -> bool:
+    """
+    Reads slide the TTL of the key in Redis, so a movie read often enough would never leave the cache:
+    the hard expiry kept in the entry bounds how long it is served. Entries written without one never expire.
+    """
+    if not isinstance(cached_entry, dict):
+        return False
+    return cached_entry.get('expires_at', math.inf) <= time.time()
+
+
+def is_stale(cached_entry: dict) -> bool:
+    """Entries written before soft TTLs existed carry no freshness mark and count as stale."""
+    return cached_entry.get('fresh_until', 0) <= time.time()
+
+
+def next_page_cursor(movie_details: List[MovieSummaryAggregation], page_limit: int) -> Optional[str]:
+    """Cursor of the following page, None once a short page shows the collection is exhausted."""
+    if not page_limit or len(movie_details) < page_limit:
+        return None
+    return movie_details[-1].cursor
+
+
 def build_movie_response(
     movie_details: List[MovieSummaryAggregation],
     cached_movies: Dict[str, MovieApiResponse],
 ) -> List[MovieSummaryResponse]:
     movies = []
     for movie_detail in movie_details:
-        movie_from_api = cached_movies[movie_detail.movie_id]
+        movie_from_api = cached_movies.get(movie_detail.movie_id)
+        if movie_from_api is None:
+            continue
         movie_response = MovieSummaryResponse(movie=movie_from_api, movie_ugc_details=movie_detail)
         movies.append(movie_response)
     return movies
 
 
+def build_movie_response_json(
+    movie_details: List[MovieSummaryAggregation],
+    cached_movies: Dict[str, dict],
+) -> bytes:
+    """
+    Serialize a page of List[MovieSummaryResponse] straight from cached movie dicts.
+
+    Cached movies were dumped from validated MovieApiResponse objects, so they are
+    written out as they are, without building and re-validating pydantic models.
+    """
+    movies = []
+    for movie_detail in movie_details:
+        movie_from_cache = cached_movies.get(movie_detail.movie_id)
+        if movie_from_cache is None:
+            continue
+        movies.append(b''.join((
+            b'{"movie":',
+            orjson.dumps(movie_from_cache),
+            b',"movie_ugc_details":',
+            movie_detail.model_dump_json().encode(),
+            b'}',
+        )))
+    return b''.join((b'[', b','.join(movies), b']'))
+
+
+class MovieSource(NamedTuple):
+    """Where the movies come from: the cache, and the movie API with what coalesces its calls on a miss."""
+
+    cache: CacheService
+    movie_api: MovieApi
+    single_flight: Optional[SingleFlight[str, Any]] = None
+    fetch_lock: Optional[RedisLock] = None
+    refresher: Optional[BackgroundRefresher[str]] = None
+    soft_ttl: int = 60 * 60
+    tombstone_ttl: int = 5 * 60
+
+
 class MovieSearch:
     def __init__(
         self,
-        cache: CacheService,
+        source: MovieSource,
         detailed_aggregator: MovieDetailedAggregator,
         summary_aggregator: AbstractSummaryAggregator,
-        movie_api: MovieApi,
     ):
-        self._cache = cache
+        self._cache = source.cache
         self._summary_aggregator = summary_aggregator
         self._detailed_aggregator = detailed_aggregator
-        self._movie_api = movie_api
+        self._movie_api = source.movie_api
         self._movie_deserializer = deserialize_movie_json
+        self._single_flight: SingleFlight[str, Any] = source.single_flight or SingleFlight()
+        self._fetch_lock = source.fetch_lock
+        self._refresher = source.refresher
+        self._soft_ttl = source.soft_ttl
+        self._tombstone_ttl = source.tombstone_ttl
 
     async def get_user_movies(
         self,
         user_id: str,
         page_number: int = 0,
         page_limit: int = 0,
+        cursor: Optional[str] = None,
     ) -> Optional[List[MovieSummaryResponse]]:
 
         movie_summaries = await self._summary_aggregator.aggregate(
-            user_id=user_id, page_number=page_number, page_limit=page_limit,
+            user_id=user_id, page_number=page_number, page_limit=page_limit, cursor=cursor,
         )
         if not movie_summaries:
             return None
@@ -56,34 +147,150 @@ class MovieSearch:
         movies = await self._get_movies(movie_ids=movie_ids)
         return build_movie_response(movie_details=movie_summaries, cached_movies=movies)
 
+    async def get_user_movies_json(
+        self,
+        user_id: str,
+        page_number: int = 0,
+        page_limit: int = 0,
+        cursor: Optional[str] = None,
+    ) -> Tuple[bytes, Optional[str]]:
+        """Same page as get_user_movies, already serialized to JSON, and the cursor of the next page."""
+        movie_summaries = await self._summary_aggregator.aggregate(
+            user_id=user_id, page_number=page_number, page_limit=page_limit, cursor=cursor,
+        )
+        if not movie_summaries:
+            return b'null', None
+        movie_ids = [summary.movie_id for summary in movie_summaries]
+        movies = await self._get_cached_movies(movie_ids=movie_ids)
+        page = build_movie_response_json(movie_details=movie_summaries, cached_movies=movies)
+        return page, next_page_cursor(movie_summaries, page_limit=page_limit)
+
     async def get_movie(self, user_id: str, movie_id: str) -> MovieDetailedResponse:
         movie_info = await self._detailed_aggregator.aggregate(user_id=user_id, movie_id=movie_id)
         movie = await self._get_movie(movie_id=movie_id)
         return MovieDetailedResponse(movie=movie, movie_ugc_details=movie_info)
 
+    async def get_movie_json(self, user_id: str, movie_id: str) -> bytes:
+        """Same document as get_movie, already serialized to JSON."""
+        movie_info = await self._detailed_aggregator.aggregate(user_id=user_id, movie_id=movie_id)
+        movie = await self._get_cached_movie(movie_id=movie_id)
+        return b''.join((
+            b'{"movie":',
+            orjson.dumps(movie),
+            b',"movie_ugc_details":',
+            movie_info.model_dump_json().encode(),
+            b'}',
+        ))
+
     async def _get_movie(self, movie_id: str) -> MovieApiResponse:
-        movie_from_cache = await self._cache.get_single(key=movie_id)
-        if movie_from_cache is None:
-            movie_from_api = await self._movie_api.get_single(movie_id=movie_id)
-            await self._cache.store_single(key=movie_id, to_store=movie_from_api.model_dump())
-            return movie_from_api
-        return self._movie_deserializer(movie_from_cache)
-
-    async def _fetch_missing_movies(self, missing_ids: List[str]) -> Dict[str, MovieApiResponse]:
-        films = await self._movie_api.get_several(keys=missing_ids)
-        to_store = {film.id: film.model_dump() for film in films}
-        await self._cache.store_many(to_store=to_store)
-        return to_store
+        return self._movie_deserializer(await self._get_cached_movie(movie_id=movie_id))
+
+    async def _get_cached_movie(self, movie_id: str) -> dict:
+        movies = await self._get_cached_movies(movie_ids=[movie_id])
+        if movie_id not in movies:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Movie not found')
+        return movies[movie_id]
 
     async def _get_movies(self, movie_ids: List[str]) -> Dict[str, MovieApiResponse]:
-        movies_from_cache = await self._cache.get_many(keys=movie_ids)
+        movies = await self._get_cached_movies(movie_ids=movie_ids)
+        return {movie_id: self._movie_deserializer(movie) for movie_id, movie in movies.items()}
+
+    async def _get_cached_movies(self, movie_ids: List[str]) -> Dict[str, dict]:
+        """
+        Serve movies from the cache, stale-while-revalidate.
+
+        Entries past their soft TTL are returned as is and refreshed in the background,
+        only the ids missing from the cache make the request wait for MovieApi.
+        Ids known not to exist (tombstoned) are left out of the result.
+        """
+        movies_from_cache = await self._read_cache(movie_ids)
         missing_ids = get_empty(movies_from_cache)
 
+        stale_ids = [
+            movie_id
+            for movie_id, cached_entry in movies_from_cache.items()
+            if cached_entry is not None and cached_entry is not TOMBSTONE and is_stale(cached_entry)
+        ]
+        if stale_ids:
+            self._schedule_refresh(stale_ids)
+
         if missing_ids:
-            fetched_movies = await self._fetch_missing_movies(missing_ids)
+            fetched_movies = await self._single_flight.load_many(missing_ids, self._load_missing_movies)
             movies_from_cache |= fetched_movies
 
         return {
-            movie_id: self._movie_deserializer(movie_json)
-            for movie_id, movie_json in movies_from_cache.items()
+            movie_id: unwrap_cached_movie(cached_entry)
+            for movie_id, cached_entry in movies_from_cache.items()
+            if cached_entry is not None and cached_entry is not TOMBSTONE
         }
+
+    async def _read_cache(self, movie_ids: List[str]) -> Dict[str, Any]:
+        """Cached entries of the movies, entries past their hard expiry are None like missing ones."""
+        movies_from_cache = await self._cache.get_many(keys=movie_ids)
+        return {
+            movie_id: None if is_expired(cached_entry) else cached_entry
+            for movie_id, cached_entry in movies_from_cache.items()
+        }
+
+    def _schedule_refresh(self, stale_ids: List[str]) -> None:
+        if self._refresher is None:
+            return
+        self._refresher.schedule(stale_ids, self._refresh_movies)
+
+    async def _refresh_movies(self, stale_ids: List[str]) -> None:
+        await self._single_flight.load_many(stale_ids, self._load_missing_movies)
+
+    async def _load_missing_movies(self, missing_ids: List[str]) -> Dict[str, Any]:
+        """Fetch the movies this worker is the single flight for, unless another worker already fetches them."""
+        if self._fetch_lock is None:
+            return await self._fetch_missing_movies(missing_ids)
+
+        locked_ids = await self._fetch_lock.acquire_many(missing_ids)
+        loaded_movies: Dict[str, Any] = {}
+        async with AsyncExitStack() as stack:
+            stack.push_async_callback(self._fetch_lock.release_many, locked_ids)
+            if locked_ids:
+                loaded_movies |= await self._fetch_missing_movies(locked_ids)
+
+        foreign_ids = [movie_id for movie_id in missing_ids if movie_id not in locked_ids]
+        if foreign_ids:
+            loaded_movies |= await self._wait_for_foreign_fetch(foreign_ids, self._fetch_lock)
+        return loaded_movies
+
+    async def _wait_for_foreign_fetch(self, movie_ids: List[str], fetch_lock: RedisLock) -> Dict[str, Any]:
+        """Poll the cache while other workers hold the locks, fetch by ourselves what never shows up."""
+        deadline = time.monotonic() + fetch_lock.wait_timeout
+        found_movies: Dict[str, Any] = {}
+        pending_ids = movie_ids
+        while pending_ids and time.monotonic() < deadline:
+            await asyncio.sleep(fetch_lock.poll_interval)
+            movies_from_cache = await self._read_cache(pending_ids)
+            found_movies |= {
+                movie_id: movie
+                for movie_id, movie in movies_from_cache.items()
+                if movie is not None and movie is not TOMBSTONE
+            }
+            pending_ids = get_empty(movies_from_cache)
+
+        if pending_ids:
+            found_movies |= await self._fetch_missing_movies(pending_ids)
+        return found_movies
+
+    async def _fetch_missing_movies(self, missing_ids: List[str]) -> Dict[str, Any]:
+        if len(missing_ids) == 1:
+            film = await self._movie_api.get_single(movie_id=missing_ids[0])
+            films = [] if film is None else [film]
+        else:
+            films = await self._movie_api.get_several(movie_ids=missing_ids)
+        to_store = {
+            film.id: wrap_cached_movie(film.model_dump(), soft_ttl=self._soft_ttl, hard_ttl=self._cache.ttl)
+            for film in films
+            if film is not None
+        }
+        if to_store:
+            await self._cache.store_many(to_store=to_store)
+
+        unknown_ids = [movie_id for movie_id in missing_ids if movie_id not in to_store]
+        if unknown_ids:
+            await self._cache.store_tombstones(keys=unknown_ids, ttl=self._tombstone_ttl)
+        return to_store
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import math
+import random
+from typing import List, NamedTuple, Optional
+from uuid import uuid4
+
+from aiokafka import AIOKafkaProducer  # type: ignore
+from aiokafka.errors import KafkaError  # type: ignore
+from pymongo.errors import PyMongoError
+
+from src.auxiliary_services.event_codec import EventCodec
+from src.core.metrics import metrics
+from src.db_models.outbox import OutboxEvent, OutboxLeaseModel, OutboxModel
+from src.project_utilities.kafka_headers import event_headers
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxRelayModels(NamedTuple):
+    outbox_model: OutboxModel
+    lease_model: OutboxLeaseModel
+
+
+class OutboxRelayOptions(NamedTuple):
+    batch_size: int = 1000
+    lease_ttl: float = 30
+    poll_interval: float = 0.5
+
+
+class OutboxRelay:
+    """
+    Drains the outbox to Kafka.
+
+    Every worker runs a relay and the outbox shards are split between them through leases:
+    a relay claims its fair share of the shards (shards / live relays), renews its leases while
+    it works and releases the ones above its share, so the shards rebalance as workers come and go.
+    A shard is published in sequence order in batches of up to `batch_size` events; once a batch is
+    delivered, the lease is renewed and the batch is deleted. The shard is always read from its start,
+    so a batch of a relay that died before deleting it is published again by the next holder of
+    the shard: delivery is at least once. The producer has to wait for the acks of all replicas.
+    `batch_size`, `lease_ttl` and `poll_interval` come in `options`.
+    """
+
+    def __init__(
+        self,
+        models: OutboxRelayModels,
+        producer: AIOKafkaProducer,
+        codec: EventCodec,
+        options: OutboxRelayOptions = OutboxRelayOptions(),
+    ):
+        self.outbox_model = models.outbox_model
+        self.lease_model = models.lease_model
+        self.producer = producer
+        self.codec = codec
+        self.options = options
+        self.owner = uuid4().hex
+        self._relay_loop: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._relay_loop = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._relay_loop is not None:
+            self._relay_loop.cancel()
+            await asyncio.gather(self._relay_loop, return_exceptions=True)
+        for shard in await self.lease_model.get_held_shards(self.owner):
+            await self.lease_model.release(shard, self.owner)
+        await self.lease_model.leave(self.owner)
+
+    async def relay_once(self) -> int:
+        """Publish one batch of every shard held, returns how many events were published."""
+        return sum([await self._relay_shard(shard) for shard in await self.claim_shards()])
+
+    async def claim_shards(self) -> List[int]:
+        fair_share = await self._get_fair_share()
+        held_shards = await self.lease_model.get_held_shards(self.owner)
+        claimed_shards = await self._keep_held_shards(held_shards, fair_share)
+        claimed_shards.extend(await self._claim_free_shards(held_shards, fair_share - len(claimed_shards)))
+        metrics.set_gauge('outbox.leased_shards', len(claimed_shards))
+        return claimed_shards
+
+    async def _get_fair_share(self) -> int:
+        """Renew this relay's heartbeat, returns how many shards it should hold among the live relays."""
+        await self.lease_model.heartbeat(self.owner, self.options.lease_ttl)
+        live_owners = set(await self.lease_model.get_live_owners())
+        live_owners.add(self.owner)
+        return math.ceil(self.outbox_model.shards / len(live_owners))
+
+    async def _keep_held_shards(self, held_shards: List[int], fair_share: int) -> List[int]:
+        """Release the held shards above the fair share and renew the others, returns the renewed ones."""
+        for excess_shard in held_shards[fair_share:]:
+            await self.lease_model.release(excess_shard, self.owner)
+        kept_shards = []
+        for held_shard in held_shards[:fair_share]:
+            if await self.lease_model.acquire(held_shard, self.owner, self.options.lease_ttl):
+                kept_shards.append(held_shard)
+        return kept_shards
+
+    async def _claim_free_shards(self, held_shards: List[int], wanted: int) -> List[int]:
+        """Try the shards not held by this relay in random order until `wanted` of them are claimed."""
+        free_shards = [shard for shard in range(self.outbox_model.shards) if shard not in held_shards]
+        random.shuffle(free_shards)
+        claimed_shards: List[int] = []
+        for free_shard in free_shards:
+            if len(claimed_shards) >= wanted:
+                break
+            if await self.lease_model.acquire(free_shard, self.owner, self.options.lease_ttl):
+                claimed_shards.append(free_shard)
+        return claimed_shards
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                published_count = await self.relay_once()
+            except (KafkaError, PyMongoError):
+                logger.warning('Outbox relay round failed', exc_info=True)
+                published_count = 0
+            except Exception:
+                # Anything else would end the task and leave this worker's shards undrained until a restart.
+                logger.exception('Outbox relay round failed unexpectedly')
+                published_count = 0
+            if not published_count:
+                await asyncio.sleep(self.options.poll_interval)
+
+    async def _relay_shard(self, shard: int) -> int:
+        events = await self.outbox_model.get_batch(shard, limit=self.options.batch_size)
+        if not events:
+            return 0
+        await self._publish(events)
+        lease_kept = await self.lease_model.renew(shard, self.owner, ttl=self.options.lease_ttl)
+        if lease_kept:
+            await self.outbox_model.delete_events(shard, [event.id for event in events])
+            metrics.increment('outbox.published', len(events))
+        else:
+            logger.warning('Lost the lease of outbox shard %s while publishing', shard)
+        return len(events)
+
+    async def _publish(self, events: List[OutboxEvent]) -> None:
+        """
+        Hand the events to the producer in order and wait until all of them are delivered.
+
+        An event that does not match its topic's schema can never be published: it is logged and
+        deleted with the rest of the batch instead of blocking its shard.
+        """
+        deliveries = []
+        for event in events:
+            try:
+                event_value = self.codec.encode(event.topic, event.message)
+            except (TypeError, ValueError):
+                logger.error('Dropped outbox event %s not matching its schema', event.id, exc_info=True)
+                metrics.increment('outbox.dropped')
+                continue
+            deliveries.append(await self.producer.send(
+                topic=event.topic, key=event.key, value=event_value, headers=event_headers(event.event_type),
+            ))
+        await asyncio.gather(*deliveries)
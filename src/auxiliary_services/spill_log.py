@@ -0,0 +1,285 @@
+import fcntl
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from contextlib import ExitStack
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Literal, NamedTuple, Optional, Tuple
+
+import msgpack  # type: ignore
+
+from src.auxiliary_services.event_codec import EncodedEvent
+from src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+FsyncPolicy = Literal['always', 'interval', 'never']
+
+# Every record is its payload length and crc32, then the msgpack payload.
+RECORD_HEADER = struct.Struct('>II')
+SEGMENT_SUFFIX = '.log'
+LOCK_FILE_NAME = 'lock'
+SEGMENT_MEGABYTES = 16
+
+
+class SpillLogFullError(Exception):
+    """The spill log reached its size cap."""
+
+
+class SpillLogOptions(NamedTuple):
+    segment_bytes: int = SEGMENT_MEGABYTES * 1024 * 1024
+    max_bytes: int = 1024 * 1024 * 1024
+    fsync: FsyncPolicy = 'interval'
+    fsync_interval: float = 1
+
+
+def lock_slot(directory: Path) -> Optional[BinaryIO]:
+    """Lock file of the worker slot in `directory` locked for this process, None when another process holds it."""
+    lock_file = (directory / LOCK_FILE_NAME).open('wb')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    except OSError:
+        lock_file.close()
+        raise
+    return lock_file
+
+
+class SpillCursor(NamedTuple):
+    """Position after the last record read: index of the segment in the log and offset in it."""
+
+    segment_index: int
+    offset: int
+
+
+class SegmentRead(NamedTuple):
+    """Records read from a segment, the offset after them and whether the segment ended."""
+
+    records: List[EncodedEvent]
+    offset: int
+    reached_end: bool
+
+
+class SpillLog:
+    """
+    Append-only log of encoded events that could not be handed to Kafka, kept on local disk.
+
+    Records are appended to numbered segment files of up to `segment_bytes` and read back in
+    the order they were written. Once a read batch is delivered, `commit` moves the read position
+    past it and deletes the segments left behind. Appends beyond `max_bytes` raise SpillLogFullError.
+    The sizes and `fsync` come in `options`: `fsync` decides when appended records are flushed to
+    the disk: after every append ('always'), on the first append `fsync_interval` seconds after the
+    previous flush ('interval') or when the OS decides ('never'); segments are always flushed when
+    they are closed, unless it is 'never'.
+
+    A torn record at the end of a segment (a crash during an append) ends the segment: the records
+    before it are kept. The read position lives in memory, records of a partly replayed segment are
+    replayed again after a restart. Methods are thread-safe, so they can run in asyncio.to_thread.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        options: SpillLogOptions = SpillLogOptions(),
+        lock_file: Optional[BinaryIO] = None,
+    ):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.directory = directory
+        self.segment_bytes = options.segment_bytes
+        self.max_bytes = options.max_bytes
+        self.fsync = options.fsync
+        self.fsync_interval = options.fsync_interval
+        self._segments: List[Path] = sorted(directory.glob('*{suffix}'.format(suffix=SEGMENT_SUFFIX)))
+        self._sizes: Dict[Path, int] = {segment: segment.stat().st_size for segment in self._segments}
+        self._read_offset = 0
+        self._writer: Optional[BinaryIO] = None
+        self._synced_at = time.monotonic()
+        self._packer = msgpack.Packer(use_bin_type=True)
+        self._lock = threading.Lock()
+        self._lock_file = lock_file
+        metrics.set_gauge('spill.bytes', self.size)
+
+    @classmethod
+    def claim(cls, root: Path, options: SpillLogOptions = SpillLogOptions()) -> 'SpillLog':
+        """
+        Open the log of the first worker slot under `root` no other process holds.
+
+        Every worker writes its own slot, a slot left by a worker that died is replayed by the
+        next worker that claims it. The slot stays locked until the log is closed.
+        """
+        slot = 0
+        while True:
+            directory = root / 'worker-{slot}'.format(slot=slot)
+            directory.mkdir(parents=True, exist_ok=True)
+            lock_file = lock_slot(directory)
+            if lock_file is None:
+                slot += 1
+                continue
+            try:
+                return cls(directory, options=options, lock_file=lock_file)
+            except Exception:
+                lock_file.close()
+                raise
+
+    @property
+    def size(self) -> int:
+        return sum(self._sizes.values())
+
+    @property
+    def is_empty(self) -> bool:
+        return not self._segments
+
+    def append(self, records: List[EncodedEvent]) -> None:
+        with self._lock:
+            self._append(records)
+
+    def read(self, limit: int) -> Tuple[List[EncodedEvent], SpillCursor]:
+        """Up to `limit` records from the read position on, and the position after them."""
+        with self._lock:
+            return self._read(limit)
+
+    def commit(self, cursor: SpillCursor) -> None:
+        """Mark everything before `cursor` as delivered and delete the segments it consumed."""
+        with self._lock:
+            self._commit(cursor)
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_writer()
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+    def _append(self, records: List[EncodedEvent]) -> None:
+        frames = []
+        for record in records:
+            payload = self._packer.pack(tuple(record))
+            frames.append(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+            frames.append(payload)
+        appended = b''.join(frames)
+        if self.size + len(appended) > self.max_bytes:
+            raise SpillLogFullError('Spill log in {path} is full'.format(path=self.directory))
+
+        writer = self._get_writer()
+        writer.write(appended)
+        writer.flush()
+        self._sizes[self._segments[-1]] += len(appended)
+        if self.fsync == 'always' or (self.fsync == 'interval' and self._is_sync_due()):
+            self._sync(writer)
+        metrics.set_gauge('spill.bytes', self.size)
+
+    def _read(self, limit: int) -> Tuple[List[EncodedEvent], SpillCursor]:
+        records: List[EncodedEvent] = []
+        segment_index = 0
+        offset = self._read_offset
+        while segment_index < len(self._segments):
+            segment_records, offset, reached_end = self._read_segment(
+                self._segments[segment_index], offset, limit - len(records),
+            )
+            records.extend(segment_records)
+            if not reached_end or segment_index == len(self._segments) - 1:
+                break
+            segment_index += 1
+            offset = 0
+        return records, SpillCursor(segment_index=segment_index, offset=offset)
+
+    def _commit(self, cursor: SpillCursor) -> None:
+        for consumed_segment in self._segments[:cursor.segment_index]:
+            self._remove(consumed_segment)
+        self._segments = self._segments[cursor.segment_index:]
+        self._read_offset = cursor.offset
+        if self._is_drained():
+            self._remove(self._segments[0])
+            self._segments = []
+            self._read_offset = 0
+        metrics.set_gauge('spill.bytes', self.size)
+
+    def _close_writer(self) -> None:
+        if self._writer is not None:
+            if self.fsync != 'never':
+                self._sync(self._writer)
+            self._writer.close()
+            self._writer = None
+
+    def _get_writer(self) -> BinaryIO:
+        """
+        Writer of the last segment, a new segment is started when it is full.
+
+        Segments left by a previous process are never appended to, their tail may be torn.
+        """
+        if self._writer is not None and not self._is_last_segment_full():
+            return self._writer
+        self._close_writer()
+        sequence = 0
+        if self._segments:
+            sequence = int(self._segments[-1].stem) + 1
+        segment = self.directory / '{sequence:020d}{suffix}'.format(sequence=sequence, suffix=SEGMENT_SUFFIX)
+        writer = segment.open('ab')
+        if self.fsync == 'always':
+            try:
+                self._sync_directory()
+            except OSError:
+                writer.close()
+                raise
+        self._writer = writer
+        self._segments.append(segment)
+        self._sizes[segment] = 0
+        return writer
+
+    def _read_segment(self, segment: Path, offset: int, limit: int) -> SegmentRead:
+        """Records of the segment from `offset` on, up to `limit` of them."""
+        records: List[EncodedEvent] = []
+        with open(segment, 'rb') as segment_file:
+            segment_file.seek(offset)
+            while len(records) < limit:
+                header = segment_file.read(RECORD_HEADER.size)
+                if not header:
+                    return SegmentRead(records, offset, reached_end=True)
+                if len(header) < RECORD_HEADER.size:
+                    return SegmentRead(records, self._skip_torn_tail(segment, offset), reached_end=True)
+                payload_length, checksum = RECORD_HEADER.unpack(header)
+                payload = segment_file.read(payload_length)
+                if len(payload) < payload_length or zlib.crc32(payload) != checksum:
+                    return SegmentRead(records, self._skip_torn_tail(segment, offset), reached_end=True)
+                records.append(EncodedEvent(*msgpack.unpackb(payload, raw=False)))
+                offset += RECORD_HEADER.size + payload_length
+        return SegmentRead(records, offset, reached_end=False)
+
+    def _skip_torn_tail(self, segment: Path, offset: int) -> int:
+        logger.warning('Skipped the torn tail of spill segment %s from offset %s', segment, offset)
+        metrics.increment('spill.corrupt')
+        return self._sizes[segment]
+
+    def _remove(self, segment: Path) -> None:
+        if self._writer is not None and segment == self._segments[-1]:
+            self._writer.close()
+            self._writer = None
+        segment.unlink(missing_ok=True)
+        self._sizes.pop(segment, None)
+
+    def _is_drained(self) -> bool:
+        """Whether the read position is at the end of the only segment left."""
+        if len(self._segments) != 1:
+            return False
+        return self._read_offset >= self._sizes[self._segments[0]]
+
+    def _is_last_segment_full(self) -> bool:
+        return self._sizes[self._segments[-1]] >= self.segment_bytes
+
+    def _is_sync_due(self) -> bool:
+        return time.monotonic() - self._synced_at >= self.fsync_interval
+
+    def _sync(self, writer: BinaryIO) -> None:
+        os.fsync(writer.fileno())
+        self._synced_at = time.monotonic()
+
+    def _sync_directory(self) -> None:
+        directory_fd = os.open(self.directory, os.O_RDONLY)
+        with ExitStack() as cleanup:
+            cleanup.callback(os.close, directory_fd)
+            os.fsync(directory_fd)
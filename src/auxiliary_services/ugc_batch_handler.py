@@ -0,0 +1,286 @@
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from motor.core import AgnosticClient
+from pymongo import UpdateOne
+
+from src.auxiliary_services.message_broker import AsyncMessageBroker
+from src.auxiliary_services.watch_progress_buffer import ProgressKey, WatchProgressBuffer
+from src.db_models.bookmark import BookmarkModel
+from src.db_models.like import LikeDocument, LikeModel, TargetType
+from src.db_models.mongo_base_model import MongoBaseModel, WriteFailures
+from src.db_models.movie_stats import MovieStatsModel
+from src.db_models.transactions import transactional
+from src.db_models.user_movie_state import UserMovieStateModel
+from src.db_models.watch_progress import WatchProgressModel
+from src.models.batch import BatchAction, BatchItemResult, BatchItemStatus, BatchRequest, BatchResponse, ToggleOperation
+from src.models.movie_progress import MovieProgress
+from src.models.user import User
+
+
+def replay_toggles(
+    operations: List[ToggleOperation],
+    existing: Set[str],
+) -> Tuple[List[BatchItemStatus], Dict[str, bool]]:
+    """
+    Replay add/remove operations in order against the stored movie ids.
+
+    Returns the status of every operation and the final presence of the movies that differ from `existing`.
+    Only the last operation of a movie that changed is applied, operations cancelled by later ones are
+    unchanged: an add then a remove of the same movie leaves it as it was.
+    """
+    present = {operation.movie_id: operation.movie_id in existing for operation in operations}
+    last_flips: Dict[str, int] = {}
+    for operation_index, operation in enumerate(operations):
+        is_adding = operation.action == BatchAction.add
+        if present[operation.movie_id] != is_adding:
+            present[operation.movie_id] = is_adding
+            last_flips[operation.movie_id] = operation_index
+    changes = {
+        movie_id: is_present
+        for movie_id, is_present in present.items()
+        if is_present != (movie_id in existing)
+    }
+    statuses = [BatchItemStatus.unchanged for _ in operations]
+    for changed_id in changes:
+        statuses[last_flips[changed_id]] = BatchItemStatus.applied
+    return statuses, changes
+
+
+def build_results(
+    movie_ids: List[str],
+    statuses: List[BatchItemStatus],
+    failed: Dict[str, str],
+) -> List[BatchItemResult]:
+    """Per-operation results, applied operations on movies whose write failed are reported as failed."""
+    item_results = []
+    for movie_id, item_status in zip(movie_ids, statuses):
+        if item_status == BatchItemStatus.applied and movie_id in failed:
+            item_results.append(
+                BatchItemResult(movie_id=movie_id, status=BatchItemStatus.failed, detail=failed[movie_id]),
+            )
+        else:
+            item_results.append(BatchItemResult(movie_id=movie_id, status=item_status))
+    return item_results
+
+
+def map_failures(movie_ids: List[str], failures: WriteFailures) -> Dict[str, str]:
+    """Error messages by movie id, `movie_ids` are in the order of the written operations."""
+    failed: Dict[str, str] = {}
+    for index, error_message in failures.items():
+        failed[movie_ids[index]] = error_message
+    return failed
+
+
+def movie_like(user_id: str, movie_id: str) -> LikeDocument:
+    return LikeDocument(user_id=user_id, target_id=movie_id, target_type=TargetType.movie)
+
+
+class ToggleWrites(NamedTuple):
+    """Outcome of the written toggles by movie id: errors of the failed ones, the new presence and counter deltas."""
+
+    failed: Dict[str, str]
+    written: Dict[str, bool]
+    deltas: Dict[str, int]
+
+
+class UgcBatchModels(NamedTuple):
+    """Collections the batch operations are written to."""
+
+    like_model: LikeModel
+    bookmark_model: BookmarkModel
+    watch_progress_model: WatchProgressModel
+
+
+class UgcBatchOptions(NamedTuple):
+    """
+    Models updated together with the UGC, the buffer watch progress goes through when it is enabled,
+    and the client of the transaction the batch runs in.
+    """
+
+    movie_stats: Optional[MovieStatsModel] = None
+    user_movie_state: Optional[UserMovieStateModel] = None
+    progress_buffer: Optional[WatchProgressBuffer] = None
+    transaction_client: Optional[AgnosticClient] = None
+
+
+class UgcBatchHandler:
+    """
+    Applies a user's batch of like, bookmark and watch progress operations.
+
+    Operations on the same movie are replayed in request order against the stored state and only the
+    net change per movie is written: upserts in one unordered bulk write per collection, removals one delete
+    each so every one reports whether it removed a document. Counters follow what the writes did,
+    user_movie_state and Kafka are updated for the operations that took effect, messages are published
+    in one batch per event type. With a transaction client the writes and the outbox events share
+    one transaction and the batch is applied as a whole: a write error fails the request, since the
+    server aborts the transaction on it. Per-operation failures are only reported without transactions.
+    """
+
+    like_event_type = 'like'
+    bookmark_event_type = 'bookmark'
+    progress_event_type = 'watch_progress'
+
+    def __init__(
+        self,
+        models: UgcBatchModels,
+        ugc_broker: AsyncMessageBroker,
+        progress_broker: AsyncMessageBroker,
+        options: UgcBatchOptions = UgcBatchOptions(),
+    ):
+        self.models = models
+        self.ugc_broker = ugc_broker
+        self.progress_broker = progress_broker
+        self.movie_stats = options.movie_stats
+        self.user_movie_state = options.user_movie_state
+        self.progress_buffer = options.progress_buffer
+        self._transaction_client = options.transaction_client
+
+    @property
+    def transaction_client(self) -> Optional[AgnosticClient]:
+        """Client of the transaction @transactional runs the batch in."""
+        return self._transaction_client
+
+    @transactional
+    async def apply(self, batch: BatchRequest, user: User) -> BatchResponse:
+        # A transaction's session runs one operation at a time, the collections are written one after another.
+        like_results = await self._apply_likes(user_id=user.id, operations=batch.likes)
+        bookmark_results = await self._apply_bookmarks(user_id=user.id, operations=batch.bookmarks)
+        progress_results = await self._apply_progress(user_id=user.id, operations=batch.progress)
+
+        batch_response = BatchResponse(likes=like_results, bookmarks=bookmark_results, progress=progress_results)
+        await self._publish(batch=batch, batch_response=batch_response, user=user)
+        return batch_response
+
+    async def _publish(self, batch: BatchRequest, batch_response: BatchResponse, user: User) -> None:
+        progress_messages = [
+            (user.id, {'movie': movie_progress.model_dump(), 'user': user.model_dump()})
+            for movie_progress, progress_result in zip(batch.progress, batch_response.progress)
+            if progress_result.status == BatchItemStatus.applied
+        ]
+        await self.ugc_broker.send_many(
+            self._toggle_messages(user.id, batch.likes, batch_response.likes), event_type=self.like_event_type,
+        )
+        await self.ugc_broker.send_many(
+            self._toggle_messages(user.id, batch.bookmarks, batch_response.bookmarks),
+            event_type=self.bookmark_event_type,
+        )
+        await self.progress_broker.send_many(progress_messages, event_type=self.progress_event_type)
+
+    async def _apply_likes(self, user_id: str, operations: List[ToggleOperation]) -> List[BatchItemResult]:
+        if not operations:
+            return []
+        movie_ids = [operation.movie_id for operation in operations]
+        like_model = self.models.like_model
+        liked_ids = await like_model.get_liked_ids(user_id, TargetType.movie, list(set(movie_ids)))
+        statuses, changes = replay_toggles(operations, liked_ids)
+        toggle_writes = await self._write_toggles(
+            model=like_model,
+            changes=changes,
+            add_operation=lambda movie_id: like_model.add_like_operation(movie_like(user_id, movie_id)),
+            remove_query=lambda movie_id: like_model.like_query(movie_like(user_id, movie_id)),
+        )
+        await self._record_changes(
+            user_id=user_id, toggle_writes=toggle_writes, counter='likes_count', state_flag='liked',
+        )
+        return build_results(movie_ids, statuses, toggle_writes.failed)
+
+    async def _apply_bookmarks(self, user_id: str, operations: List[ToggleOperation]) -> List[BatchItemResult]:
+        if not operations:
+            return []
+        movie_ids = [operation.movie_id for operation in operations]
+        bookmark_model = self.models.bookmark_model
+        bookmarked_ids = await bookmark_model.get_bookmarked_ids(user_id, list(set(movie_ids)))
+        statuses, changes = replay_toggles(operations, bookmarked_ids)
+
+        toggle_writes = await self._write_toggles(
+            model=bookmark_model,
+            changes=changes,
+            add_operation=lambda movie_id: bookmark_model.add_bookmark_operation(user_id=user_id, movie_id=movie_id),
+            remove_query=lambda movie_id: bookmark_model.bookmark_query(user_id=user_id, movie_id=movie_id),
+        )
+        await self._record_changes(
+            user_id=user_id, toggle_writes=toggle_writes, counter='bookmarks_count', state_flag='bookmarked',
+        )
+        return build_results(movie_ids, statuses, toggle_writes.failed)
+
+    async def _write_toggles(
+        self,
+        model: MongoBaseModel[Any],
+        changes: Dict[str, bool],
+        add_operation: Callable[[str], UpdateOne],
+        remove_query: Callable[[str], dict],
+    ) -> ToggleWrites:
+        """
+        Write the net changes of the toggles: adds in one bulk write, removals one delete each.
+
+        The deltas follow what the writes did rather than the state read beforehand: only an upsert that
+        inserted a document and a delete that removed one move a counter, so a like or unlike landing
+        in between does not get counted twice.
+        """
+        added_ids = [movie_id for movie_id, is_present in changes.items() if is_present]
+        removed_ids = [movie_id for movie_id, is_present in changes.items() if not is_present]
+        bulk_result, add_failures = await model.bulk_write([add_operation(movie_id) for movie_id in added_ids])
+        deleted, remove_failures = await model.delete_each([remove_query(movie_id) for movie_id in removed_ids])
+
+        failed = {**map_failures(added_ids, add_failures), **map_failures(removed_ids, remove_failures)}
+        deltas = {added_ids[index]: 1 for index in bulk_result.upserted_ids or {}}
+        deltas.update({removed_ids[index]: -1 for index in deleted})
+        written = {movie_id: is_present for movie_id, is_present in changes.items() if movie_id not in failed}
+        return ToggleWrites(failed=failed, written=written, deltas=deltas)
+
+    async def _apply_progress(self, user_id: str, operations: List[MovieProgress]) -> List[BatchItemResult]:
+        # Later checkpoints of the same movie overwrite earlier ones, only the last one is written.
+        progresses: Dict[ProgressKey, float] = {
+            (user_id, movie_progress.id): movie_progress.break_point for movie_progress in operations
+        }
+        failed: Dict[str, str] = {}
+        if self.progress_buffer is not None:
+            for (_, buffered_id), buffered_point in progresses.items():
+                self.progress_buffer.put(user_id=user_id, movie_id=buffered_id, break_point=buffered_point)
+        elif progresses:
+            watch_progress_model = self.models.watch_progress_model
+            writes = [
+                watch_progress_model.update_progress_operation(user_id, movie_id, break_point)
+                for (_, movie_id), break_point in progresses.items()
+            ]
+            movie_ids = [movie_id for _, movie_id in progresses]
+            _, progress_failures = await watch_progress_model.bulk_write(writes)
+            failed = map_failures(movie_ids, progress_failures)
+            if self.user_movie_state is not None:
+                written = {
+                    progress_key: break_point
+                    for progress_key, break_point in progresses.items()
+                    if progress_key[1] not in failed
+                }
+                await self.user_movie_state.bulk_set_progress(written)
+        # Checkpoints are never no-ops, each one is applied unless its write failed.
+        operation_ids = [movie_progress.id for movie_progress in operations]
+        return build_results(operation_ids, [BatchItemStatus.applied for _ in operation_ids], failed)
+
+    async def _record_changes(
+        self,
+        user_id: str,
+        toggle_writes: ToggleWrites,
+        counter: str,
+        state_flag: str,
+    ) -> None:
+        if self.movie_stats is not None:
+            await self.movie_stats.bulk_increment(counter=counter, deltas=toggle_writes.deltas)
+        if self.user_movie_state is not None:
+            await self.user_movie_state.bulk_set_flag(
+                user_id=user_id, flag=state_flag, flag_values=toggle_writes.written,
+            )
+
+    def _toggle_messages(
+        self,
+        user_id: str,
+        operations: List[ToggleOperation],
+        item_results: List[BatchItemResult],
+    ) -> List[Tuple[str, dict]]:
+        messages = []
+        for operation, item_result in zip(operations, item_results):
+            if item_result.status == BatchItemStatus.applied:
+                is_adding = operation.action == BatchAction.add
+                message = {'user_id': user_id, 'target_id': operation.movie_id, 'is_adding': is_adding}
+                messages.append((user_id, message))
+        return messages
@@ -1,17 +1,31 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import AsyncIterator, List, NamedTuple, Optional, Tuple
 
+from bson import ObjectId
 from fastapi import HTTPException, status
+from motor.core import AgnosticClient
 
 from src.auxiliary_services.message_broker import AsyncMessageBroker
 from src.db_models.bookmark import BookmarkModel
 from src.db_models.like import LikeDocument, LikeModel, TargetType
+from src.db_models.movie_stats import MovieStatsModel
 from src.db_models.review import ReviewDocument, ReviewModel
+from src.db_models.transactions import transactional
+from src.db_models.user_movie_state import UserMovieStateModel
+
+
+class UgcHandlerOptions(NamedTuple):
+    """Models updated together with the UGC itself, and the client of the transaction they all share."""
+
+    movie_stats: Optional[MovieStatsModel] = None
+    user_movie_state: Optional[UserMovieStateModel] = None
+    transaction_client: Optional[AgnosticClient] = None
 
 
 class UgcHandler(ABC):
-    def __init__(self, message_broker: AsyncMessageBroker):
+    def __init__(self, message_broker: AsyncMessageBroker, transaction_client: Optional[AgnosticClient] = None):
         self.message_broker = message_broker
+        self.transaction_client = transaction_client
 
     @abstractmethod
     async def add_ugc_content(self, target_id: str, user_id: str, additional: str | None = None) -> None:
@@ -23,14 +37,26 @@ class UgcHandler(ABC):
 
 
 class BookmarkUgcHandler(UgcHandler):
-    key = 'bookmark'
-
-    def __init__(self, collection: BookmarkModel, message_broker: AsyncMessageBroker):
+    event_type = 'bookmark'
+
+    def __init__(
+        self,
+        collection: BookmarkModel,
+        message_broker: AsyncMessageBroker,
+        options: UgcHandlerOptions = UgcHandlerOptions(),
+    ):
         self.collection = collection
-        super().__init__(message_broker)
+        self.movie_stats = options.movie_stats
+        self.user_movie_state = options.user_movie_state
+        super().__init__(message_broker, options.transaction_client)
 
+    @transactional
     async def add_ugc_content(self, target_id: str, user_id: str, additional: str | None = None) -> None:
-        await self.collection.add_bookmark(user_id=user_id, movie_id=target_id)
+        bookmark_added = await self.collection.add_bookmark(user_id=user_id, movie_id=target_id)
+        if bookmark_added and self.movie_stats is not None:
+            await self.movie_stats.increment(movie_id=target_id, bookmarks=1)
+        if self.user_movie_state is not None:
+            await self.user_movie_state.set_bookmarked(user_id=user_id, movie_id=target_id, bookmarked=True)
 
         message_to_send = {
             'user_id': user_id,
@@ -38,10 +64,15 @@ class BookmarkUgcHandler(UgcHandler):
             'is_adding': True,
         }
 
-        await self.message_broker.send(key=self.key, message=message_to_send)
+        await self.message_broker.send(key=user_id, message=message_to_send, event_type=self.event_type)
 
+    @transactional
     async def delete_ugc_content(self, target_id: str, user_id: str, additional: str | None = None) -> None:
-        await self.collection.remove_bookmark(user_id=user_id, movie_id=target_id)
+        bookmark_removed = await self.collection.remove_bookmark(user_id=user_id, movie_id=target_id)
+        if bookmark_removed and self.movie_stats is not None:
+            await self.movie_stats.increment(movie_id=target_id, bookmarks=-1)
+        if bookmark_removed and self.user_movie_state is not None:
+            await self.user_movie_state.set_bookmarked(user_id=user_id, movie_id=target_id, bookmarked=False)
 
         message_to_send = {
             'user_id': user_id,
@@ -49,50 +80,88 @@ class BookmarkUgcHandler(UgcHandler):
             'is_adding': False,
         }
 
-        await self.message_broker.send(key=self.key, message=message_to_send)
+        await self.message_broker.send(key=user_id, message=message_to_send, event_type=self.event_type)
 
 
 class LikeUgcHandler(UgcHandler):
-    key = 'like'
-
-    def __init__(self, collection: LikeModel, message_broker: AsyncMessageBroker, target_type: TargetType):
-        super().__init__(message_broker)
+    event_type = 'like'
+
+    def __init__(
+        self,
+        collection: LikeModel,
+        message_broker: AsyncMessageBroker,
+        target_type: TargetType,
+        options: UgcHandlerOptions = UgcHandlerOptions(),
+    ):
+        super().__init__(message_broker, options.transaction_client)
         self.collection = collection
         self.target_type = target_type
+        # Only likes of movies are counted in movie_stats and tracked in user_movie_state.
+        is_movie_like = target_type == TargetType.movie
+        self.movie_stats = options.movie_stats if is_movie_like else None
+        self.user_movie_state = options.user_movie_state if is_movie_like else None
 
+    @transactional
     async def add_ugc_content(self, target_id: str, user_id: str, additional: str | None = None) -> None:
         like_document = LikeDocument(target_id=target_id, user_id=user_id, target_type=self.target_type)
-        await self.collection.add_like(like_document)
+        like_added = await self.collection.add_like(like_document)
+        if like_added and self.movie_stats is not None:
+            await self.movie_stats.increment(movie_id=target_id, likes=1)
+        if self.user_movie_state is not None:
+            await self.user_movie_state.set_liked(user_id=user_id, movie_id=target_id, liked=True)
 
         message_to_send = {
             'user_id': user_id,
             'target_id': target_id,
             'is_adding': True,
         }
-        await self.message_broker.send(key=self.key, message=message_to_send)
+        await self.message_broker.send(key=user_id, message=message_to_send, event_type=self.event_type)
 
+    @transactional
     async def delete_ugc_content(self, target_id: str, user_id: str, additional: str | None = None) -> None:
         like_document = LikeDocument(target_id=target_id, user_id=user_id, target_type=self.target_type)
-        await self.collection.remove_like(like_document)
+        like_removed = await self.collection.remove_like(like_document)
+        if like_removed and self.movie_stats is not None:
+            await self.movie_stats.increment(movie_id=target_id, likes=-1)
+        if like_removed and self.user_movie_state is not None:
+            await self.user_movie_state.set_liked(user_id=user_id, movie_id=target_id, liked=False)
 
         message_to_send = {
             'user_id': user_id,
             'target_id': target_id,
             'is_adding': False,
         }
-        await self.message_broker.send(key=self.key, message=message_to_send)
+        await self.message_broker.send(key=user_id, message=message_to_send, event_type=self.event_type)
+
+    async def get_likes_page(
+        self,
+        target_id: str,
+        page_limit: int,
+        after: Optional[ObjectId] = None,
+    ) -> Tuple[List[LikeDocument], Optional[ObjectId]]:
+        return await self.collection.get_target_likes_page(
+            target_id=target_id, target_type=self.target_type, limit=page_limit, after=after,
+        )
 
-    async def find_ugc_content(self, target_id: str) -> List[LikeDocument]:
-        return await self.collection.find({'target_id': target_id})
+    def stream_likes(self, target_id: str, batch_size: int) -> AsyncIterator[LikeDocument]:
+        return self.collection.iterate_target_likes(
+            target_id=target_id, target_type=self.target_type, batch_size=batch_size,
+        )
 
 
 class ReviewUgcHandler(UgcHandler):
-    key = 'review'
-
-    def __init__(self, collection: ReviewModel, message_broker: AsyncMessageBroker):
-        super().__init__(message_broker)
+    event_type = 'review'
+
+    def __init__(
+        self,
+        collection: ReviewModel,
+        message_broker: AsyncMessageBroker,
+        transaction_client: Optional[AgnosticClient] = None,
+    ):
+        super().__init__(message_broker, transaction_client)
         self.collection = collection
 
+    @transactional
     async def add_ugc_content(self, target_id: str, user_id: str, additional: str | None = None) -> None:
         if additional is None:
             raise HTTPException(status_code=status.HTTP_406_NOT_ACCEPTABLE, detail='text of review cannot be empty')
@@ -105,8 +174,9 @@ class ReviewUgcHandler(UgcHandler):
             'is_adding': True,
             'additional': additional,
         }
-        await self.message_broker.send(key=self.key, message=message_to_send)
+        await self.message_broker.send(key=user_id, message=message_to_send, event_type=self.event_type)
 
+    @transactional
     async def delete_ugc_content(self, target_id: str, user_id: str, additional: str | None = None) -> None:
         await self.collection.remove_review(review_id=target_id)
 
@@ -116,8 +186,9 @@ class ReviewUgcHandler(UgcHandler):
             'is_adding': False,
             'additional': additional,
         }
-        await self.message_broker.send(key=self.key, message=message_to_send)
+        await self.message_broker.send(key=user_id, message=message_to_send, event_type=self.event_type)
 
+    @transactional
     async def update_ugc_content(self, review_id: str, user_id: str, additional: str | None) -> None:
         if additional is None:
             raise HTTPException(status_code=status.HTTP_406_NOT_ACCEPTABLE, detail='text of review cannot be empty')
@@ -136,7 +207,15 @@ class ReviewUgcHandler(UgcHandler):
             'is_adding': True,
             'additional': additional,
         }
-        await self.message_broker.send(key=self.key, message=message_to_send)
-
-    async def get_movie_reviews(self, movie_id: str) -> List[ReviewDocument]:
-        return await self.collection.get_reviews_by_movie(movie_id=movie_id)
+        await self.message_broker.send(key=user_id, message=message_to_send, event_type=self.event_type)
+
+    async def get_reviews_page(
+        self,
+        movie_id: str,
+        page_limit: int,
+        after: Optional[ObjectId] = None,
+    ) -> Tuple[List[ReviewDocument], Optional[ObjectId]]:
+        return await self.collection.get_reviews_page(movie_id=movie_id, limit=page_limit, after=after)
+
+    def stream_reviews(self, movie_id: str, batch_size: int) -> AsyncIterator[ReviewDocument]:
+        return self.collection.iterate_reviews(movie_id=movie_id, batch_size=batch_size)
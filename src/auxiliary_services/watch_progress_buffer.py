@@ -0,0 +1,142 @@
+import asyncio
+import logging
+from contextlib import suppress
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+
+from src.core.metrics import metrics
+from src.db_models.user_movie_state import UserMovieStateModel
+from src.db_models.watch_progress import WatchProgressDocument, WatchProgressModel
+
+logger = logging.getLogger(__name__)
+
+ProgressKey = Tuple[str, str]
+
+# While writes fail, up to this many flush thresholds of checkpoints are kept for the next flush.
+MAX_BUFFERED_THRESHOLDS = 10
+
+
+class WatchProgressBuffer:
+    """
+    Write-behind buffer for watch progress checkpoints.
+
+    Only the latest break point per (user, movie) is kept. Buffered values reach Mongo every
+    `flush_interval` seconds, or sooner once `flush_threshold` pairs are waiting, in one
+    unordered bulk write. Reads through get_progress see buffered values before Mongo does, as long
+    as they are served by the same worker: the buffer lives in the worker's memory.
+
+    Checkpoints of a failed flush are kept for the next one, up to MAX_BUFFERED_THRESHOLDS times
+    `flush_threshold` pairs: beyond that the oldest ones are dropped, so an outage of Mongo does
+    not grow the buffer without limit.
+    """
+
+    def __init__(
+        self,
+        watch_progress_model: WatchProgressModel,
+        user_movie_state: Optional[UserMovieStateModel] = None,
+        flush_interval: float = 5,
+        flush_threshold: int = 1000,
+    ):
+        self.watch_progress_model = watch_progress_model
+        self.user_movie_state = user_movie_state
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.max_buffered = flush_threshold * MAX_BUFFERED_THRESHOLDS
+        self._pending: Dict[ProgressKey, float] = {}
+        self._flushing: Dict[ProgressKey, float] = {}
+        self._flush_lock = asyncio.Lock()
+        self._threshold_reached = asyncio.Event()
+        self._flush_loop: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._flush_loop = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop the periodic flushes and write out everything still buffered."""
+        if self._flush_loop is not None:
+            self._flush_loop.cancel()
+            await asyncio.gather(self._flush_loop, return_exceptions=True)
+        await self.flush()
+
+    def put(self, user_id: str, movie_id: str, break_point: float) -> None:
+        # Pending checkpoints stay ordered from the least to the most recently updated.
+        self._pending.pop((user_id, movie_id), None)
+        self._pending[(user_id, movie_id)] = break_point
+        metrics.increment('watch_progress.checkpoints')
+        metrics.set_gauge('watch_progress.buffered', len(self._pending))
+        if len(self._pending) >= self.flush_threshold:
+            self._threshold_reached.set()
+
+    def get_buffered(self, user_id: str, movie_ids: List[str]) -> Dict[str, float]:
+        """Buffered break points of the user's movies that Mongo may not have yet."""
+        buffered = {}
+        for movie_id in movie_ids:
+            break_point = self._get_buffered(user_id, movie_id)
+            if break_point is not None:
+                buffered[movie_id] = break_point
+        return buffered
+
+    def get_user_buffered(self, user_id: str) -> Dict[str, float]:
+        """All buffered break points of the user by movie id, a scan of at most `max_buffered` pairs."""
+        buffered = {}
+        all_buffered = {**self._flushing, **self._pending}
+        for (buffered_user_id, movie_id), break_point in all_buffered.items():
+            if buffered_user_id == user_id:
+                buffered[movie_id] = break_point
+        return buffered
+
+    async def get_progress(self, user_id: str, movie_id: str) -> Optional[WatchProgressDocument]:
+        break_point = self._get_buffered(user_id, movie_id)
+        if break_point is None:
+            return await self.watch_progress_model.get_progress(user_id=user_id, movie_id=movie_id)
+        return WatchProgressDocument(user_id=user_id, movie_id=movie_id, progress=break_point)
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            self._threshold_reached.clear()
+            if not self._pending:
+                return
+            self._flushing = self._pending
+            self._pending = {}
+            try:
+                await self.watch_progress_model.bulk_update_progress(self._flushing)
+                if self.user_movie_state is not None:
+                    await self.user_movie_state.bulk_set_progress(self._flushing)
+            except Exception:
+                logger.warning('Could not flush %s watch progresses', len(self._flushing), exc_info=True)
+                self._keep_failed(self._flushing)
+            else:
+                metrics.increment('watch_progress.flushed', len(self._flushing))
+            finally:
+                self._flushing = {}
+                metrics.set_gauge('watch_progress.buffered', len(self._pending))
+
+    def _keep_failed(self, failed: Dict[ProgressKey, float]) -> None:
+        # Checkpoints that arrived during the flush are newer than the failed ones.
+        kept = dict(failed)
+        for key, break_point in self._pending.items():
+            kept.pop(key, None)
+            kept[key] = break_point
+        self._pending = kept
+        overflow = len(self._pending) - self.max_buffered
+        if overflow > 0:
+            for oldest_key in list(islice(self._pending, overflow)):
+                self._pending.pop(oldest_key)
+            logger.error('Dropped %s buffered watch progresses', overflow)
+            metrics.increment('watch_progress.dropped', overflow)
+
+    def _get_buffered(self, user_id: str, movie_id: str) -> Optional[float]:
+        key = (user_id, movie_id)
+        break_point = self._pending.get(key)
+        if break_point is None:
+            return self._flushing.get(key)
+        return break_point
+
+    async def _run(self) -> None:
+        while True:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._threshold_reached.wait(), timeout=self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception('Watch progress flush failed')
@@ -3,6 +3,7 @@ from functools import wraps
 
 from aiokafka.errors import KafkaError
 from bson.errors import InvalidId
+from fastapi import HTTPException
 
 from src.core.exceptions import KafkaException, OtherException, UserDataException
 
@@ -10,6 +11,12 @@ logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 
+def reraise_http_exception(error: Exception) -> None:
+    """HTTP-ошибки обработчиков (например 404 неизвестного фильма) пропускаются как есть."""
+    if isinstance(error, HTTPException):
+        raise error
+
+
 def catch_broker_exceptions(func):
     """Отлавливание исключений брокера."""
     @wraps(func)
@@ -22,6 +29,7 @@ def catch_broker_exceptions(func):
         except KafkaError:
             raise KafkaException('Kafka error')
         except Exception as e:
+            reraise_http_exception(e)
             raise OtherException(f'{e.__class__.__name__} - {e.args[0]}')
     return catch_broker_exceptions_wrapper
 
@@ -38,6 +46,7 @@ def catch_collection_exceptions(func):
         except InvalidId:
             raise UserDataException('User id is not valid')
         except Exception as e:
+            reraise_http_exception(e)
             raise OtherException(f'{e.__class__.__name__} - {e.args[0]}')
     return catch_collection_exceptions_wrapper
 
@@ -56,5 +65,6 @@ def catch_collection_broker_exceptions(func):
         except KafkaError:
             raise KafkaException('Kafka error')
         except Exception as e:
+            reraise_http_exception(e)
             raise OtherException(f'{e.__class__.__name__} - {e.args[0]}')
     return catch_collection_broker_exceptions_wrapper
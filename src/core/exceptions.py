@@ -25,3 +25,9 @@ class OtherException(CustomException):
     """Other exception."""
 
     status_code = status.HTTP_506_VARIANT_ALSO_NEGOTIATES
+
+
+class EventQueueOverloadedException(CustomException):
+    """Event queue is full."""
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
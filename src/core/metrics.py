@@ -0,0 +1,64 @@
+"""Per-worker in-memory counters, gauges and timings."""
+from collections import defaultdict, deque
+from typing import Deque, Dict
+
+TIMING_RESERVOIR_SIZE = 1024
+MEDIAN_RANK = 50
+TAIL_RANK = 99
+
+
+def _percentile(samples: list, rank: float) -> float:
+    ordered = sorted(samples)
+    last_index = len(ordered) - 1
+    return ordered[min(last_index, round(rank / 100 * last_index))]
+
+
+class MetricsRegistry:
+    def __init__(self, reservoir_size: int = TIMING_RESERVOIR_SIZE):
+        self.reservoir_size = reservoir_size
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._gauges: Dict[str, float] = {}
+        self._timings: Dict[str, Deque[float]] = {}
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        self._counters[name] += amount
+
+    def set_gauge(self, name: str, level: float) -> None:
+        self._gauges[name] = level
+
+    def observe(self, name: str, sample: float) -> None:
+        if name not in self._timings:
+            self._timings[name] = deque(maxlen=self.reservoir_size)
+        self._timings[name].append(sample)
+
+    def counter(self, name: str) -> int:
+        return self._counters.get(name, 0)
+
+    def hit_ratio(self, prefix: str) -> float:
+        hits = self.counter('{prefix}.hit'.format(prefix=prefix))
+        lookups = hits + self.counter('{prefix}.miss'.format(prefix=prefix))
+        return hits / lookups if lookups else 0
+
+    def snapshot(self) -> dict:
+        timings = {}
+        for timing_name, samples in self._timings.items():
+            if samples:
+                timings[timing_name] = {
+                    'count': len(samples),
+                    'p50': _percentile(list(samples), MEDIAN_RANK),
+                    'p99': _percentile(list(samples), TAIL_RANK),
+                }
+        hit_ratios = {}
+        for counter_name in self._counters:
+            if counter_name.endswith('.hit'):
+                prefix = counter_name.removesuffix('.hit')
+                hit_ratios[prefix] = self.hit_ratio(prefix)
+        return {
+            'counters': dict(self._counters),
+            'gauges': dict(self._gauges),
+            'timings': timings,
+            'hit_ratios': hit_ratios,
+        }
+
+
+metrics = MetricsRegistry()
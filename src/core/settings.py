@@ -1,8 +1,8 @@
-import json
 import os
 from pathlib import Path
+from typing import List, Literal, Optional
 
-from pydantic import Field
+from pydantic import Field, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 is_docker = os.environ.get('IS_DOCKER', False)
@@ -19,6 +19,35 @@ MONGO_PORT_DEV = 27017
 AUTH_PORT_DEV = 8000
 REDIS_PORT_DEV = 6379
 
+CACHE_READ_BATCH_SIZE = 500
+
+MONGO_STREAM_BATCH_SIZE = 500
+
+LOCAL_CACHE_MAX_ITEMS = 10000
+LOCAL_CACHE_MAX_MEGABYTES = 64
+LOCAL_CACHE_MAX_BYTES = LOCAL_CACHE_MAX_MEGABYTES * 1024 * 1024
+
+AUTH_CACHE_MAX_ITEMS = 10000
+
+AUTH_JWT_CACHE_TTL = 300
+
+HTTP_CONNECTOR_LIMIT_PER_HOST = 30
+HTTP_KEEPALIVE_TIMEOUT = 30
+HTTP_DNS_CACHE_TTL = 300
+
+MOVIE_FETCH_LOCK_TTL_MS = 3000
+MOVIE_FETCH_LOCK_POLL_INTERVAL = 0.05
+
+KAFKA_TOPIC_PARTITIONS = 12
+
+KAFKA_PUBLISHER_QUEUE_SIZE = 10000
+KAFKA_PUBLISHER_BATCH_SIZE = 500
+KAFKA_PUBLISHER_BATCH_INTERVAL = 0.05
+KAFKA_SPILL_SEGMENT_MEGABYTES = 16
+
+OUTBOX_SHARDS = 16
+OUTBOX_LEASE_TTL = 30
+
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=env_path, extra='ignore')
@@ -30,14 +59,55 @@ class Settings(BaseSettings):
     redis_host: str = Field(default='127.0.0.1')
     redis_port: int = Field(default=REDIS_PORT_DEV)
 
+    cache_read_batch_size: int = Field(default=CACHE_READ_BATCH_SIZE)
+    cache_codec: str = Field(default='orjson', examples=['orjson', 'msgpack', 'msgpack+zstd', 'msgpack+lz4'])
+
+    local_cache_enabled: bool = Field(default=True)
+    local_cache_ttl: float = Field(default=60)
+    local_cache_max_items: int = Field(default=LOCAL_CACHE_MAX_ITEMS)
+    local_cache_max_bytes: int = Field(default=LOCAL_CACHE_MAX_BYTES)
+    local_cache_invalidation_channel: str = Field(default='cache:invalidate')
+
     kafka_host: str = Field(default='kafka', examples=['localhost', 'kafka'])
     kafka_port: int = Field(default=KAFKA_PORT_DEV)
     watch_progress_topic: str = Field(default='view_progress')
     ugc_topic: str = Field(default='ugc')
+    kafka_topic_partitions: int = Field(default=KAFKA_TOPIC_PARTITIONS)
+    kafka_topic_replication_factor: int = Field(default=1)
+    kafka_compression_type: Optional[Literal['gzip', 'lz4', 'snappy', 'zstd']] = Field(default='lz4')
+    kafka_publisher_enabled: bool = Field(default=True)
+    kafka_publisher_queue_size: int = Field(default=KAFKA_PUBLISHER_QUEUE_SIZE)
+    kafka_publisher_batch_size: int = Field(default=KAFKA_PUBLISHER_BATCH_SIZE)
+    kafka_publisher_batch_interval: float = Field(default=KAFKA_PUBLISHER_BATCH_INTERVAL)
+    kafka_publisher_overflow: Literal['block', 'drop', 'shed'] = Field(default='block')
+    kafka_publisher_send_timeout: float = Field(default=5)
+    kafka_publisher_retry_interval: float = Field(default=5)
+    kafka_spill_enabled: bool = Field(default=True)
+    kafka_spill_directory: str = Field(default='spill')
+    kafka_spill_segment_bytes: int = Field(default=KAFKA_SPILL_SEGMENT_MEGABYTES * 1024 * 1024)
+    kafka_spill_max_bytes: int = Field(default=1024 * 1024 * 1024)
+    kafka_spill_fsync: Literal['always', 'interval', 'never'] = Field(default='interval')
+    kafka_spill_fsync_interval: float = Field(default=1)
+    outbox_enabled: bool = Field(default=False)
+    # Topics whose events go through the outbox, see outbox_topic_names.
+    outbox_topics: List[str] = Field(default=[])
+    outbox_shards: int = Field(default=OUTBOX_SHARDS)
+    outbox_relay_batch_size: int = Field(default=1000)
+    outbox_lease_ttl: float = Field(default=OUTBOX_LEASE_TTL)
+    outbox_poll_interval: float = Field(default=0.5)
 
     mongo_host: str = Field(default='127.0.0.1', examples=['localhost', 'mongodb'])
     mongo_port: int = Field(default=MONGO_PORT_DEV)
     mongo_database: str = Field(default='profile')
+    mongo_ensure_indexes: bool = Field(default=True)
+    mongo_stream_batch_size: int = Field(default=MONGO_STREAM_BATCH_SIZE)
+    mongo_transactions_enabled: bool = Field(default=False)
+    movie_stats_rebuild_on_startup: bool = Field(default=True)
+    user_movie_state_reads: bool = Field(default=False)
+    # The buffer is per worker: reads served by other workers miss its checkpoints until they are flushed.
+    watch_progress_buffer_enabled: bool = Field(default=False)
+    watch_progress_flush_interval: float = Field(default=5)
+    watch_progress_flush_threshold: int = Field(default=1000)
 
     token_bucket_capacity: int = Field(default=10)
     token_bucket_rate: int = Field(default=1)
@@ -48,7 +118,37 @@ class Settings(BaseSettings):
     auth_enabled: bool = Field(default=False)
     production_mode: bool = Field(default=False)
 
+    auth_mode: Literal['remote', 'jwt'] = Field(default='remote')
+    auth_jwt_public_key_path: Optional[str] = Field(default=None)
+    auth_jwks_path: Optional[str] = Field(default=None)
+    auth_jwt_algorithms: List[str] = Field(default=['RS256'])
+    auth_jwt_audience: Optional[str] = Field(default=None)
+    auth_jwt_issuer: Optional[str] = Field(default=None)
+    auth_jwt_leeway: int = Field(default=0)
+    auth_jwt_user_id_claim: str = Field(default='sub')
+    auth_jwt_cache_ttl: int = Field(default=AUTH_JWT_CACHE_TTL)
+
+    auth_cache_enabled: bool = Field(default=True)
+    auth_cache_ttl: int = Field(default=60)
+    auth_cache_negative_ttl: int = Field(default=5)
+    auth_cache_max_items: int = Field(default=AUTH_CACHE_MAX_ITEMS)
+
     movie_endpoint: str = Field(default='http://localhost:8000/api/v1/films')
+    movie_cache_soft_ttl: int = Field(default=60 * 60)
+    movie_cache_hard_ttl: int = Field(default=60 * 60 * 24 * 7)
+    movie_tombstone_ttl: int = Field(default=5 * 60)
+    movie_refresh_concurrency: int = Field(default=4)
+    movie_refresh_max_pending: int = Field(default=1000)
+    movie_fetch_lock_enabled: bool = Field(default=True)
+    movie_fetch_lock_ttl_ms: int = Field(default=MOVIE_FETCH_LOCK_TTL_MS)
+    movie_fetch_lock_wait_timeout: float = Field(default=2)
+    movie_fetch_lock_poll_interval: float = Field(default=MOVIE_FETCH_LOCK_POLL_INTERVAL)
+
+    http_connector_limit: int = Field(default=100)
+    http_connector_limit_per_host: int = Field(default=HTTP_CONNECTOR_LIMIT_PER_HOST)
+    http_keepalive_timeout: float = Field(default=HTTP_KEEPALIVE_TIMEOUT)
+    http_dns_cache_ttl: int = Field(default=HTTP_DNS_CACHE_TTL)
+    http_request_timeout: float = Field(default=10)
 
     @property
     def auth_service_url(self) -> str:
@@ -69,14 +169,35 @@ class Settings(BaseSettings):
         return {
             'bootstrap_servers': self.kafka_bootstrap_servers,
             'key_serializer': str.encode,
-            'value_serializer': lambda topic_value: json.dumps(topic_value).encode('utf-8'),
+            'compression_type': self.kafka_compression_type,
             'linger_ms': 10,
             'acks': 0,
         }
 
+    @property
+    def kafka_delivery_config(self) -> dict:
+        """Producer config for events whose delivery is awaited: acks=0 futures resolve before the broker has them."""
+        return {**self.kafka_config, 'acks': 'all', 'enable_idempotence': True}
+
     @property
     def kafka_topics(self) -> tuple:
         return self.watch_progress_topic, self.ugc_topic
 
+    @property
+    def outbox_topic_names(self) -> List[str]:
+        """Topics relayed through the outbox: outbox_topics, or ugc_topic whatever it is named when none are set."""
+        return self.outbox_topics or [self.ugc_topic]
+
+    @property
+    def kafka_topic_schemas(self) -> dict:
+        return {self.watch_progress_topic: 'watch_progress', self.ugc_topic: 'ugc_event'}
+
+    @model_validator(mode='after')
+    def check_outbox_transactions(self) -> 'Settings':
+        # Without a transaction a UGC write can commit while the insert of its outbox event fails.
+        if self.outbox_enabled and not self.mongo_transactions_enabled:
+            raise ValueError('outbox_enabled needs mongo_transactions_enabled, the outbox would lose events')
+        return self
+
 
 settings = Settings()
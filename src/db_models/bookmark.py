@@ -1,7 +1,8 @@
-from typing import Dict, List, Type
+from typing import Dict, List, Set, Tuple, Type
 
 from motor.core import AgnosticDatabase
 from pydantic import BaseModel
+from pymongo import ASCENDING, IndexModel, UpdateOne
 
 from src.db_models.mongo_base_model import MongoBaseModel
 
@@ -16,14 +17,56 @@ class BookmarkDocument(BaseModel):
 
 
 class BookmarkModel(MongoBaseModel[BookmarkDocument]):
+    indexes = [
+        IndexModel(
+            [('user_id', ASCENDING), ('movie_id', ASCENDING)],
+            name='user_movie_unique',
+            unique=True,
+            # Every bookmark has a user_id: the filter only sets the index apart from the non-unique
+            # user_movie, so both can exist while the unique one replaces it.
+            partialFilterExpression={'user_id': {'$exists': True}},
+        ),
+        IndexModel([('movie_id', ASCENDING)], name='movie'),
+        IndexModel([('user_id', ASCENDING), ('_id', ASCENDING)], name='user_order'),
+    ]
+    obsolete_indexes = ['user_movie']
+
     def __init__(self, database: AgnosticDatabase):
         super().__init__(database, 'bookmarks', BookmarkDocument.from_mongo)
 
-    async def add_bookmark(self, user_id: str, movie_id: str) -> None:
-        await self.collection.insert_one({'user_id': user_id, 'movie_id': movie_id})
+    async def add_bookmark(self, user_id: str, movie_id: str) -> bool:
+        """Store the bookmark unless the user already has it, returns whether it was inserted."""
+        update_result = await self.collection.update_one(
+            *self._upsert_arguments(user_id, movie_id), upsert=True, session=self.session,
+        )
+        return update_result.upserted_id is not None
+
+    async def remove_bookmark(self, user_id: str, movie_id: str) -> bool:
+        delete_result = await self.collection.delete_one(
+            self.bookmark_query(user_id, movie_id), session=self.session,
+        )
+        return delete_result.deleted_count != 0
+
+    def add_bookmark_operation(self, user_id: str, movie_id: str) -> UpdateOne:
+        return UpdateOne(*self._upsert_arguments(user_id, movie_id), upsert=True)
 
-    async def remove_bookmark(self, user_id: str, movie_id: str) -> None:
-        await self.collection.delete_one({'user_id': user_id, 'movie_id': movie_id})
+    def bookmark_query(self, user_id: str, movie_id: str) -> Dict:
+        return {'user_id': user_id, 'movie_id': movie_id}
+
+    async def get_bookmarked_ids(self, user_id: str, movie_ids: List[str]) -> Set[str]:
+        """Ids among `movie_ids` the user has bookmarked."""
+        query = {'user_id': user_id, 'movie_id': {'$in': movie_ids}}
+        bookmarks = self.collection.find(query, projection={'movie_id': 1})
+        return {bookmark['movie_id'] async for bookmark in bookmarks}
+
+    async def has_bookmark(self, user_id: str, movie_id: str) -> bool:
+        query = self.bookmark_query(user_id, movie_id)
+        bookmark = await self.collection.find_one(query, projection={'_id': 1})
+        return bookmark is not None
 
     async def get_user_bookmarks(self, user_id: str) -> List[BookmarkDocument]:
         return await self.find({'user_id': user_id})
+
+    def _upsert_arguments(self, user_id: str, movie_id: str) -> Tuple[Dict, Dict]:
+        bookmark_fields = {'user_id': user_id, 'movie_id': movie_id}
+        return bookmark_fields, {'$setOnInsert': bookmark_fields}
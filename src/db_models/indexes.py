@@ -0,0 +1,36 @@
+import logging
+from typing import Tuple, Type
+
+from motor.core import AgnosticDatabase
+from pymongo.errors import OperationFailure
+
+from src.db_models.bookmark import BookmarkModel
+from src.db_models.like import LikeModel
+from src.db_models.mongo_base_model import MongoBaseModel
+from src.db_models.outbox import OutboxModel
+from src.db_models.review import ReviewModel
+from src.db_models.user import UserModel
+from src.db_models.user_movie_state import UserMovieStateModel
+from src.db_models.watch_progress import WatchProgressModel
+
+MONGO_MODELS: Tuple[Type[MongoBaseModel], ...] = (
+    BookmarkModel,
+    LikeModel,
+    OutboxModel,
+    ReviewModel,
+    UserModel,
+    UserMovieStateModel,
+    WatchProgressModel,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+async def ensure_indexes(database: AgnosticDatabase) -> None:
+    for model_class in MONGO_MODELS:
+        model = model_class(database)  # type: ignore[call-arg]
+        try:
+            await model.ensure_indexes()
+        except OperationFailure:
+            logger.error('Could not drop obsolete indexes of %s', model.collection.name, exc_info=True)
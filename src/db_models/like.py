@@ -1,8 +1,10 @@
 from enum import Enum
-from typing import Dict, Type
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple, Type
 
+from bson import ObjectId
 from motor.core import AgnosticDatabase
 from pydantic import BaseModel
+from pymongo import ASCENDING, IndexModel, UpdateOne
 
 from src.db_models.mongo_base_model import MongoBaseModel
 
@@ -23,11 +25,76 @@ class LikeDocument(BaseModel):
 
 
 class LikeModel(MongoBaseModel[LikeDocument]):
+    indexes = [
+        IndexModel(
+            [('target_id', ASCENDING), ('target_type', ASCENDING), ('user_id', ASCENDING)],
+            name='target_user_unique',
+            unique=True,
+            # Every like has a user_id: the filter only sets the index apart from the non-unique
+            # target_user, so both can exist while the unique one replaces it.
+            partialFilterExpression={'user_id': {'$exists': True}},
+        ),
+        IndexModel(
+            [('user_id', ASCENDING), ('target_type', ASCENDING), ('_id', ASCENDING)],
+            name='user_target_type_order',
+        ),
+        IndexModel(
+            [('target_id', ASCENDING), ('target_type', ASCENDING), ('_id', ASCENDING)],
+            name='target_order',
+        ),
+    ]
+    obsolete_indexes = ['user_target_type', 'target_user']
+
     def __init__(self, database: AgnosticDatabase):
         super().__init__(database, 'likes', LikeDocument.from_mongo)
 
-    async def add_like(self, like_document: LikeDocument) -> None:
-        await self.collection.insert_one(like_document.model_dump())
+    async def add_like(self, like_document: LikeDocument) -> bool:
+        """Store the like unless the user already has it, returns whether it was inserted."""
+        update_result = await self.collection.update_one(
+            *self._upsert_arguments(like_document), upsert=True, session=self.session,
+        )
+        return update_result.upserted_id is not None
+
+    async def remove_like(self, like_document: LikeDocument) -> bool:
+        delete_result = await self.collection.delete_one(self.like_query(like_document), session=self.session)
+        return delete_result.deleted_count != 0
+
+    def add_like_operation(self, like_document: LikeDocument) -> UpdateOne:
+        return UpdateOne(*self._upsert_arguments(like_document), upsert=True)
+
+    def like_query(self, like_document: LikeDocument) -> Dict:
+        return like_document.model_dump(mode='json')
+
+    async def get_liked_ids(self, user_id: str, target_type: TargetType, target_ids: List[str]) -> Set[str]:
+        """Ids among `target_ids` the user has liked."""
+        query = {'target_id': {'$in': target_ids}, 'target_type': target_type.value, 'user_id': user_id}
+        likes = self.collection.find(query, projection={'target_id': 1})
+        return {like['target_id'] async for like in likes}
+
+    async def has_like(self, user_id: str, target_id: str, target_type: TargetType) -> bool:
+        like_document = LikeDocument(user_id=user_id, target_id=target_id, target_type=target_type)
+        query = self.like_query(like_document)
+        like = await self.collection.find_one(query, projection={'_id': 1})
+        return like is not None
+
+    async def get_target_likes_page(
+        self,
+        target_id: str,
+        target_type: TargetType,
+        limit: int,
+        after: Optional[ObjectId] = None,
+    ) -> Tuple[List[LikeDocument], Optional[ObjectId]]:
+        query = {'target_id': target_id, 'target_type': target_type.value}
+        return await self.find_page(query, limit=limit, after=after)
+
+    def iterate_target_likes(
+        self,
+        target_id: str,
+        target_type: TargetType,
+        batch_size: int,
+    ) -> AsyncIterator[LikeDocument]:
+        return self.iterate({'target_id': target_id, 'target_type': target_type.value}, batch_size=batch_size)
 
-    async def remove_like(self, like_document: LikeDocument) -> None:
-        await self.collection.delete_one(like_document.model_dump())
+    def _upsert_arguments(self, like_document: LikeDocument) -> Tuple[Dict, Dict]:
+        like_fields = like_document.model_dump(mode='json')
+        return like_fields, {'$setOnInsert': like_fields}
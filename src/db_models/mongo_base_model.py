@@ -1,15 +1,66 @@
-from typing import Any, Callable, Generic, List, Optional, TypeVar
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, Generic, List, Optional, TypeVar
 
-from motor.core import AgnosticDatabase
+from bson import ObjectId
+from motor.core import AgnosticClientSession, AgnosticDatabase
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import BulkWriteError, OperationFailure, WriteError
+from pymongo.results import BulkWriteResult
+
+from src.db_models.transactions import current_session
+
+logger = logging.getLogger(__name__)
 
 PydanticEntity = TypeVar('PydanticEntity')
 
+# Error messages of the failed writes by the index of their operation.
+WriteFailures = Dict[int, str]
+
+EMPTY_BULK_RESULT = {
+    'nInserted': 0, 'nUpserted': 0, 'nMatched': 0, 'nModified': 0, 'nRemoved': 0, 'upserted': [],
+}
+
 
 class MongoBaseModel(Generic[PydanticEntity]):
+    indexes: List[IndexModel] = []
+    # Names of indexes replaced by the declared ones, dropped once the declared ones exist.
+    obsolete_indexes: List[str] = []
+
     def __init__(self, database: AgnosticDatabase, collection_name: str, factory: Callable[[Any], PydanticEntity]):
         self.collection = database[collection_name]
         self.factory = factory
 
+    @property
+    def session(self) -> Optional[AgnosticClientSession]:
+        """Session of the surrounding mongo_transaction, writes of the models join it."""
+        return current_session.get()
+
+    async def ensure_indexes(self) -> bool:
+        """
+        Create the declared indexes, existing ones are left untouched, then drop the obsolete ones.
+
+        Every index is created on its own, so one that cannot be built (duplicates of a unique key,
+        a conflicting definition) does not hold back the others. Obsolete indexes are only dropped
+        once every declared index exists. Returns whether they all do.
+        """
+        all_created = True
+        for index in self.indexes:
+            try:
+                await self.collection.create_indexes([index])
+            except OperationFailure:
+                logger.error(
+                    'Could not create index %s of %s', index.document['name'], self.collection.name, exc_info=True,
+                )
+                all_created = False
+        if not all_created or not self.obsolete_indexes:
+            return all_created
+        existing_indexes = await self.collection.index_information()
+        for index_name in self.obsolete_indexes:
+            if index_name in existing_indexes:
+                await self.collection.drop_index(index_name)
+        return True
+
     async def find_one(self, query: dict) -> Optional[PydanticEntity]:
         document = await self.collection.find_one(query)
         if document is None:
@@ -20,3 +71,75 @@ class MongoBaseModel(Generic[PydanticEntity]):
         cursor = self.collection.find(query).skip(skip).limit(limit)
         documents = await cursor.to_list(length=limit)
         return [self.factory(doc) for doc in documents]
+
+    async def find_page(
+        self,
+        query: dict,
+        limit: int,
+        after: Optional[ObjectId] = None,
+    ) -> tuple[List[PydanticEntity], Optional[ObjectId]]:
+        """Up to `limit` documents in _id order after `after`, and the _id to continue from, None on the last page."""
+        if after is not None:
+            query = {**query, '_id': {'$gt': after}}
+        cursor = self.collection.find(query).sort('_id', ASCENDING).limit(limit)
+        documents = await cursor.to_list(length=limit)
+        last_id: Optional[ObjectId] = None
+        if len(documents) == limit:
+            last_id = documents[-1]['_id']
+        return [self.factory(doc) for doc in documents], last_id
+
+    async def iterate(self, query: dict, batch_size: int = 500) -> AsyncIterator[PydanticEntity]:
+        """All matching documents in _id order, fetched from the server `batch_size` at a time."""
+        cursor = self.collection.find(query).sort('_id', ASCENDING)
+        async for document in cursor.batch_size(batch_size):
+            yield self.factory(document)
+
+    async def bulk_write(self, operations: List[Any]) -> tuple[BulkWriteResult, WriteFailures]:
+        """
+        Run the operations in one unordered bulk write.
+
+        Returns the result of the operations that succeeded and the error messages of the failed ones by index.
+        Inside a transaction the first write error aborts it on the server, so the error is raised instead.
+        """
+        if not operations:
+            return BulkWriteResult(dict(EMPTY_BULK_RESULT), acknowledged=True), {}
+        try:
+            bulk_result = await self.collection.bulk_write(operations, ordered=False, session=self.session)
+        except BulkWriteError as error:
+            if self.session is not None:
+                raise
+            failures = {write_error['index']: write_error['errmsg'] for write_error in error.details['writeErrors']}
+            return BulkWriteResult(dict(error.details), acknowledged=True), failures
+        return bulk_result, {}
+
+    async def delete_each(self, queries: List[dict]) -> tuple[set[int], WriteFailures]:
+        """
+        Delete one document per query, returns the indexes of the queries that removed one and the failures.
+
+        A bulk write only reports the total of removed documents, each delete here tells whether its own
+        document was still there. Inside a transaction the deletes run one after another on its session,
+        and a failed one raises: the server has aborted the transaction.
+        """
+        if self.session is None:
+            delete_results = await asyncio.gather(
+                *(self._delete_one(query) for query in queries),
+            )
+        else:
+            delete_results = [await self._delete_one(query) for query in queries]
+        deleted = {index for index, (is_deleted, _) in enumerate(delete_results) if is_deleted}
+        failures = {
+            index: error_message
+            for index, (_, error_message) in enumerate(delete_results)
+            if error_message is not None
+        }
+        return deleted, failures
+
+    async def _delete_one(self, query: dict) -> tuple[bool, Optional[str]]:
+        """Whether the query removed a document, and the error message if the delete failed."""
+        try:
+            delete_result = await self.collection.delete_one(query, session=self.session)
+        except WriteError as error:
+            if self.session is not None:
+                raise
+            return False, str(error)
+        return delete_result.deleted_count != 0, None
@@ -0,0 +1,51 @@
+from typing import Dict, Type
+
+from motor.core import AgnosticDatabase
+from pydantic import BaseModel, Field
+from pymongo import UpdateOne
+
+from src.db_models.mongo_base_model import MongoBaseModel
+
+
+class MovieStatsDocument(BaseModel):
+    movie_id: str
+    likes_count: int = Field(default=0)
+    bookmarks_count: int = Field(default=0)
+
+    @classmethod
+    def from_mongo(cls: Type['MovieStatsDocument'], doc: Dict) -> 'MovieStatsDocument':
+        doc['movie_id'] = doc.pop('_id')
+        return cls(**doc)
+
+
+class MovieStatsModel(MongoBaseModel[MovieStatsDocument]):
+    """Per-movie counters keyed by movie id, kept up to date by the UGC handlers."""
+
+    collection_name = 'movie_stats'
+
+    def __init__(self, database: AgnosticDatabase):
+        super().__init__(database, self.collection_name, MovieStatsDocument.from_mongo)
+
+    async def increment(self, movie_id: str, likes: int = 0, bookmarks: int = 0) -> None:
+        await self.collection.update_one(
+            {'_id': movie_id},
+            {'$inc': {'likes_count': likes, 'bookmarks_count': bookmarks}},
+            upsert=True,
+            session=self.session,
+        )
+
+    async def bulk_increment(self, counter: str, deltas: Dict[str, int]) -> None:
+        """Add `deltas` keyed by movie id to one of the counters in one unordered bulk write."""
+        operations = [
+            UpdateOne({'_id': movie_id}, {'$inc': {counter: delta}}, upsert=True)
+            for movie_id, delta in deltas.items()
+        ]
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False, session=self.session)
+
+    def stats_query(self, movie_id: str) -> Dict:
+        return {'_id': movie_id}
+
+    async def get_stats(self, movie_id: str) -> MovieStatsDocument:
+        stats = await self.find_one(self.stats_query(movie_id))
+        return stats or MovieStatsDocument(movie_id=movie_id)
@@ -0,0 +1,176 @@
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from bson import ObjectId
+from motor.core import AgnosticDatabase
+from pydantic import BaseModel, Field
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from src.db_models.mongo_base_model import MongoBaseModel
+
+
+class OutboxEvent(BaseModel):
+    id: Any
+    topic: str
+    key: str
+    message: dict
+    shard: int
+    created_at: datetime
+    sequence: Optional[int] = Field(default=None)
+    event_type: Optional[str] = Field(default=None)
+
+    @classmethod
+    def from_mongo(cls: Type['OutboxEvent'], doc: Dict) -> 'OutboxEvent':
+        doc['id'] = doc.pop('_id')
+        return cls(**doc)
+
+
+class OutboxModel(MongoBaseModel[OutboxEvent]):
+    """
+    Events waiting to be relayed to Kafka, written in the transaction of the UGC change they describe.
+
+    Events are spread over `shards` by their key, so all events of a key stay in one shard and
+    a relay holding the shard publishes them in `sequence` order. The sequence is taken from the
+    shard's counter in outbox_sequences inside the writing transaction: a transaction that meets
+    the counter held by another one conflicts and is retried once it has committed, so the sequence
+    follows the commit order. _ids would not: they are made by the clients before the commit.
+    Writes to one shard are serialized by its counter, more shards spread them out.
+    """
+
+    collection_name = 'outbox'
+    sequences_collection_name = 'outbox_sequences'
+    indexes = [
+        IndexModel([('shard', ASCENDING), ('sequence', ASCENDING)], name='shard_sequence'),
+    ]
+    obsolete_indexes = ['shard_order']
+
+    def __init__(self, database: AgnosticDatabase, shards: int = 16):
+        super().__init__(database, self.collection_name, OutboxEvent.from_mongo)
+        self.sequences = database[self.sequences_collection_name]
+        self.shards = shards
+
+    def get_shard(self, key: str) -> int:
+        return zlib.crc32(key.encode()) % self.shards
+
+    async def add_events(
+        self,
+        topic: str,
+        messages: List[Tuple[str, dict]],
+        event_type: Optional[str] = None,
+    ) -> None:
+        """Insert the events, numbered in order within their shards. Has to run in the caller's transaction."""
+        shards = [self.get_shard(key) for key, _ in messages]
+        if not shards:
+            return
+        next_sequences = {}
+        for shard, shard_count in Counter(shards).items():
+            next_sequences[shard] = await self._reserve_sequences(shard, shard_count)
+        created_at = datetime.now(timezone.utc)
+        events = []
+        for (key, message), event_shard in zip(messages, shards):
+            events.append({
+                'topic': topic,
+                'key': key,
+                'message': message,
+                'event_type': event_type,
+                'shard': event_shard,
+                'sequence': next_sequences[event_shard],
+                'created_at': created_at,
+            })
+            next_sequences[event_shard] += 1
+        await self.collection.insert_many(events, ordered=True, session=self.session)
+
+    async def get_batch(self, shard: int, limit: int) -> List[OutboxEvent]:
+        """Oldest events of the shard. Published events are deleted, so the shard is always read from its start."""
+        cursor = self.collection.find({'shard': shard}).sort('sequence', ASCENDING)
+        documents = await cursor.limit(limit).to_list(length=limit)
+        return [self.factory(document) for document in documents]
+
+    async def delete_events(self, shard: int, event_ids: List[ObjectId]) -> None:
+        await self.collection.delete_many({'shard': shard, '_id': {'$in': event_ids}})
+
+    async def _reserve_sequences(self, shard: int, count: int) -> int:
+        """Take `count` numbers from the shard's counter, returns the first of them."""
+        counter = await self.sequences.find_one_and_update(
+            {'_id': shard},
+            {'$inc': {'sequence': count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+            session=self.session,
+        )
+        return counter['sequence'] - count + 1
+
+
+class OutboxLease(BaseModel):
+    shard: int
+    owner: str
+    expires_at: datetime
+
+    @classmethod
+    def from_mongo(cls: Type['OutboxLease'], doc: Dict) -> 'OutboxLease':
+        doc['shard'] = doc.pop('_id')
+        return cls(**doc)
+
+
+class OutboxLeaseModel(MongoBaseModel[OutboxLease]):
+    """
+    One lease per outbox shard: the relay allowed to publish the shard and until when.
+
+    Relays also announce themselves in outbox_relays, so a relay without any lease yet
+    counts when the others compute their fair share of the shards.
+    """
+
+    collection_name = 'outbox_leases'
+    relays_collection_name = 'outbox_relays'
+
+    def __init__(self, database: AgnosticDatabase):
+        super().__init__(database, self.collection_name, OutboxLease.from_mongo)
+        self.relays = database[self.relays_collection_name]
+
+    async def heartbeat(self, owner: str, ttl: float) -> None:
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        heartbeat = {'$set': {'expires_at': expires_at}}
+        await self.relays.update_one({'_id': owner}, heartbeat, upsert=True)
+
+    async def leave(self, owner: str) -> None:
+        await self.relays.delete_one({'_id': owner})
+
+    async def get_live_owners(self) -> List[str]:
+        query = {'expires_at': {'$gt': datetime.now(timezone.utc)}}
+        return await self.relays.distinct('_id', query)
+
+    async def get_held_shards(self, owner: str) -> List[int]:
+        query = {'owner': owner, 'expires_at': {'$gt': datetime.now(timezone.utc)}}
+        leases = self.collection.find(query)
+        return [lease['_id'] async for lease in leases]
+
+    async def acquire(self, shard: int, owner: str, ttl: float) -> bool:
+        """Take the shard if its lease is free or expired, or renew it if `owner` holds it already."""
+        now = datetime.now(timezone.utc)
+        try:
+            await self.collection.update_one(
+                {'_id': shard, '$or': [{'owner': owner}, {'expires_at': {'$lte': now}}]},
+                {'$set': {'owner': owner, 'expires_at': now + timedelta(seconds=ttl)}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # Another owner holds a live lease, the upsert tried to create a second one.
+            return False
+        return True
+
+    async def release(self, shard: int, owner: str) -> None:
+        await self.collection.update_one(
+            {'_id': shard, 'owner': owner},
+            {'$set': {'expires_at': datetime.now(timezone.utc)}},
+        )
+
+    async def renew(self, shard: int, owner: str, ttl: float) -> bool:
+        """Renew the lease `owner` holds, False when it has lost the lease meanwhile."""
+        update_result = await self.collection.update_one(
+            {'_id': shard, 'owner': owner},
+            {'$set': {'expires_at': datetime.now(timezone.utc) + timedelta(seconds=ttl)}},
+        )
+        return update_result.matched_count != 0
@@ -1,7 +1,9 @@
-from typing import Dict, List, Type
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Type
 
+from bson import ObjectId
 from motor.core import AgnosticDatabase
 from pydantic import BaseModel
+from pymongo import ASCENDING, IndexModel
 
 from src.db_models.mongo_base_model import MongoBaseModel
 
@@ -19,24 +21,38 @@ class ReviewDocument(BaseModel):
 
 
 class ReviewModel(MongoBaseModel[ReviewDocument]):
+    indexes = [
+        IndexModel([('movie_id', ASCENDING), ('_id', ASCENDING)], name='movie_order'),
+    ]
+    obsolete_indexes = ['movie']
+
     def __init__(self, database: AgnosticDatabase):
         super().__init__(database, 'reviews', ReviewDocument.from_mongo)
 
     async def add_review(self, user_id: str, movie_id: str, review: str) -> ReviewDocument:
         insert_dict = {'user_id': user_id, 'movie_id': movie_id, 'review': review}
-        inserted = await self.collection.insert_one(insert_dict)
+        inserted = await self.collection.insert_one(insert_dict, session=self.session)
         return ReviewDocument(id=inserted.inserted_id, user_id=user_id, movie_id=movie_id, review=review)
 
     async def remove_review(self, review_id: str) -> None:
-        await self.collection.delete_one({'_id': review_id})  # Assuming there's an 'id' field
+        await self.collection.delete_one({'_id': review_id}, session=self.session)  # Assuming there's an 'id' field
+
+    async def get_reviews_page(
+        self,
+        movie_id: str,
+        limit: int,
+        after: Optional[ObjectId] = None,
+    ) -> Tuple[List[ReviewDocument], Optional[ObjectId]]:
+        return await self.find_page({'movie_id': movie_id}, limit=limit, after=after)
 
-    async def get_reviews_by_movie(self, movie_id: str) -> List[ReviewDocument]:
-        return await self.find({'movie_id': movie_id})
+    def iterate_reviews(self, movie_id: str, batch_size: int) -> AsyncIterator[ReviewDocument]:
+        return self.iterate({'movie_id': movie_id}, batch_size=batch_size)
 
     async def update_review(self, review_id: str, user_id: str, new_review_content: str) -> bool:
         update_result = await self.collection.update_one(
             {'_id': review_id},
             {'$set': {'review': new_review_content}},
+            session=self.session,
         )
 
         return update_result.modified_count != 0
@@ -0,0 +1,80 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial, wraps
+from typing import Any, Awaitable, Callable, Iterator, List, Optional, TypeVar, cast
+
+from motor.core import AgnosticClient, AgnosticClientSession
+
+TransactionalMethod = TypeVar('TransactionalMethod', bound=Callable[..., Awaitable[Any]])
+TransactionResult = TypeVar('TransactionResult')
+DeferredAction = Callable[[], Awaitable[Any]]
+DeferredActions = List[DeferredAction]
+
+current_session: ContextVar[Optional[AgnosticClientSession]] = ContextVar('current_session', default=None)
+# Actions of the surrounding transaction that run once it commits.
+deferred_actions: ContextVar[Optional[DeferredActions]] = ContextVar('deferred_actions', default=None)
+
+
+async def mongo_transaction(
+    client: Optional[AgnosticClient],
+    callback: Callable[[], Awaitable[TransactionResult]],
+) -> TransactionResult:
+    """
+    Run the callback in one transaction, model writes pick the session up from `current_session`.
+
+    The transaction goes through `with_transaction`: on TransientTransactionError, such as the write
+    conflicts of concurrent $inc on the same movie_stats document, the callback runs again, and an
+    UnknownTransactionCommitResult commit is retried. Actions passed to `after_commit` run once the
+    transaction has committed, those of retried attempts are discarded. Without a client, or inside
+    a transaction already, the callback runs as is.
+    """
+    if client is None or current_session.get() is not None:
+        return await callback()
+    actions: List[DeferredAction] = []
+    async with await client.start_session() as session:
+        with _joined_session(session, actions):
+            attempt = partial(_run_attempt, callback, actions)
+            transaction_result: TransactionResult = await session.with_transaction(attempt)
+    for action in actions:
+        await action()
+    return transaction_result
+
+
+async def after_commit(action: DeferredAction) -> None:
+    """Run the action once the surrounding transaction commits, at once outside of one."""
+    actions = deferred_actions.get()
+    if actions is None:
+        await action()
+    else:
+        actions.append(action)
+
+
+@contextmanager
+def _joined_session(session: AgnosticClientSession, actions: List[DeferredAction]) -> Iterator[None]:
+    session_token = current_session.set(session)
+    actions_token = deferred_actions.set(actions)
+    try:
+        yield
+    finally:
+        deferred_actions.reset(actions_token)
+        current_session.reset(session_token)
+
+
+async def _run_attempt(
+    callback: Callable[[], Awaitable[TransactionResult]],
+    actions: List[DeferredAction],
+    session: AgnosticClientSession,
+) -> TransactionResult:
+    """One attempt of the transaction, `with_transaction` passes the session models already see."""
+    # Actions deferred by an attempt that was aborted must not run.
+    actions.clear()
+    return await callback()
+
+
+def transactional(method: TransactionalMethod) -> TransactionalMethod:
+    """Run the method in a transaction of its object's `transaction_client`, keeping the method's signature."""
+
+    @wraps(method)
+    async def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+        return await mongo_transaction(self.transaction_client, lambda: method(self, *args, **kwargs))
+    return cast(TransactionalMethod, wrapper)
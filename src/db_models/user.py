@@ -26,13 +26,14 @@ class UserModel(MongoBaseModel[UserDocument]):
 
     async def create_user(self, user_document: UserDocument) -> None:
         user_dict = user_document.model_dump(by_alias=True, exclude={'id'}, exclude_none=True)
-        await self.collection.insert_one(user_dict)
+        await self.collection.insert_one(user_dict, session=self.session)
 
     async def update_user(self, user_id: str, update_data: UserUpdate) -> None:
         await self.collection.update_one(
             {'_id': ObjectId(user_id)},
             {'$set': update_data.model_dump(exclude_unset=True)},
             upsert=True,
+            session=self.session,
         )
 
     async def get_user(self, user_id: str) -> Optional[UserDocument]:
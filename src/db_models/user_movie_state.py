@@ -0,0 +1,93 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple, Type
+
+from motor.core import AgnosticDatabase
+from pydantic import BaseModel, Field
+from pymongo import ASCENDING, IndexModel, UpdateOne
+
+from src.db_models.mongo_base_model import MongoBaseModel
+
+
+class UserMovieStateDocument(BaseModel):
+    user_id: str
+    movie_id: str
+    liked: bool = Field(default=False)
+    bookmarked: bool = Field(default=False)
+    watched: bool = Field(default=False)
+    progress: float = Field(default=0)
+    last_activity: Optional[datetime] = Field(default=None)
+
+    @classmethod
+    def from_mongo(cls: Type['UserMovieStateDocument'], doc: Dict) -> 'UserMovieStateDocument':
+        return cls(**doc)
+
+
+class UserMovieStateModel(MongoBaseModel[UserMovieStateDocument]):
+    """
+    Read model with one document per (user, movie): what the user did with the movie.
+
+    Written next to likes, bookmarks and watch_progress by their handlers, so collection
+    pages are range scans of the (user_id, <flag>, _id) indexes without joins.
+    """
+
+    collection_name = 'user_movie_state'
+    indexes = [
+        IndexModel([('user_id', ASCENDING), ('movie_id', ASCENDING)], name='user_movie', unique=True),
+        IndexModel([('user_id', ASCENDING), ('liked', ASCENDING), ('_id', ASCENDING)], name='user_liked'),
+        IndexModel([('user_id', ASCENDING), ('bookmarked', ASCENDING), ('_id', ASCENDING)], name='user_bookmarked'),
+        IndexModel([('user_id', ASCENDING), ('watched', ASCENDING), ('_id', ASCENDING)], name='user_watched'),
+    ]
+
+    def __init__(self, database: AgnosticDatabase):
+        super().__init__(database, self.collection_name, UserMovieStateDocument.from_mongo)
+
+    async def set_liked(self, user_id: str, movie_id: str, liked: bool) -> None:
+        await self._update(user_id=user_id, movie_id=movie_id, changes={'liked': liked})
+
+    async def set_bookmarked(self, user_id: str, movie_id: str, bookmarked: bool) -> None:
+        await self._update(user_id=user_id, movie_id=movie_id, changes={'bookmarked': bookmarked})
+
+    async def set_progress(self, user_id: str, movie_id: str, progress: float) -> None:
+        changes = {'progress': progress, 'watched': True}
+        await self._update(user_id=user_id, movie_id=movie_id, changes=changes)
+
+    async def bulk_set_flag(self, user_id: str, flag: str, flag_values: Dict[str, bool]) -> None:
+        """Set `flag` of the user's movies to `flag_values` keyed by movie id in one unordered bulk write."""
+        updates = [
+            self._build_update(user_id=user_id, movie_id=movie_id, changes={flag: flag_value})
+            for movie_id, flag_value in flag_values.items()
+        ]
+        operations = [UpdateOne(query, update, upsert=True) for query, update in updates]
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False, session=self.session)
+
+    async def bulk_set_progress(self, progresses: Dict[Tuple[str, str], float]) -> None:
+        """Record the progresses keyed by (user_id, movie_id) in one unordered bulk write."""
+        updates = [
+            self._build_update(user_id=user_id, movie_id=movie_id, changes={'progress': progress, 'watched': True})
+            for (user_id, movie_id), progress in progresses.items()
+        ]
+        operations = [UpdateOne(query, update, upsert=True) for query, update in updates]
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False, session=self.session)
+
+    async def get_state(self, user_id: str, movie_id: str) -> Optional[UserMovieStateDocument]:
+        return await self.find_one({'user_id': user_id, 'movie_id': movie_id})
+
+    async def _update(self, user_id: str, movie_id: str, changes: Dict[str, Any]) -> None:
+        await self.collection.update_one(
+            *self._build_update(user_id, movie_id, changes), upsert=True, session=self.session,
+        )
+
+    def _build_update(
+        self,
+        user_id: str,
+        movie_id: str,
+        changes: Dict[str, Any],
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Filter and update that apply `changes`, creating the state with defaults if needed."""
+        defaults = UserMovieStateDocument(user_id=user_id, movie_id=movie_id).model_dump(
+            exclude={'user_id', 'movie_id', 'last_activity', *changes},
+        )
+        update = {'$set': {**changes, 'last_activity': datetime.now(timezone.utc)}, '$setOnInsert': defaults}
+        return {'user_id': user_id, 'movie_id': movie_id}, update
@@ -1,7 +1,8 @@
-from typing import Dict, List, Optional, Type
+from typing import Dict, List, Optional, Tuple, Type
 
 from motor.core import AgnosticDatabase
 from pydantic import BaseModel
+from pymongo import ASCENDING, IndexModel, UpdateOne
 
 from src.db_models.mongo_base_model import MongoBaseModel
 
@@ -17,16 +18,39 @@ class WatchProgressDocument(BaseModel):
 
 
 class WatchProgressModel(MongoBaseModel[WatchProgressDocument]):
+    indexes = [
+        IndexModel([('user_id', ASCENDING), ('movie_id', ASCENDING)], name='user_movie', unique=True),
+        IndexModel([('movie_id', ASCENDING)], name='movie'),
+        IndexModel([('user_id', ASCENDING), ('_id', ASCENDING)], name='user_order'),
+    ]
+
     def __init__(self, database: AgnosticDatabase):
         super().__init__(database, 'watch_progress', WatchProgressDocument.from_mongo)
 
     async def update_progress(self, user_id: str, movie_id: str, break_point: float) -> None:
-        query = {'user_id': user_id, 'movie_id': movie_id}
         update_data = {'$set': {'progress': break_point}}
-        await self.collection.update_one(query, update_data, upsert=True)
+        await self.collection.update_one(
+            self.progress_query(user_id, movie_id), update_data, upsert=True, session=self.session,
+        )
+
+    def update_progress_operation(self, user_id: str, movie_id: str, break_point: float) -> UpdateOne:
+        update_data = {'$set': {'progress': break_point}}
+        return UpdateOne(self.progress_query(user_id, movie_id), update_data, upsert=True)
+
+    def progress_query(self, user_id: str, movie_id: str) -> Dict:
+        return {'user_id': user_id, 'movie_id': movie_id}
+
+    async def bulk_update_progress(self, progresses: Dict[Tuple[str, str], float]) -> None:
+        """Upsert the break points keyed by (user_id, movie_id) in one unordered bulk write."""
+        operations = [
+            self.update_progress_operation(user_id, movie_id, break_point)
+            for (user_id, movie_id), break_point in progresses.items()
+        ]
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False, session=self.session)
 
     async def get_progress(self, user_id: str, movie_id: str) -> Optional[WatchProgressDocument]:
-        return await self.find_one({'user_id': user_id, 'movie_id': movie_id})
+        return await self.find_one(self.progress_query(user_id, movie_id))
 
     async def get_all_progresses(self, user_id: str) -> List[WatchProgressDocument]:
         return await self.find({'user_id': user_id})
@@ -1,10 +1,14 @@
 from fastapi import Request
 
+from src.auxiliary_services.auth_cache import CachedAuthValidator
+from src.auxiliary_services.jwt_verifier import JwtVerifier
 from src.core.settings import settings
 from src.external_api.auth import AuthApi
 from src.models.user import User
 
-auth_api: AuthApi | None
+auth_api: AuthApi | None = None
+auth_validator: CachedAuthValidator | None = None
+jwt_verifier: JwtVerifier | None = None
 
 
 def get_user_from_request_state(request: Request) -> User:
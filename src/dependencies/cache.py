@@ -0,0 +1,11 @@
+import asyncio
+from typing import Optional
+
+from src.auxiliary_services.cache_service import LocalCacheLayer
+
+local_cache_layer: Optional[LocalCacheLayer] = None
+invalidation_listener: Optional[asyncio.Task] = None
+
+
+def get_local_cache_layer() -> Optional[LocalCacheLayer]:
+    return local_cache_layer
@@ -0,0 +1,9 @@
+from typing import Optional
+
+from aiohttp import ClientSession
+
+http_session: Optional[ClientSession] = None
+
+
+def get_http_session() -> Optional[ClientSession]:
+    return http_session
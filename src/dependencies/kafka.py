@@ -1,11 +1,54 @@
-from typing import TypeAlias
+from typing import Optional, TypeAlias
 
 from aiokafka import AIOKafkaProducer  # type: ignore
 
+from src.auxiliary_services.event_codec import EventCodec
+from src.auxiliary_services.event_publisher import EventPublisher
+from src.auxiliary_services.message_broker import (
+    AfterCommitMessageBroker,
+    AsyncMessageBroker,
+    KafkaAsyncMessageBroker,
+    OutboxMessageBroker,
+    PublisherMessageBroker,
+)
+from src.auxiliary_services.spill_log import SpillLog
+from src.core.settings import settings
+from src.dependencies import outbox
+
 AsyncKafkaProducer: TypeAlias = AIOKafkaProducer
 
 kafka_producer: AsyncKafkaProducer | None = None
+event_codec: Optional[EventCodec] = None
+event_publisher: Optional[EventPublisher] = None
+spill_log: Optional[SpillLog] = None
 
 
 def get_kafka_producer() -> AsyncKafkaProducer:
     return kafka_producer
+
+
+def get_event_codec() -> Optional[EventCodec]:
+    return event_codec
+
+
+def get_event_publisher() -> Optional[EventPublisher]:
+    return event_publisher
+
+
+def create_message_broker(topic: str) -> AsyncMessageBroker:
+    """
+    Broker of the topic for the UGC handlers: the outbox for the outbox topics when it is enabled,
+    else the direct broker, holding events back until the handler's transaction commits.
+    """
+    if outbox.outbox_model is not None and topic in settings.outbox_topic_names:
+        return OutboxMessageBroker(outbox_model=outbox.outbox_model, topic=topic)
+    return AfterCommitMessageBroker(create_direct_message_broker(topic))
+
+
+def create_direct_message_broker(topic: str) -> AsyncMessageBroker:
+    """Kafka broker of the topic: the background publisher when it runs, else the producer itself."""
+    if event_publisher is not None:
+        return PublisherMessageBroker(publisher=event_publisher, topic=topic)
+    if event_codec is None:
+        raise RuntimeError('Kafka event codec is created on startup, no broker can be made before it')
+    return KafkaAsyncMessageBroker(producer=kafka_producer, codec=event_codec, topic=topic)
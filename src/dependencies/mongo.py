@@ -1,7 +1,9 @@
-from typing import TypeAlias
+from typing import Optional, TypeAlias
 
 from motor.core import AgnosticClient
 
+from src.core.settings import settings
+
 AsyncMongoClient: TypeAlias = AgnosticClient
 
 mongo_client: AsyncMongoClient | None = None
@@ -9,3 +11,8 @@ mongo_client: AsyncMongoClient | None = None
 
 def get_mongo_client() -> AsyncMongoClient | None:
     return mongo_client
+
+
+def get_transaction_client() -> Optional[AsyncMongoClient]:
+    """Client the UGC handlers open transactions on, None when transactions are disabled."""
+    return mongo_client if settings.mongo_transactions_enabled else None
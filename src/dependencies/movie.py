@@ -1,9 +1,27 @@
-from typing import Optional
+from typing import Any, Optional
 
 from src.external_api.movie import MovieApi
+from src.project_utilities.background_refresh import BackgroundRefresher
+from src.project_utilities.redis_lock import RedisLock
+from src.project_utilities.single_flight import SingleFlight
 
 movie_api: Optional[MovieApi] = None
+movie_single_flight: SingleFlight[str, Any] = SingleFlight()
+movie_fetch_lock: Optional[RedisLock] = None
+movie_refresher: Optional[BackgroundRefresher[str]] = None
 
 
 def get_movie_api() -> Optional[MovieApi]:
     return movie_api
+
+
+def get_movie_single_flight() -> SingleFlight[str, Any]:
+    return movie_single_flight
+
+
+def get_movie_fetch_lock() -> Optional[RedisLock]:
+    return movie_fetch_lock
+
+
+def get_movie_refresher() -> Optional[BackgroundRefresher[str]]:
+    return movie_refresher
@@ -0,0 +1,14 @@
+from typing import Optional
+
+from aiokafka import AIOKafkaProducer  # type: ignore
+
+from src.auxiliary_services.outbox_relay import OutboxRelay
+from src.db_models.outbox import OutboxModel
+
+outbox_model: Optional[OutboxModel] = None
+outbox_relay: Optional[OutboxRelay] = None
+relay_producer: Optional[AIOKafkaProducer] = None
+
+
+def get_outbox_model() -> Optional[OutboxModel]:
+    return outbox_model
@@ -0,0 +1,180 @@
+import asyncio
+from pathlib import Path
+
+from aiohttp import ClientSession
+from aiokafka import AIOKafkaProducer  # type: ignore
+from motor.core import AgnosticDatabase
+from redis.asyncio import Redis
+
+from src.auxiliary_services.auth_cache import CachedAuthValidator
+from src.auxiliary_services.cache_service import LocalCacheLayer
+from src.auxiliary_services.event_codec import EventCodec, SchemaRegistry
+from src.auxiliary_services.event_publisher import EventPublisher, EventPublisherOptions
+from src.auxiliary_services.jwt_verifier import JwtOptions, JwtVerifier, load_verification_keys
+from src.auxiliary_services.outbox_relay import OutboxRelay, OutboxRelayModels, OutboxRelayOptions
+from src.auxiliary_services.spill_log import SpillLog, SpillLogOptions
+from src.auxiliary_services.watch_progress_buffer import WatchProgressBuffer
+from src.core.settings import settings
+from src.db_models.outbox import OutboxLeaseModel, OutboxModel
+from src.db_models.user_movie_state import UserMovieStateModel
+from src.db_models.watch_progress import WatchProgressModel
+from src.dependencies import auth, cache, kafka, movie, outbox, watch_progress
+from src.external_api.auth import AuthApi
+from src.external_api.movie import MovieApi
+from src.project_utilities.background_refresh import BackgroundRefresher
+from src.project_utilities.redis_lock import RedisLock, RedisLockOptions
+from src.project_utilities.ttl_lru import TtlLruCache
+
+
+async def start_kafka() -> None:
+    kafka.event_codec = EventCodec(SchemaRegistry.from_directory(), settings.kafka_topic_schemas)
+    # The background publisher waits for deliveries to spill what Kafka did not take, acks=0 deliveries never fail.
+    producer_config = settings.kafka_delivery_config if settings.kafka_publisher_enabled else settings.kafka_config
+    kafka.kafka_producer = AIOKafkaProducer(**producer_config)
+    await kafka.kafka_producer.start()
+    if not settings.kafka_publisher_enabled:
+        return
+    if settings.kafka_spill_enabled:
+        kafka.spill_log = SpillLog.claim(
+            Path(settings.kafka_spill_directory),
+            SpillLogOptions(
+                segment_bytes=settings.kafka_spill_segment_bytes,
+                max_bytes=settings.kafka_spill_max_bytes,
+                fsync=settings.kafka_spill_fsync,
+                fsync_interval=settings.kafka_spill_fsync_interval,
+            ),
+        )
+    kafka.event_publisher = EventPublisher(
+        producer=kafka.kafka_producer,
+        codec=kafka.event_codec,
+        options=EventPublisherOptions(
+            max_queue_size=settings.kafka_publisher_queue_size,
+            batch_size=settings.kafka_publisher_batch_size,
+            batch_interval=settings.kafka_publisher_batch_interval,
+            overflow=settings.kafka_publisher_overflow,
+            send_timeout=settings.kafka_publisher_send_timeout,
+            retry_interval=settings.kafka_publisher_retry_interval,
+        ),
+        spill_log=kafka.spill_log,
+    )
+    kafka.event_publisher.start()
+
+
+async def stop_kafka() -> None:
+    """Publish, or spill, the queued events before the producer stops."""
+    if kafka.event_publisher:
+        await kafka.event_publisher.close()
+    if kafka.spill_log:
+        kafka.spill_log.close()
+    if kafka.kafka_producer:
+        await kafka.kafka_producer.stop()
+
+
+async def start_outbox(mongo_database: AgnosticDatabase) -> None:
+    if not settings.outbox_enabled:
+        return
+    if kafka.event_codec is None:
+        raise RuntimeError('Kafka is started before the outbox, the outbox relay needs its event codec')
+    outbox.outbox_model = OutboxModel(mongo_database, shards=settings.outbox_shards)
+    outbox.relay_producer = AIOKafkaProducer(**settings.kafka_delivery_config)
+    await outbox.relay_producer.start()
+    outbox.outbox_relay = OutboxRelay(
+        models=OutboxRelayModels(outbox_model=outbox.outbox_model, lease_model=OutboxLeaseModel(mongo_database)),
+        producer=outbox.relay_producer,
+        codec=kafka.event_codec,
+        options=OutboxRelayOptions(
+            batch_size=settings.outbox_relay_batch_size,
+            lease_ttl=settings.outbox_lease_ttl,
+            poll_interval=settings.outbox_poll_interval,
+        ),
+    )
+    outbox.outbox_relay.start()
+
+
+async def stop_outbox() -> None:
+    if outbox.outbox_relay:
+        await outbox.outbox_relay.close()
+    if outbox.relay_producer:
+        await outbox.relay_producer.stop()
+
+
+def start_watch_progress_buffer(mongo_database: AgnosticDatabase) -> None:
+    if not settings.watch_progress_buffer_enabled:
+        return
+    watch_progress.watch_progress_buffer = WatchProgressBuffer(
+        watch_progress_model=WatchProgressModel(mongo_database),
+        user_movie_state=UserMovieStateModel(mongo_database),
+        flush_interval=settings.watch_progress_flush_interval,
+        flush_threshold=settings.watch_progress_flush_threshold,
+    )
+    watch_progress.watch_progress_buffer.start()
+
+
+async def stop_watch_progress_buffer() -> None:
+    if watch_progress.watch_progress_buffer:
+        await watch_progress.watch_progress_buffer.close()
+
+
+def start_local_cache(redis_client: Redis) -> None:
+    if not settings.local_cache_enabled:
+        return
+    cache.local_cache_layer = LocalCacheLayer(
+        max_items=settings.local_cache_max_items,
+        max_bytes=settings.local_cache_max_bytes,
+        ttl=settings.local_cache_ttl,
+        channel=settings.local_cache_invalidation_channel,
+    )
+    cache.invalidation_listener = asyncio.create_task(
+        cache.local_cache_layer.listen_invalidations(redis_client),
+    )
+
+
+def stop_local_cache() -> None:
+    if cache.invalidation_listener:
+        cache.invalidation_listener.cancel()
+
+
+def start_movie_loading(redis_client: Redis, session: ClientSession) -> None:
+    movie.movie_api = MovieApi(base_url=settings.movie_endpoint, session=session)
+    movie.movie_refresher = BackgroundRefresher(
+        concurrency=settings.movie_refresh_concurrency,
+        max_pending=settings.movie_refresh_max_pending,
+    )
+    if settings.movie_fetch_lock_enabled:
+        movie.movie_fetch_lock = RedisLock(
+            redis_client=redis_client,
+            key_prefix='lock:movie:',
+            options=RedisLockOptions(
+                ttl_ms=settings.movie_fetch_lock_ttl_ms,
+                wait_timeout=settings.movie_fetch_lock_wait_timeout,
+                poll_interval=settings.movie_fetch_lock_poll_interval,
+            ),
+        )
+
+
+async def stop_movie_loading() -> None:
+    if movie.movie_refresher:
+        await movie.movie_refresher.close()
+
+
+def start_auth(redis_client: Redis, session: ClientSession) -> None:
+    auth.auth_api = AuthApi(base_url=settings.auth_service_url, session=session)
+    if settings.auth_cache_enabled:
+        auth.auth_validator = CachedAuthValidator(
+            auth_api=auth.auth_api,
+            redis_client=redis_client,
+            local_cache=TtlLruCache(max_items=settings.auth_cache_max_items, ttl=settings.auth_cache_ttl),
+            negative_ttl=settings.auth_cache_negative_ttl,
+        )
+    if settings.auth_mode == 'jwt':
+        auth.jwt_verifier = JwtVerifier(
+            load_verification_keys(settings.auth_jwt_public_key_path, settings.auth_jwks_path),
+            JwtOptions(
+                algorithms=settings.auth_jwt_algorithms,
+                audience=settings.auth_jwt_audience,
+                issuer=settings.auth_jwt_issuer,
+                leeway=settings.auth_jwt_leeway,
+                user_id_claim=settings.auth_jwt_user_id_claim,
+                cache_ttl=settings.auth_jwt_cache_ttl,
+            ),
+        )
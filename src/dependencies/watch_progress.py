@@ -0,0 +1,9 @@
+from typing import Optional
+
+from src.auxiliary_services.watch_progress_buffer import WatchProgressBuffer
+
+watch_progress_buffer: Optional[WatchProgressBuffer] = None
+
+
+def get_watch_progress_buffer() -> Optional[WatchProgressBuffer]:
+    return watch_progress_buffer
@@ -0,0 +1,54 @@
+from functools import lru_cache
+from typing import Optional
+
+from fastapi import Depends
+
+from src.auxiliary_services.ugc_batch_handler import UgcBatchHandler, UgcBatchModels, UgcBatchOptions
+from src.auxiliary_services.watch_progress_buffer import WatchProgressBuffer
+from src.core.settings import settings
+from src.db_models.bookmark import BookmarkModel
+from src.db_models.like import LikeModel
+from src.db_models.movie_stats import MovieStatsModel
+from src.db_models.user_movie_state import UserMovieStateModel
+from src.db_models.watch_progress import WatchProgressModel
+from src.dependencies.kafka import create_message_broker
+from src.dependencies.mongo import AsyncMongoClient, get_transaction_client
+from src.dependencies.watch_progress import get_watch_progress_buffer
+from src.endpoint_services.bookmark import get_bookmark_model
+from src.endpoint_services.like import get_like_model
+from src.endpoint_services.movie_stats import get_movie_stats_model
+from src.endpoint_services.user_movie_state import get_user_movie_state_model
+from src.endpoint_services.watch_progress import get_watch_progress_model
+
+
+def get_ugc_batch_models(
+    like_model: LikeModel = Depends(get_like_model),
+    bookmark_model: BookmarkModel = Depends(get_bookmark_model),
+    watch_progress_model: WatchProgressModel = Depends(get_watch_progress_model),
+) -> UgcBatchModels:
+    return UgcBatchModels(
+        like_model=like_model,
+        bookmark_model=bookmark_model,
+        watch_progress_model=watch_progress_model,
+    )
+
+
+@lru_cache()
+def get_ugc_batch_service(
+    models: UgcBatchModels = Depends(get_ugc_batch_models),
+    movie_stats: MovieStatsModel = Depends(get_movie_stats_model),
+    user_movie_state: UserMovieStateModel = Depends(get_user_movie_state_model),
+    buffer: Optional[WatchProgressBuffer] = Depends(get_watch_progress_buffer),
+    transaction_client: Optional[AsyncMongoClient] = Depends(get_transaction_client),
+) -> UgcBatchHandler:
+    return UgcBatchHandler(
+        models=models,
+        ugc_broker=create_message_broker(settings.ugc_topic),
+        progress_broker=create_message_broker(settings.watch_progress_topic),
+        options=UgcBatchOptions(
+            movie_stats=movie_stats,
+            user_movie_state=user_movie_state,
+            progress_buffer=buffer,
+            transaction_client=transaction_client,
+        ),
+    )
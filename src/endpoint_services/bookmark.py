@@ -1,42 +1,51 @@
 from functools import lru_cache
+from typing import Optional
 
-from aiokafka import AIOKafkaProducer  # type: ignore
 from fastapi import Depends
-from redis.asyncio import Redis
 
-from src.auxiliary_services.cache_service import CacheService
-from src.auxiliary_services.data_aggregation import BookmarkSummaryAggregator, MovieDetailedAggregator
-from src.auxiliary_services.message_broker import KafkaAsyncMessageBroker
-from src.auxiliary_services.movie_search import MovieSearch
-from src.auxiliary_services.ugc_handler import BookmarkUgcHandler
+from src.auxiliary_services.data_aggregation import (
+    AbstractSummaryAggregator,
+    BookmarkSummaryAggregator,
+    MovieDetailedAggregator,
+    PageEnricher,
+    UserMovieStateSummaryAggregator,
+)
+from src.auxiliary_services.movie_search import MovieSearch, MovieSource
+from src.auxiliary_services.ugc_handler import BookmarkUgcHandler, UgcHandlerOptions
 from src.core.settings import settings
 from src.db_models.bookmark import BookmarkModel
-from src.db_models.like import LikeModel
-from src.dependencies.kafka import get_kafka_producer
-from src.dependencies.mongo import AsyncMongoClient, get_mongo_client
-from src.dependencies.movie import get_movie_api
-from src.dependencies.redis import get_redis
-from src.external_api.movie import MovieApi
+from src.db_models.movie_stats import MovieStatsModel
+from src.db_models.user_movie_state import UserMovieStateModel
+from src.dependencies.kafka import create_message_broker
+from src.dependencies.mongo import AsyncMongoClient, get_mongo_client, get_transaction_client
+from src.endpoint_services.movie_details import get_movie_detailed_aggregator, get_movie_source, get_page_enricher
+from src.endpoint_services.movie_stats import get_movie_stats_model
+from src.endpoint_services.user_movie_state import get_user_movie_state_model
 
 
 @lru_cache()
 def get_bookmark_service(
     client: AsyncMongoClient = Depends(get_mongo_client),
-    redis: Redis = Depends(get_redis),
-    movie_api: MovieApi = Depends(get_movie_api),
+    movie_source: MovieSource = Depends(get_movie_source),
+    detailed_aggregator: MovieDetailedAggregator = Depends(get_movie_detailed_aggregator),
+    enricher: PageEnricher = Depends(get_page_enricher),
+    user_movie_state: UserMovieStateModel = Depends(get_user_movie_state_model),
 ) -> MovieSearch:
     db = client[settings.mongo_database]
-    like_model = LikeModel(db)
     bookmark_model = BookmarkModel(db)
-    cache_expire_time = 60 * 60 * 24 * 7
-    cache_service = CacheService(redis_client=redis, ttl=cache_expire_time)
-    detailed_aggregator = MovieDetailedAggregator(like_model=like_model)
-    summary_aggregator = BookmarkSummaryAggregator(mongo_model=bookmark_model)
+    summary_aggregator: AbstractSummaryAggregator
+    if settings.user_movie_state_reads:
+        summary_aggregator = UserMovieStateSummaryAggregator(
+            mongo_model=user_movie_state,
+            enricher=enricher,
+            state_flag='bookmarked',
+        )
+    else:
+        summary_aggregator = BookmarkSummaryAggregator(mongo_model=bookmark_model, enricher=enricher)
     return MovieSearch(
-        cache=cache_service,
+        source=movie_source,
         detailed_aggregator=detailed_aggregator,
         summary_aggregator=summary_aggregator,
-        movie_api=movie_api,
     )
 
 
@@ -51,7 +60,17 @@ def get_bookmark_model(
 @lru_cache()
 def get_bookmark_ugc_service(
     model: BookmarkModel = Depends(get_bookmark_model),
-    kafka_producer: AIOKafkaProducer = Depends(get_kafka_producer),
+    movie_stats: MovieStatsModel = Depends(get_movie_stats_model),
+    user_movie_state: UserMovieStateModel = Depends(get_user_movie_state_model),
+    transaction_client: Optional[AsyncMongoClient] = Depends(get_transaction_client),
 ) -> BookmarkUgcHandler:
-    message_broker = KafkaAsyncMessageBroker(producer=kafka_producer, topic=settings.ugc_topic)
-    return BookmarkUgcHandler(collection=model, message_broker=message_broker)
+    message_broker = create_message_broker(settings.ugc_topic)
+    return BookmarkUgcHandler(
+        collection=model,
+        message_broker=message_broker,
+        options=UgcHandlerOptions(
+            movie_stats=movie_stats,
+            user_movie_state=user_movie_state,
+            transaction_client=transaction_client,
+        ),
+    )
@@ -0,0 +1,88 @@
+from functools import lru_cache
+from typing import Optional
+
+from fastapi import Depends
+from redis.asyncio import Redis
+
+from src.auxiliary_services.cache_codec import get_codec
+from src.auxiliary_services.cache_service import CacheService, CacheServiceOptions, LocalCacheLayer
+from src.auxiliary_services.data_aggregation import MovieDetailedAggregator, PageEnricher
+from src.auxiliary_services.movie_search import MovieSource
+from src.auxiliary_services.watch_progress_buffer import WatchProgressBuffer
+from src.core.settings import settings
+from src.db_models.bookmark import BookmarkModel
+from src.db_models.like import LikeModel
+from src.db_models.movie_stats import MovieStatsModel
+from src.db_models.watch_progress import WatchProgressModel
+from src.dependencies.cache import get_local_cache_layer
+from src.dependencies.mongo import AsyncMongoClient, get_mongo_client
+from src.dependencies.movie import get_movie_api, get_movie_fetch_lock, get_movie_refresher, get_movie_single_flight
+from src.dependencies.redis import get_redis
+from src.dependencies.watch_progress import get_watch_progress_buffer
+from src.external_api.movie import MovieApi
+from src.project_utilities.background_refresh import BackgroundRefresher
+from src.project_utilities.redis_lock import RedisLock
+from src.project_utilities.single_flight import SingleFlight
+
+
+@lru_cache()
+def get_movie_cache_service(
+    redis: Redis = Depends(get_redis),
+    local_cache_layer: Optional[LocalCacheLayer] = Depends(get_local_cache_layer),
+) -> CacheService:
+    return CacheService(
+        redis_client=redis,
+        options=CacheServiceOptions(
+            ttl=settings.movie_cache_hard_ttl,
+            read_batch_size=settings.cache_read_batch_size,
+        ),
+        local_layer=local_cache_layer,
+        codec=get_codec(settings.cache_codec),
+    )
+
+
+@lru_cache()
+def get_movie_source(
+    cache_service: CacheService = Depends(get_movie_cache_service),
+    movie_api: MovieApi = Depends(get_movie_api),
+    single_flight: SingleFlight = Depends(get_movie_single_flight),
+    fetch_lock: Optional[RedisLock] = Depends(get_movie_fetch_lock),
+    refresher: Optional[BackgroundRefresher] = Depends(get_movie_refresher),
+) -> MovieSource:
+    return MovieSource(
+        cache=cache_service,
+        movie_api=movie_api,
+        single_flight=single_flight,
+        fetch_lock=fetch_lock,
+        refresher=refresher,
+        soft_ttl=settings.movie_cache_soft_ttl,
+        tombstone_ttl=settings.movie_tombstone_ttl,
+    )
+
+
+@lru_cache()
+def get_movie_detailed_aggregator(
+    client: AsyncMongoClient = Depends(get_mongo_client),
+    progress_buffer: Optional[WatchProgressBuffer] = Depends(get_watch_progress_buffer),
+) -> MovieDetailedAggregator:
+    db = client[settings.mongo_database]
+    return MovieDetailedAggregator(
+        movie_stats_model=MovieStatsModel(db),
+        like_model=LikeModel(db),
+        bookmark_model=BookmarkModel(db),
+        progress_source=WatchProgressModel(db) if progress_buffer is None else progress_buffer,
+    )
+
+
+@lru_cache()
+def get_page_enricher(
+    client: AsyncMongoClient = Depends(get_mongo_client),
+    progress_buffer: Optional[WatchProgressBuffer] = Depends(get_watch_progress_buffer),
+) -> PageEnricher:
+    db = client[settings.mongo_database]
+    return PageEnricher(
+        movie_stats_model=MovieStatsModel(db),
+        like_model=LikeModel(db),
+        watch_progress_model=WatchProgressModel(db),
+        progress_buffer=progress_buffer,
+    )
@@ -0,0 +1,15 @@
+from functools import lru_cache
+
+from fastapi import Depends
+
+from src.core.settings import settings
+from src.db_models.movie_stats import MovieStatsModel
+from src.dependencies.mongo import AsyncMongoClient, get_mongo_client
+
+
+@lru_cache()
+def get_movie_stats_model(
+    client: AsyncMongoClient = Depends(get_mongo_client),
+) -> MovieStatsModel:
+    db = client[settings.mongo_database]
+    return MovieStatsModel(db)
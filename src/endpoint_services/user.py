@@ -1,25 +1,32 @@
 from functools import lru_cache
 from typing import Optional
 
-from aiokafka import AIOKafkaProducer  # type: ignore
 from fastapi import Depends
 
-from src.auxiliary_services.message_broker import AsyncMessageBroker, KafkaAsyncMessageBroker
+from src.auxiliary_services.message_broker import AsyncMessageBroker
 from src.core.settings import settings
+from src.db_models.transactions import transactional
 from src.db_models.user import UserDocument, UserModel
-from src.dependencies.kafka import get_kafka_producer
-from src.dependencies.mongo import AsyncMongoClient, get_mongo_client
+from src.dependencies.kafka import create_message_broker
+from src.dependencies.mongo import AsyncMongoClient, get_mongo_client, get_transaction_client
 from src.models.user import UserUpdate
 
 
 class UserUgcHandler:
-    key = 'user'
-
-    def __init__(self, collection: UserModel, message_broker: AsyncMessageBroker):
+    event_type = 'user'
+
+    def __init__(
+        self,
+        collection: UserModel,
+        message_broker: AsyncMessageBroker,
+        transaction_client: Optional[AsyncMongoClient] = None,
+    ):
         self.collection = collection
         self.message_broker = message_broker
+        self.transaction_client = transaction_client
 
-    async def update_user(self, user_id: str, update_info: UserUpdate) -> Optional[UserDocument]:
+    @transactional
+    async def update_user(self, user_id: str, update_info: UserUpdate) -> None:
         await self.collection.update_user(user_id=user_id, update_data=update_info)
 
         message_to_send = {
@@ -28,9 +35,7 @@ class UserUgcHandler:
             'is_adding': True,
             'additional': '',
         }
-        await self.message_broker.send(key=self.key, message=message_to_send)
-
-        return await self.collection.get_user(user_id=user_id)
+        await self.message_broker.send(key=user_id, message=message_to_send, event_type=self.event_type)
 
     async def get_user(self, user_id: str) -> Optional[UserDocument]:
         return await self.collection.get_user(user_id=user_id)
@@ -47,7 +52,7 @@ def get_user_model(
 @lru_cache()
 def get_user_ugc_service(
     model: UserModel = Depends(get_user_model),
-    kafka_producer: AIOKafkaProducer = Depends(get_kafka_producer),
+    transaction_client: Optional[AsyncMongoClient] = Depends(get_transaction_client),
 ) -> UserUgcHandler:
-    message_broker = KafkaAsyncMessageBroker(producer=kafka_producer, topic=settings.ugc_topic)
-    return UserUgcHandler(collection=model, message_broker=message_broker)
+    message_broker = create_message_broker(settings.ugc_topic)
+    return UserUgcHandler(collection=model, message_broker=message_broker, transaction_client=transaction_client)
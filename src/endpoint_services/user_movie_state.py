@@ -0,0 +1,15 @@
+from functools import lru_cache
+
+from fastapi import Depends
+
+from src.core.settings import settings
+from src.db_models.user_movie_state import UserMovieStateModel
+from src.dependencies.mongo import AsyncMongoClient, get_mongo_client
+
+
+@lru_cache()
+def get_user_movie_state_model(
+    client: AsyncMongoClient = Depends(get_mongo_client),
+) -> UserMovieStateModel:
+    db = client[settings.mongo_database]
+    return UserMovieStateModel(db)
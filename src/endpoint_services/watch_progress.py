@@ -1,74 +1,114 @@
 from functools import lru_cache
+from typing import Optional
 
-from aiokafka import AIOKafkaProducer  # type: ignore
 from fastapi import Depends
-from redis.asyncio import Redis
 
-from src.auxiliary_services.cache_service import CacheService
-from src.auxiliary_services.data_aggregation import MovieDetailedAggregator, WatchProgressSummaryAggregator
-from src.auxiliary_services.message_broker import AsyncMessageBroker, KafkaAsyncMessageBroker
-from src.auxiliary_services.movie_search import MovieSearch
+from src.auxiliary_services.data_aggregation import (
+    AbstractSummaryAggregator,
+    MovieDetailedAggregator,
+    PageEnricher,
+    UserMovieStateSummaryAggregator,
+    WatchProgressSummaryAggregator,
+)
+from src.auxiliary_services.message_broker import AsyncMessageBroker
+from src.auxiliary_services.movie_search import MovieSearch, MovieSource
+from src.auxiliary_services.watch_progress_buffer import WatchProgressBuffer
 from src.core.settings import settings
-from src.db_models.like import LikeModel
+from src.db_models.user_movie_state import UserMovieStateModel
 from src.db_models.watch_progress import WatchProgressModel
-from src.dependencies.kafka import get_kafka_producer
+from src.dependencies.kafka import create_message_broker
 from src.dependencies.mongo import AsyncMongoClient, get_mongo_client
-from src.dependencies.movie import get_movie_api
-from src.dependencies.redis import get_redis
-from src.external_api.movie import MovieApi
+from src.dependencies.watch_progress import get_watch_progress_buffer
+from src.endpoint_services.movie_details import get_movie_detailed_aggregator, get_movie_source, get_page_enricher
+from src.endpoint_services.user_movie_state import get_user_movie_state_model
 from src.models.movie_progress import MovieProgress
 from src.models.user import User
 
 
 class WatchProgressUgcHandler:
-    def __init__(self, collection: WatchProgressModel, message_broker: AsyncMessageBroker):
+    event_type = 'watch_progress'
+
+    def __init__(
+        self,
+        collection: WatchProgressModel,
+        message_broker: AsyncMessageBroker,
+        user_movie_state: Optional[UserMovieStateModel] = None,
+        buffer: Optional[WatchProgressBuffer] = None,
+    ):
         self.collection = collection
         self.message_broker = message_broker
+        self.user_movie_state = user_movie_state
+        self.buffer = buffer
 
     async def update(self, movie_progress: MovieProgress, user: User) -> None:
+        if self.buffer is not None:
+            self.buffer.put(user_id=user.id, movie_id=movie_progress.id, break_point=movie_progress.break_point)
+        else:
+            await self._write_progress(movie_progress=movie_progress, user=user)
+        combined_data = {'movie': movie_progress.model_dump(), 'user': user.model_dump()}
+        await self.message_broker.send(key=user.id, message=combined_data, event_type=self.event_type)
+
+    async def _write_progress(self, movie_progress: MovieProgress, user: User) -> None:
         await self.collection.update_progress(
             user_id=user.id,
             movie_id=movie_progress.id,
             break_point=movie_progress.break_point,
         )
-        combined_data = {'movie': movie_progress.model_dump(), 'user': user.model_dump()}
-        key = '{movie}+{user}'.format(movie=movie_progress.id, user=user.id)
-        await self.message_broker.send(key=key, message=combined_data)
+        if self.user_movie_state is not None:
+            await self.user_movie_state.set_progress(
+                user_id=user.id,
+                movie_id=movie_progress.id,
+                progress=movie_progress.break_point,
+            )
 
 
 @lru_cache()
-def get_watch_progress_service(
+def get_watch_progress_model(
     client: AsyncMongoClient = Depends(get_mongo_client),
-    redis: Redis = Depends(get_redis),
-    movie_api: MovieApi = Depends(get_movie_api),
-) -> MovieSearch:
+) -> WatchProgressModel:
     db = client[settings.mongo_database]
-    like_model = LikeModel(db)
-    watch_progress_model = WatchProgressModel(db)
-    cache_expire_time = 60 * 60 * 24 * 7
-    cache_service = CacheService(redis_client=redis, ttl=cache_expire_time)
-    detailed_aggregator = MovieDetailedAggregator(like_model=like_model)
-    summary_aggregator = WatchProgressSummaryAggregator(mongo_model=watch_progress_model)
+    return WatchProgressModel(db)
+
+
+def get_watch_progress_summary_aggregator(
+    watch_progress_model: WatchProgressModel = Depends(get_watch_progress_model),
+    enricher: PageEnricher = Depends(get_page_enricher),
+    user_movie_state: UserMovieStateModel = Depends(get_user_movie_state_model),
+    buffer: Optional[WatchProgressBuffer] = Depends(get_watch_progress_buffer),
+) -> AbstractSummaryAggregator:
+    if settings.user_movie_state_reads:
+        return UserMovieStateSummaryAggregator(
+            mongo_model=user_movie_state,
+            enricher=enricher,
+            state_flag='watched',
+            progress_buffer=buffer,
+        )
+    return WatchProgressSummaryAggregator(mongo_model=watch_progress_model, enricher=enricher, progress_buffer=buffer)
+
+
+@lru_cache()
+def get_watch_progress_service(
+    movie_source: MovieSource = Depends(get_movie_source),
+    detailed_aggregator: MovieDetailedAggregator = Depends(get_movie_detailed_aggregator),
+    summary_aggregator: AbstractSummaryAggregator = Depends(get_watch_progress_summary_aggregator),
+) -> MovieSearch:
     return MovieSearch(
-        cache=cache_service,
+        source=movie_source,
         detailed_aggregator=detailed_aggregator,
         summary_aggregator=summary_aggregator,
-        movie_api=movie_api,
     )
 
 
-@lru_cache()
-def get_watch_progress_model(
-    client: AsyncMongoClient = Depends(get_mongo_client),
-) -> WatchProgressModel:
-    db = client[settings.mongo_database]
-    return WatchProgressModel(db)
-
-
 @lru_cache()
 def get_watch_progress_ugc_service(
     model: WatchProgressModel = Depends(get_watch_progress_model),
-    kafka_producer: AIOKafkaProducer = Depends(get_kafka_producer),
+    user_movie_state: UserMovieStateModel = Depends(get_user_movie_state_model),
+    buffer: Optional[WatchProgressBuffer] = Depends(get_watch_progress_buffer),
 ) -> WatchProgressUgcHandler:
-    message_broker = KafkaAsyncMessageBroker(producer=kafka_producer, topic=settings.watch_progress_topic)
-    return WatchProgressUgcHandler(collection=model, message_broker=message_broker)
+    message_broker = create_message_broker(settings.watch_progress_topic)
+    return WatchProgressUgcHandler(
+        collection=model,
+        message_broker=message_broker,
+        user_movie_state=user_movie_state,
+        buffer=buffer,
+    )
@@ -12,8 +12,9 @@ from src.project_utilities.backoff import backoff_public_methods
 
 @backoff_public_methods()
 class AuthApi:
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, session: Optional[ClientSession] = None):
         self.base_url = base_url
+        self.session = session
 
     @with_aiohttp_session
     async def validate_user(self, session: ClientSession, headers: Dict[str, str]) -> Optional[User]:
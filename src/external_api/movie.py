@@ -2,6 +2,7 @@ from http import HTTPStatus
 from typing import List, Optional
 
 from aiohttp.client import ClientSession
+from fastapi import HTTPException, status
 
 from src.models.movie import MovieApiResponse, MovieGenre, MoviePerson, MoviePersonName
 from src.project_utilities.async_session import with_aiohttp_session
@@ -45,8 +46,9 @@ def deserialize_movie_json(film: dict) -> 'MovieApiResponse':
 
 @backoff_public_methods()
 class MovieApi:
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, session: Optional[ClientSession] = None):
         self.base_url = base_url
+        self.session = session
         self.deserialize = deserialize_movie_json
 
     @with_aiohttp_session
@@ -56,11 +58,13 @@ class MovieApi:
             if response.status == HTTPStatus.OK:
                 movie = await response.json()
                 return self.deserialize(movie)
-            return None
+            if response.status == HTTPStatus.NOT_FOUND:
+                return None
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail='Movie service is unavailable')
 
     @with_aiohttp_session
     async def get_several(self, session: ClientSession, movie_ids: List[str]) -> List[Optional[MovieApiResponse]]:
-        """Fetch details for multiple movies by their IDs."""
+        """Fetch details for multiple movies by their IDs. Unknown ids are left out of the result."""
         param_tokens = ['id={id}'.format(id=movie_id) for movie_id in movie_ids]
         ids_param = '&'.join(param_tokens)
         url = '{url}/?{ids}'.format(url=self.base_url, ids=ids_param)
@@ -68,4 +72,6 @@ class MovieApi:
             if response.status == HTTPStatus.OK:
                 movies = await response.json()
                 return [self.deserialize(movie) for movie in movies]
-            return []
+            if response.status == HTTPStatus.NOT_FOUND:
+                return []
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail='Movie service is unavailable')
@@ -2,25 +2,28 @@ import logging
 from typing import Any, TypeVar
 
 import uvicorn
-from aiokafka import AIOKafkaProducer  # type: ignore
 from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.responses import JSONResponse
 from motor.motor_asyncio import AsyncIOMotorClient
 from redis.asyncio import Redis
 
+from src.api.v1.batch import router as batch_router
 from src.api.v1.bookmark import router as bookmark_router
 from src.api.v1.like import router as like_router
+from src.api.v1.metrics import router as metrics_router
 from src.api.v1.movie import router as movie_router
 from src.api.v1.review import router as review_router
 from src.api.v1.user import router as user_router
 from src.api.v1.watch_progress import router as progress_router
-from src.core.exceptions import KafkaException, OtherException, UserDataException
+from src.core.exceptions import EventQueueOverloadedException, KafkaException, OtherException, UserDataException
 from src.core.logger import LOGGING
 from src.core.settings import settings
-from src.dependencies import auth, kafka, mongo, movie, redis
-from src.external_api.auth import AuthApi
-from src.external_api.movie import MovieApi
+from src.db_models.indexes import ensure_indexes
+from src.dependencies import auth, http_session, mongo, redis
+from src.dependencies import startup as startup_services
+from src.project_utilities.async_session import create_pooled_session
 from src.project_utilities.kafka_admin import ensure_topic_exists
+from src.project_utilities.rebuild_movie_stats import ensure_movie_stats
 from src.rate_limit.token_bucket import TokenBucket
 
 app = FastAPI(
@@ -39,27 +42,46 @@ token_bucket = TokenBucket(
 
 @app.on_event('startup')
 async def startup() -> None:
-    kafka.kafka_producer = AIOKafkaProducer(**settings.kafka_config)
-    await kafka.kafka_producer.start()
+    await startup_services.start_kafka()
     mongo.mongo_client = AsyncIOMotorClient(settings.mongo_database_url)
+    if settings.mongo_ensure_indexes:
+        await ensure_indexes(mongo.mongo_client[settings.mongo_database])
+    mongo_database = mongo.mongo_client[settings.mongo_database]
+    if settings.movie_stats_rebuild_on_startup:
+        await ensure_movie_stats(mongo_database)
+    await startup_services.start_outbox(mongo_database)
+    startup_services.start_watch_progress_buffer(mongo_database)
     redis.redis = Redis(
         host=settings.redis_host,
         port=settings.redis_port,
     )
-    auth.auth_api = AuthApi(base_url=settings.auth_user_endpoint)
-    movie.movie_api = MovieApi(base_url=settings.movie_endpoint)
+    startup_services.start_local_cache(redis.redis)
+    http_session.http_session = create_pooled_session(
+        limit=settings.http_connector_limit,
+        limit_per_host=settings.http_connector_limit_per_host,
+        keepalive_timeout=settings.http_keepalive_timeout,
+        dns_cache_ttl=settings.http_dns_cache_ttl,
+        request_timeout=settings.http_request_timeout,
+    )
+    startup_services.start_auth(redis.redis, http_session.http_session)
+    startup_services.start_movie_loading(redis.redis, http_session.http_session)
 
 
 @app.on_event('shutdown')
 async def shutdown() -> None:
-    if kafka.kafka_producer:
-        await kafka.kafka_producer.stop()
+    startup_services.stop_local_cache()
+    await startup_services.stop_movie_loading()
+    await startup_services.stop_watch_progress_buffer()
+    await startup_services.stop_outbox()
+    await startup_services.stop_kafka()
+    if http_session.http_session:
+        await http_session.http_session.close()
 
 
 _T = TypeVar('_T', bound=HTTPException)
 
 
-def exception_handler(request: Request, exc: _T):
+def exception_handler(request: Request, exc: _T) -> JSONResponse:
     logging.error(exc.detail)
     return JSONResponse(
         status_code=exc.status_code,
@@ -68,17 +90,22 @@ def exception_handler(request: Request, exc: _T):
 
 
 @app.exception_handler(KafkaException)
-def kafka_exception_handler(request: Request, exc: KafkaException):
+def kafka_exception_handler(request: Request, exc: KafkaException) -> JSONResponse:
     return exception_handler(request, exc)
 
 
 @app.exception_handler(UserDataException)
-def user_data_exception_handler(request: Request, exc: UserDataException):
+def user_data_exception_handler(request: Request, exc: UserDataException) -> JSONResponse:
     return exception_handler(request, exc)
 
 
 @app.exception_handler(OtherException)
-def other_exception_handler(request: Request, exc: OtherException):
+def other_exception_handler(request: Request, exc: OtherException) -> JSONResponse:
+    return exception_handler(request, exc)
+
+
+@app.exception_handler(EventQueueOverloadedException)
+def event_queue_overloaded_exception_handler(request: Request, exc: EventQueueOverloadedException) -> JSONResponse:
     return exception_handler(request, exc)
 
 
@@ -98,12 +125,27 @@ async def rate_limit_middleware(request: Request, call_next: Any) -> Any:
     return await call_next(request)
 
 
+async def authenticate(request: Request, authorization: str) -> None:
+    headers = {'Authorization': authorization}
+    if auth.jwt_verifier and auth.jwt_verifier.accepts(authorization):
+        request.state.user = auth.jwt_verifier.verify(authorization)
+    elif auth.auth_validator:
+        request.state.user = await auth.auth_validator.validate_user(headers=headers)
+    elif auth.auth_api:
+        request.state.user = await auth.auth_api.validate_user(headers=headers)
+
+
 @app.middleware('http')
 async def check_token_auth_middleware(request: Request, call_next: Any) -> Any:
     if settings.auth_enabled and request.url.path.startswith(settings.api_path):
-        headers = {'Authorization': request.headers.get('Authorization')}
-        if auth.auth_api:
-            request.state.user = await auth.auth_api.validate_user(headers=headers)
+        authorization = request.headers.get('Authorization')
+        if not authorization:
+            return JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content={'message': 'Authentication Failed'})
+        # Exception handlers do not see exceptions raised in a middleware, they would end up as 500.
+        try:
+            await authenticate(request, authorization)
+        except HTTPException as exc:
+            return exception_handler(request, exc)
         logging.info('Placed received user to request user')
 
     return await call_next(request)
@@ -115,10 +157,17 @@ app.include_router(bookmark_router, prefix='/api/v1/bookmark', tags=['Bookmark']
 app.include_router(user_router, prefix='/api/v1/profile', tags=['Profile'])
 app.include_router(movie_router, prefix='/api/v1/collection', tags=['Collection'])
 app.include_router(progress_router, prefix='/api/v1/progress', tags=['Progress'])
+app.include_router(batch_router, prefix='/api/v1/batch', tags=['Batch'])
+app.include_router(metrics_router, prefix='/api/v1/metrics', tags=['Metrics'])
 
 if __name__ == '__main__':
     for topic in settings.kafka_topics:
-        ensure_topic_exists(topic_name=topic, bootstrap_servers=settings.kafka_bootstrap_servers)
+        ensure_topic_exists(
+            topic_name=topic,
+            num_partitions=settings.kafka_topic_partitions,
+            replication_factor=settings.kafka_topic_replication_factor,
+            bootstrap_servers=settings.kafka_bootstrap_servers,
+        )
 
     uvicorn_default_port = 8000
 
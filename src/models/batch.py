@@ -0,0 +1,42 @@
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from src.models.movie_progress import MovieProgress
+
+MAX_BATCH_OPERATIONS = 500
+
+
+class BatchAction(Enum):
+    add = 'add'
+    remove = 'remove'
+
+
+class ToggleOperation(BaseModel):
+    movie_id: str
+    action: BatchAction
+
+
+class BatchRequest(BaseModel):
+    likes: List[ToggleOperation] = Field(default=[], max_length=MAX_BATCH_OPERATIONS)
+    bookmarks: List[ToggleOperation] = Field(default=[], max_length=MAX_BATCH_OPERATIONS)
+    progress: List[MovieProgress] = Field(default=[], max_length=MAX_BATCH_OPERATIONS)
+
+
+class BatchItemStatus(Enum):
+    applied = 'applied'
+    unchanged = 'unchanged'
+    failed = 'failed'
+
+
+class BatchItemResult(BaseModel):
+    movie_id: str
+    status: BatchItemStatus
+    detail: Optional[str] = Field(default=None)
+
+
+class BatchResponse(BaseModel):
+    likes: List[BatchItemResult]
+    bookmarks: List[BatchItemResult]
+    progress: List[BatchItemResult]
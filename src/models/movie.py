@@ -12,6 +12,8 @@ class MovieSummaryAggregation(BaseModel):
     likes_count: int
     user_liked: bool
     watch_progress: WatchProgress
+    # Opaque position of the summary in its collection, never part of the response body.
+    cursor: Optional[str] = Field(default=None, exclude=True)
 
 
 class MovieDetailedAggregation(BaseModel):
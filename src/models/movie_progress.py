@@ -3,4 +3,4 @@ from pydantic import BaseModel
 
 class MovieProgress(BaseModel):
     id: str
-    break_point: int
+    break_point: float
@@ -5,6 +5,27 @@ from typing import Any, AsyncGenerator, Callable
 import aiohttp
 
 
+def create_pooled_session(
+    limit: int = 100,
+    limit_per_host: int = 30,
+    keepalive_timeout: float = 30,
+    dns_cache_ttl: int = 300,
+    request_timeout: float = 10,
+) -> aiohttp.ClientSession:
+    """Create a long-lived session with a keep-alive connection pool and cached DNS lookups."""
+    connector = aiohttp.TCPConnector(
+        limit=limit,
+        limit_per_host=limit_per_host,
+        keepalive_timeout=keepalive_timeout,
+        ttl_dns_cache=dns_cache_ttl,
+        use_dns_cache=True,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=request_timeout),
+    )
+
+
 @asynccontextmanager
 async def aiohttp_session() -> AsyncGenerator[aiohttp.ClientSession, None]:
     async with aiohttp.ClientSession() as session:
@@ -12,10 +33,18 @@ async def aiohttp_session() -> AsyncGenerator[aiohttp.ClientSession, None]:
 
 
 def with_aiohttp_session(func: Callable) -> Callable:
-    """HOC for session management"""
+    """
+    HOC for session management.
+
+    Uses the pooled session of the API client (`self.session`) when it is open,
+    otherwise falls back to a short-lived session for the single call.
+    """
 
     @wraps(func)
-    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+    async def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+        pooled_session = getattr(self, 'session', None)
+        if pooled_session is not None and not pooled_session.closed:
+            return await func(self, *args, session=pooled_session, **kwargs)
         async with aiohttp_session() as session:
-            return await func(*args, session=session, **kwargs)
+            return await func(self, *args, session=session, **kwargs)
     return wrapper
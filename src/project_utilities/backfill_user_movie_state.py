@@ -0,0 +1,95 @@
+"""
+Fill the user_movie_state read model from the likes, bookmarks and watch_progress collections.
+
+Every source is merged into user_movie_state on (user_id, movie_id), so the backfill is
+idempotent and can run while the handlers already maintain the read model. It only sets
+flags; stale flags are reported and repaired by check_user_movie_state.
+
+    python -m src.project_utilities.backfill_user_movie_state
+"""
+import asyncio
+import logging
+from contextlib import closing
+from typing import Any, Dict, List
+
+from motor.core import AgnosticClient, AgnosticDatabase
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from src.core.settings import settings
+from src.db_models.like import TargetType
+from src.db_models.user_movie_state import UserMovieStateModel
+
+logger = logging.getLogger(__name__)
+
+
+def build_backfill_pipeline(
+    match: Dict[str, Any],
+    movie_id_field: str,
+    changes: Dict[str, Any],
+) -> List[Dict[str, Any]]:
+    """Merge every source document into the state of its (user, movie), keeping the latest activity."""
+    return [
+        {'$match': match},
+        {
+            '$project': {
+                '_id': 0,
+                'user_id': 1,
+                'movie_id': '${field}'.format(field=movie_id_field),
+                'last_activity': {'$toDate': '$_id'},
+                **changes,
+            },
+        },
+        {
+            '$merge': {
+                'into': UserMovieStateModel.collection_name,
+                'on': ['user_id', 'movie_id'],
+                'whenMatched': [
+                    {
+                        '$set': {
+                            **{field: '$$new.{field}'.format(field=field) for field in changes},
+                            'last_activity': {'$max': ['$last_activity', '$$new.last_activity']},
+                        },
+                    },
+                ],
+                'whenNotMatched': 'insert',
+            },
+        },
+    ]
+
+
+BACKFILL_SOURCES = {
+    'likes': build_backfill_pipeline(
+        match={'target_type': TargetType.movie.value},
+        movie_id_field='target_id',
+        changes={'liked': {'$literal': True}},
+    ),
+    'bookmarks': build_backfill_pipeline(
+        match={},
+        movie_id_field='movie_id',
+        changes={'bookmarked': {'$literal': True}},
+    ),
+    'watch_progress': build_backfill_pipeline(
+        match={},
+        movie_id_field='movie_id',
+        changes={'watched': {'$literal': True}, 'progress': 1},
+    ),
+}
+
+
+async def backfill_user_movie_state(database: AgnosticDatabase) -> None:
+    # $merge on (user_id, movie_id) requires the unique index to exist.
+    await UserMovieStateModel(database).ensure_indexes()
+    for collection_name, pipeline in BACKFILL_SOURCES.items():
+        await database[collection_name].aggregate(pipeline).to_list(length=None)
+        logger.info('Merged %s into user_movie_state', collection_name)
+
+
+async def main() -> None:
+    client: AgnosticClient = AsyncIOMotorClient(settings.mongo_database_url)
+    with closing(client):
+        await backfill_user_movie_state(client[settings.mongo_database])
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,49 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Generic, Hashable, List, Set, TypeVar
+
+logger = logging.getLogger(__name__)
+
+RefreshKey = TypeVar('RefreshKey', bound=Hashable)
+
+Refresh = Callable[[List[RefreshKey]], Awaitable[object]]
+
+
+class BackgroundRefresher(Generic[RefreshKey]):
+    """
+    Runs refreshes of stale keys outside of the request, at most `concurrency` at a time.
+
+    A key is refreshed once however many requests saw it stale; when `max_pending`
+    keys are already queued, new refreshes are skipped until the queue drains.
+    """
+
+    def __init__(self, concurrency: int = 4, max_pending: int = 1000):
+        self.max_pending = max_pending
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._pending_keys: Set[RefreshKey] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def schedule(self, keys: List[RefreshKey], refresh: Refresh[RefreshKey]) -> None:
+        new_keys = [key for key in dict.fromkeys(keys) if key not in self._pending_keys]
+        free_slots = self.max_pending - len(self._pending_keys)
+        new_keys = new_keys[:max(free_slots, 0)]
+        if not new_keys:
+            return
+        self._pending_keys.update(new_keys)
+        task = asyncio.create_task(self._run(new_keys, refresh))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run(self, keys: List[RefreshKey], refresh: Refresh[RefreshKey]) -> None:
+        try:
+            async with self._semaphore:
+                await refresh(keys)
+        except Exception:
+            logger.warning('Background refresh of %s keys failed', len(keys), exc_info=True)
+        finally:
+            self._pending_keys.difference_update(keys)
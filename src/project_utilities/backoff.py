@@ -1,7 +1,8 @@
 import logging
 from typing import Callable, Type
 
-from tenacity import before_sleep_log, retry, wait_exponential
+from fastapi import HTTPException
+from tenacity import before_sleep_log, retry, retry_if_not_exception_type, wait_exponential
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -11,6 +12,8 @@ def backoff(wait_multiplier: int = 1, wait_minimum: int = 4, wait_maximum: int =
     """
     Wrap input function with exponential backoff retry logic.
 
+    HTTPException is a deliberate answer for the client, so it is raised without retries.
+
     Args:
         wait_multiplier (int): Multiplier for exponential backoff. Default is 1.
         wait_minimum (int): Minimum wait time for exponential backoff. Default is 4.
@@ -24,6 +27,7 @@ def backoff(wait_multiplier: int = 1, wait_minimum: int = 4, wait_maximum: int =
     def decorator(func: Callable) -> Callable:
         return retry(
             wait=wait_exponential(multiplier=wait_multiplier, min=wait_minimum, max=wait_maximum),
+            retry=retry_if_not_exception_type(HTTPException),
             before_sleep=before_sleep_log(logger, logging.INFO),
         )(func)
 
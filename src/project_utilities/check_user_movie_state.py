@@ -0,0 +1,144 @@
+"""
+Compare the user_movie_state read model with the likes, bookmarks and watch_progress collections.
+
+Reports states whose flags or progress disagree with the source collections and source
+documents without a state, and exits with 1 when any are found. With --fix, missing states
+are backfilled and disagreeing states are overwritten from the source collections.
+
+    python -m src.project_utilities.check_user_movie_state [--fix] [--samples 10]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from contextlib import closing
+from typing import Any, Dict, List
+
+from motor.core import AgnosticClient, AgnosticDatabase
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from src.core.settings import settings
+from src.db_models.like import TargetType
+from src.db_models.user_movie_state import UserMovieStateModel
+from src.project_utilities.backfill_user_movie_state import backfill_user_movie_state
+
+logger = logging.getLogger(__name__)
+
+SOURCE_MOVIE_ID_FIELDS = {'likes': 'target_id', 'bookmarks': 'movie_id', 'watch_progress': 'movie_id'}
+SOURCE_MATCHES: Dict[str, Dict[str, Any]] = {'likes': {'target_type': TargetType.movie.value}}
+
+Inconsistencies = List[Dict[str, Any]]
+
+
+def same_user_lookup(from_collection: str, local_field: str, foreign_field: str, output_field: str) -> Dict[str, Any]:
+    return {
+        '$lookup': {
+            'from': from_collection,
+            'localField': local_field,
+            'foreignField': foreign_field,
+            'let': {'user_id': '$user_id'},
+            'pipeline': [
+                {'$match': {**SOURCE_MATCHES.get(from_collection, {}), '$expr': {'$eq': ['$user_id', '$$user_id']}}},
+                {'$limit': 1},
+            ],
+            'as': output_field,
+        },
+    }
+
+
+def build_stale_states_pipeline() -> List[Dict[str, Any]]:
+    """States whose flags or progress differ from what the source collections say."""
+    return [
+        same_user_lookup('likes', 'movie_id', 'target_id', 'likes'),
+        same_user_lookup('bookmarks', 'movie_id', 'movie_id', 'bookmarks'),
+        same_user_lookup('watch_progress', 'movie_id', 'movie_id', 'watch_progress'),
+        {
+            '$project': {
+                'user_id': 1,
+                'movie_id': 1,
+                'expected': {
+                    'liked': {'$gt': [{'$size': '$likes'}, 0]},
+                    'bookmarked': {'$gt': [{'$size': '$bookmarks'}, 0]},
+                    'watched': {'$gt': [{'$size': '$watch_progress'}, 0]},
+                    'progress': {'$ifNull': [{'$first': '$watch_progress.progress'}, 0]},
+                },
+                'actual': {
+                    'liked': {'$ifNull': ['$liked', False]},
+                    'bookmarked': {'$ifNull': ['$bookmarked', False]},
+                    'watched': {'$ifNull': ['$watched', False]},
+                    'progress': {'$ifNull': ['$progress', 0]},
+                },
+            },
+        },
+        {'$match': {'$expr': {'$ne': ['$expected', '$actual']}}},
+    ]
+
+
+def build_missing_states_pipeline(source_collection: str) -> List[Dict[str, Any]]:
+    """Source documents that have no state for their (user, movie)."""
+    movie_id_field = SOURCE_MOVIE_ID_FIELDS[source_collection]
+    return [
+        {'$match': SOURCE_MATCHES.get(source_collection, {})},
+        same_user_lookup(UserMovieStateModel.collection_name, movie_id_field, 'movie_id', 'state'),
+        {'$match': {'state': {'$size': 0}}},
+        {'$project': {'_id': 0, 'user_id': 1, 'movie_id': '${field}'.format(field=movie_id_field)}},
+    ]
+
+
+async def find_missing_states(database: AgnosticDatabase) -> Dict[str, Inconsistencies]:
+    missing_states = {}
+    for source_collection in SOURCE_MOVIE_ID_FIELDS:
+        pipeline = build_missing_states_pipeline(source_collection)
+        cursor = database[source_collection].aggregate(pipeline)
+        missing_states[source_collection] = await cursor.to_list(length=None)
+    return missing_states
+
+
+async def find_stale_states(database: AgnosticDatabase) -> Inconsistencies:
+    state_collection = database[UserMovieStateModel.collection_name]
+    return await state_collection.aggregate(build_stale_states_pipeline()).to_list(length=None)
+
+
+async def repair_stale_states(database: AgnosticDatabase, stale_states: Inconsistencies) -> None:
+    state_collection = database[UserMovieStateModel.collection_name]
+    for stale_state in stale_states:
+        state_filter = {'_id': stale_state['_id']}
+        await state_collection.update_one(state_filter, {'$set': stale_state['expected']})
+
+
+def report(title: str, inconsistencies: Inconsistencies, samples: int) -> None:
+    logger.info('%s: %s', title, len(inconsistencies))
+    for inconsistency in inconsistencies[:samples]:
+        logger.info('    %s', inconsistency)
+
+
+async def check_user_movie_state(database: AgnosticDatabase, samples: int) -> bool:
+    """Report the inconsistencies, returns whether there are any."""
+    missing_states = await find_missing_states(database)
+    stale_states = await find_stale_states(database)
+    for source_collection, missing in missing_states.items():
+        report('{name} without state'.format(name=source_collection), missing, samples)
+    report('stale states', stale_states, samples)
+    return any(missing_states.values()) or bool(stale_states)
+
+
+async def main(fix: bool, samples: int) -> int:
+    client: AgnosticClient = AsyncIOMotorClient(settings.mongo_database_url)
+    database = client[settings.mongo_database]
+    with closing(client):
+        inconsistent = await check_user_movie_state(database, samples)
+        if inconsistent and fix:
+            await backfill_user_movie_state(database)
+            await repair_stale_states(database, await find_stale_states(database))
+            logger.info('Repaired')
+    return 1 if inconsistent else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fix', action='store_true', help='backfill missing states and overwrite stale ones')
+    parser.add_argument('--samples', type=int, default=10, help='inconsistencies to print per check')
+    arguments = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    exit_code = asyncio.run(main(fix=arguments.fix, samples=arguments.samples))
+    sys.exit(exit_code)
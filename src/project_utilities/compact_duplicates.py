@@ -0,0 +1,138 @@
+"""
+Remove duplicate likes and bookmarks left by the plain inserts, then make their indexes unique.
+
+Documents sharing the key of the model's unique index are grouped, the oldest one of each
+group is kept and the others are deleted in batches of --batch-size ids with a --pause
+between batches, so the job can run next to the live traffic. Once a collection has no
+duplicates left, its non-unique index is replaced by the unique one and new writes can no
+longer create duplicates. The movie_stats counters counted the duplicates too, rebuild them
+with --rebuild-stats.
+
+    python -m src.project_utilities.compact_duplicates [--batch-size 500] [--pause 0.1] [--dry-run] [--rebuild-stats]
+"""
+import argparse
+import asyncio
+import logging
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from motor.core import AgnosticClient, AgnosticDatabase
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel
+
+from src.core.settings import settings
+from src.db_models.bookmark import BookmarkModel
+from src.db_models.like import LikeModel
+from src.db_models.mongo_base_model import MongoBaseModel
+from src.project_utilities.rebuild_movie_stats import rebuild_movie_stats
+
+logger = logging.getLogger(__name__)
+
+COMPACTED_MODELS: Tuple[Type[MongoBaseModel], ...] = (LikeModel, BookmarkModel)
+DELETE_BATCH_SIZE = 500
+
+
+def get_unique_index(model: MongoBaseModel) -> IndexModel:
+    return next(index for index in model.indexes if index.document.get('unique'))
+
+
+def build_duplicates_pipeline(key_fields: List[str]) -> List[Dict[str, Any]]:
+    """Ids, oldest first, of the documents of every key that is stored more than once."""
+    return [
+        {'$sort': {'_id': 1}},
+        {
+            '$group': {
+                '_id': {key_field: '${field}'.format(field=key_field) for key_field in key_fields},
+                'ids': {'$push': '$_id'},
+                'count': {'$sum': 1},
+            },
+        },
+        {'$match': {'count': {'$gt': 1}}},
+        {'$project': {'_id': 0, 'ids': 1}},
+    ]
+
+
+async def compact_collection(
+    model: MongoBaseModel,
+    batch_size: int = 500,
+    pause: float = 0.1,
+    dry_run: bool = False,
+) -> int:
+    """Delete duplicates of the model's unique key, returns how many were found."""
+    key_fields = list(get_unique_index(model).document['key'])
+    cursor = model.collection.aggregate(build_duplicates_pipeline(key_fields), allowDiskUse=True)
+    duplicates_count = 0
+    batch: List[Any] = []
+    async for group in cursor:
+        batch.extend(group['ids'][1:])
+        while len(batch) >= batch_size:
+            duplicates_count += await delete_batch(model, batch[:batch_size], dry_run)
+            batch = batch[batch_size:]
+            await asyncio.sleep(pause)
+    if batch:
+        duplicates_count += await delete_batch(model, batch, dry_run)
+    return duplicates_count
+
+
+async def delete_batch(model: MongoBaseModel, duplicate_ids: List[Any], dry_run: bool) -> int:
+    if not dry_run:
+        await model.collection.delete_many({'_id': {'$in': duplicate_ids}})
+    return len(duplicate_ids)
+
+
+async def make_index_unique(model: MongoBaseModel) -> None:
+    """
+    Build the unique index next to the non-unique one it replaces, then drop the old one.
+
+    Queries keep an index on the key all along. The old index stays when the unique one
+    could not be built, for instance when new duplicates were written in the meantime.
+    """
+    if not await model.ensure_indexes():
+        logger.error('Kept the non-unique index of %s, run the job again', model.collection.name)
+
+
+async def compact_duplicates(
+    database: AgnosticDatabase,
+    batch_size: int = 500,
+    pause: float = 0.1,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    duplicates_counts = {}
+    for model_class in COMPACTED_MODELS:
+        model = model_class(database)  # type: ignore[call-arg]
+        duplicates_count = await compact_collection(model, batch_size=batch_size, pause=pause, dry_run=dry_run)
+        duplicates_counts[model.collection.name] = duplicates_count
+        if not dry_run:
+            await make_index_unique(model)
+    return duplicates_counts
+
+
+async def main(batch_size: int, pause: float, dry_run: bool, rebuild_stats: bool) -> None:
+    client: AgnosticClient = AsyncIOMotorClient(settings.mongo_database_url)
+    database = client[settings.mongo_database]
+    movies_count: Optional[int] = None
+    with closing(client):
+        duplicates_counts = await compact_duplicates(database, batch_size=batch_size, pause=pause, dry_run=dry_run)
+        if rebuild_stats and not dry_run:
+            movies_count = await rebuild_movie_stats(database)
+    verb = 'Found' if dry_run else 'Removed'
+    for collection_name, duplicates_count in duplicates_counts.items():
+        logger.info('%s %s duplicates in %s', verb, duplicates_count, collection_name)
+    if movies_count is not None:
+        logger.info('Rebuilt counters of %s movies', movies_count)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=DELETE_BATCH_SIZE, help='duplicate ids deleted per request')
+    parser.add_argument('--pause', type=float, default=0.1, help='seconds to wait between delete batches')
+    parser.add_argument('--dry-run', action='store_true', help='only count the duplicates')
+    parser.add_argument('--rebuild-stats', action='store_true', help='recompute movie_stats afterwards')
+    arguments = parser.parse_args()
+    asyncio.run(main(
+        batch_size=arguments.batch_size,
+        pause=arguments.pause,
+        dry_run=arguments.dry_run,
+        rebuild_stats=arguments.rebuild_stats,
+    ))
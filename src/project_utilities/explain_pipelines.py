@@ -0,0 +1,197 @@
+"""
+Run explain() on every collection page and movie detail query of the service and fail when one scans a whole collection.
+
+Execution stats are only meaningful when the queries match something, so on an empty
+database pass --seed: sample documents are inserted for the run and removed afterwards.
+
+    python -m src.project_utilities.explain_pipelines [--seed] [--ensure-indexes]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List
+
+from motor.core import AgnosticClient, AgnosticDatabase
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from src.auxiliary_services.data_aggregation import (
+    BookmarkSummaryAggregator,
+    LikesSummaryAggregator,
+    PageEnricher,
+    UserMovieStateSummaryAggregator,
+    WatchProgressSummaryAggregator,
+)
+from src.core.settings import settings
+from src.db_models.bookmark import BookmarkModel
+from src.db_models.indexes import ensure_indexes
+from src.db_models.like import LikeDocument, LikeModel, TargetType
+from src.db_models.movie_stats import MovieStatsModel
+from src.db_models.user_movie_state import UserMovieStateModel
+from src.db_models.watch_progress import WatchProgressModel
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_USER_ID = 'explain-pipelines-user'
+SAMPLE_MOVIE_ID = 'explain-pipelines-movie'
+SAMPLE_MARKER = {'explain_pipelines_sample': True}
+EXPLAIN_PAGE_LIMIT = 50
+# Flags the collection pages of user_movie_state are read by.
+USER_MOVIE_STATE_FLAGS = ('liked', 'bookmarked', 'watched')
+
+
+def find_collection_scans(explain_output: Any, path: str = '') -> List[str]:
+    """Paths of COLLSCAN plan stages and of $lookup stages that reported collection scans."""
+    if isinstance(explain_output, dict):
+        return find_stage_scans(explain_output, path)
+    scans = []
+    if isinstance(explain_output, list):
+        for index, nested_stage in enumerate(explain_output):
+            scans.extend(find_collection_scans(nested_stage, '{path}[{index}]'.format(path=path, index=index)))
+    return scans
+
+
+def find_stage_scans(stage: Dict[str, Any], path: str) -> List[str]:
+    scans = []
+    stage_path = path or '/'
+    if stage.get('stage') == 'COLLSCAN':
+        scans.append(stage_path)
+    if stage.get('collectionScans'):
+        scans.append('{path} ({count} collection scans)'.format(path=stage_path, count=stage['collectionScans']))
+    for key, nested in stage.items():
+        scans.extend(find_collection_scans(nested, '{path}/{key}'.format(path=path, key=key)))
+    return scans
+
+
+def collect_commands(database: AgnosticDatabase) -> Dict[str, Dict[str, Any]]:
+    """
+    Commands to explain: the first phase pipeline of every summary aggregator, the enrichment
+    queries and the point lookups of the movie details.
+    """
+    like_model = LikeModel(database)
+    bookmark_model = BookmarkModel(database)
+    watch_progress_model = WatchProgressModel(database)
+    movie_stats_model = MovieStatsModel(database)
+    user_movie_state_model = UserMovieStateModel(database)
+    enricher = PageEnricher(
+        movie_stats_model=movie_stats_model,
+        like_model=like_model,
+        watch_progress_model=watch_progress_model,
+    )
+    aggregators = {
+        'BookmarkSummaryAggregator': BookmarkSummaryAggregator(mongo_model=bookmark_model, enricher=enricher),
+        'LikesSummaryAggregator': LikesSummaryAggregator(mongo_model=like_model, enricher=enricher),
+        'WatchProgressSummaryAggregator': WatchProgressSummaryAggregator(
+            mongo_model=watch_progress_model, enricher=enricher,
+        ),
+    }
+    for state_flag in USER_MOVIE_STATE_FLAGS:
+        aggregators['UserMovieStateSummaryAggregator.{flag}'.format(flag=state_flag)] = (
+            UserMovieStateSummaryAggregator(
+                mongo_model=user_movie_state_model, enricher=enricher, state_flag=state_flag,
+            )
+        )
+    commands: Dict[str, Dict[str, Any]] = {
+        name: {
+            'aggregate': aggregator.mongo_model.collection.name,
+            'pipeline': aggregator.build_pipeline(user_id=SAMPLE_USER_ID, page_limit=EXPLAIN_PAGE_LIMIT),
+            'cursor': {},
+        }
+        for name, aggregator in aggregators.items()
+    }
+    enrichment_queries = enricher.build_queries(user_id=SAMPLE_USER_ID, movie_ids=[SAMPLE_MOVIE_ID])
+    for collection_name, query in enrichment_queries.items():
+        commands['PageEnricher.{name}'.format(name=collection_name)] = {'find': collection_name, 'filter': query}
+
+    sample_like = LikeDocument(user_id=SAMPLE_USER_ID, target_id=SAMPLE_MOVIE_ID, target_type=TargetType.movie)
+    detail_lookups = {
+        movie_stats_model.collection.name: movie_stats_model.stats_query(SAMPLE_MOVIE_ID),
+        like_model.collection.name: like_model.like_query(sample_like),
+        bookmark_model.collection.name: bookmark_model.bookmark_query(SAMPLE_USER_ID, SAMPLE_MOVIE_ID),
+        watch_progress_model.collection.name: watch_progress_model.progress_query(SAMPLE_USER_ID, SAMPLE_MOVIE_ID),
+    }
+    for lookup_collection, lookup_query in detail_lookups.items():
+        commands['MovieDetailedAggregator.{name}'.format(name=lookup_collection)] = {
+            'find': lookup_collection, 'filter': lookup_query, 'limit': 1,
+        }
+    return commands
+
+
+async def seed_samples(database: AgnosticDatabase) -> None:
+    await database['likes'].insert_one({
+        'user_id': SAMPLE_USER_ID,
+        'target_id': SAMPLE_MOVIE_ID,
+        'target_type': TargetType.movie.value,
+        **SAMPLE_MARKER,
+    })
+    await database['bookmarks'].insert_one({'user_id': SAMPLE_USER_ID, 'movie_id': SAMPLE_MOVIE_ID, **SAMPLE_MARKER})
+    await database[MovieStatsModel.collection_name].insert_one({
+        '_id': SAMPLE_MOVIE_ID,
+        'likes_count': 1,
+        'bookmarks_count': 1,
+        **SAMPLE_MARKER,
+    })
+    await database['watch_progress'].insert_one({
+        'user_id': SAMPLE_USER_ID,
+        'movie_id': SAMPLE_MOVIE_ID,
+        'progress': 1,
+        **SAMPLE_MARKER,
+    })
+    await database[UserMovieStateModel.collection_name].insert_one({
+        'user_id': SAMPLE_USER_ID,
+        'movie_id': SAMPLE_MOVIE_ID,
+        'liked': True,
+        'bookmarked': True,
+        'watched': True,
+        'progress': 1,
+        **SAMPLE_MARKER,
+    })
+
+
+async def remove_samples(database: AgnosticDatabase) -> None:
+    sampled_collections = (
+        'likes', 'bookmarks', 'watch_progress', MovieStatsModel.collection_name, UserMovieStateModel.collection_name,
+    )
+    for collection_name in sampled_collections:
+        await database[collection_name].delete_many(SAMPLE_MARKER)
+
+
+async def explain_pipelines(database: AgnosticDatabase) -> Dict[str, List[str]]:
+    scans_by_pipeline = {}
+    for name, command in collect_commands(database).items():
+        explain_output = await database.command('explain', command, verbosity='executionStats')
+        scans_by_pipeline[name] = find_collection_scans(explain_output)
+    return scans_by_pipeline
+
+
+async def main(seed: bool, create_indexes: bool) -> int:
+    client: AgnosticClient = AsyncIOMotorClient(settings.mongo_database_url)
+    database = client[settings.mongo_database]
+    async with AsyncExitStack() as cleanup:
+        cleanup.callback(client.close)
+        if create_indexes:
+            await ensure_indexes(database)
+        if seed:
+            await seed_samples(database)
+            cleanup.push_async_callback(remove_samples, database)
+        scans_by_pipeline = await explain_pipelines(database)
+
+    failed = False
+    for name, scans in scans_by_pipeline.items():
+        if scans:
+            failed = True
+            logger.error('FAIL %s: %s', name, '; '.join(scans))
+        else:
+            logger.info('OK   %s', name)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', action='store_true', help='insert sample documents for the run')
+    parser.add_argument('--ensure-indexes', action='store_true', help='create the declared indexes first')
+    arguments = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    exit_code = asyncio.run(main(seed=arguments.seed, create_indexes=arguments.ensure_indexes))
+    sys.exit(exit_code)
@@ -1,6 +1,7 @@
 import logging
+from contextlib import closing
 
-from kafka.admin import KafkaAdminClient, NewTopic  # type: ignore
+from kafka.admin import KafkaAdminClient, NewPartitions, NewTopic  # type: ignore
 
 
 def ensure_topic_exists(
@@ -9,17 +10,38 @@ def ensure_topic_exists(
     replication_factor: int = 1,
     bootstrap_servers: str = 'localhost:9092',
 ) -> None:
+    """
+    Create the topic, or grow an existing one to `num_partitions`.
+
+    Partitions can only be added: a topic with more partitions is left as it is. Adding partitions
+    moves keys to other partitions, so events of a user published before and after the change
+    are only ordered within each side of it. The replication factor only applies to new topics.
+    """
     admin_client = KafkaAdminClient(bootstrap_servers=bootstrap_servers)
+    with closing(admin_client):
+        existing_topics = admin_client.list_topics()
 
-    existing_topics = admin_client.list_topics()
+        if topic_name not in existing_topics:
+            topic = NewTopic(
+                name=topic_name,
+                num_partitions=num_partitions,
+                replication_factor=replication_factor,
+            )
+            admin_client.create_topics([topic])
+            logging.info('Topic {name} created with {count} partitions!'.format(name=topic_name, count=num_partitions))
+            return
 
-    if topic_name not in existing_topics:
-        topic = NewTopic(
-            name=topic_name,
-            num_partitions=num_partitions,
-            replication_factor=replication_factor,
-        )
-        admin_client.create_topics([topic])
-        logging.info('Topic {name} created!'.format(name=topic_name))
-    else:
-        logging.info('Topic {name} already exists!'.format(name=topic_name))
+        topic_description = admin_client.describe_topics([topic_name])[0]
+        partitions_count = len(topic_description['partitions'])
+        if partitions_count < num_partitions:
+            admin_client.create_partitions({topic_name: NewPartitions(total_count=num_partitions)})
+            logging.info('Topic {name} grown from {current} to {count} partitions!'.format(
+                name=topic_name,
+                current=partitions_count,
+                count=num_partitions,
+            ))
+        else:
+            logging.info('Topic {name} already exists with {count} partitions!'.format(
+                name=topic_name,
+                count=partitions_count,
+            ))
@@ -0,0 +1,15 @@
+from typing import List, Optional, Tuple
+
+EVENT_TYPE_HEADER = 'event_type'
+
+KafkaHeaders = List[Tuple[str, bytes]]
+
+
+def event_headers(event_type: Optional[str]) -> Optional[KafkaHeaders]:
+    """
+    Headers of an event. Events are keyed by user so a user's events stay ordered in one
+    partition, the header tells consumers what kind of event it is without decoding the value.
+    """
+    if event_type is None:
+        return None
+    return [(EVENT_TYPE_HEADER, event_type.encode())]
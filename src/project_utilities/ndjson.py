@@ -0,0 +1,26 @@
+from typing import AsyncIterator
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+CHUNK_KILOBYTES = 64
+CHUNK_SIZE = CHUNK_KILOBYTES * 1024
+
+
+async def ndjson_chunks(documents: AsyncIterator[BaseModel], chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """One JSON document per line, grouped into chunks of about `chunk_size` bytes."""
+    chunk = bytearray()
+    async for document in documents:
+        chunk.extend(document.model_dump_json().encode())
+        chunk.extend(b'\n')
+        if len(chunk) >= chunk_size:
+            yield bytes(chunk)
+            chunk.clear()
+    if chunk:
+        yield bytes(chunk)
+
+
+def ndjson_response(documents: AsyncIterator[BaseModel]) -> StreamingResponse:
+    """Stream the documents as they are read instead of collecting the whole result first."""
+    return StreamingResponse(ndjson_chunks(documents), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,39 @@
+import base64
+from typing import Optional, Sequence
+
+import orjson
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(last_id: ObjectId) -> str:
+    """Opaque token pointing right after the document with `last_id` in _id order."""
+    return base64.urlsafe_b64encode(last_id.binary).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor: str) -> ObjectId:
+    padding = '=' * (-len(cursor) % 4)
+    try:
+        return ObjectId(base64.urlsafe_b64decode(cursor + padding))
+    except (InvalidId, TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid cursor')
+
+
+def decode_optional_cursor(cursor: Optional[str]) -> Optional[ObjectId]:
+    return decode_cursor(cursor) if cursor else None
+
+
+def page_response(page: bytes, next_cursor: Optional[str]) -> Response:
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return Response(content=page, media_type='application/json', headers=headers)
+
+
+def documents_page_response(documents: Sequence[BaseModel], last_id: Optional[ObjectId]) -> Response:
+    """JSON array of the documents, with the cursor of the next page unless this one is the last."""
+    page = orjson.dumps([document.model_dump(mode='json') for document in documents])
+    return page_response(page, encode_cursor(last_id) if last_id is not None else None)
@@ -0,0 +1,98 @@
+"""
+Recompute the movie_stats counters from the raw likes and bookmarks collections.
+
+The counters are written with $out, which swaps the collection in one step, so readers
+never see half-rebuilt counters. Increments made while the rebuild runs are lost: run it
+when the UGC write traffic is low.
+
+Workers run it once on startup, when the migrations collection has no record of a rebuild,
+so counters start from the existing data. The $inc that keeps them up to date is only atomic
+with the like or bookmark write with mongo_transactions_enabled: without transactions a crash
+between the two writes leaves a counter off until the next rebuild.
+
+    python -m src.project_utilities.rebuild_movie_stats
+"""
+import asyncio
+import logging
+from contextlib import closing
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from motor.core import AgnosticClient, AgnosticDatabase
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError
+
+from src.core.settings import settings
+from src.db_models.like import TargetType
+from src.db_models.movie_stats import MovieStatsModel
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_COLLECTION = 'migrations'
+REBUILD_MIGRATION_ID = 'movie_stats_rebuild'
+
+
+def build_rebuild_pipeline() -> List[Dict[str, Any]]:
+    """Runs on the likes collection and counts bookmarks through $unionWith."""
+    return [
+        {'$match': {'target_type': TargetType.movie.value}},
+        {'$group': {'_id': '$target_id', 'likes_count': {'$sum': 1}, 'bookmarks_count': {'$sum': 0}}},
+        {
+            '$unionWith': {
+                'coll': 'bookmarks',
+                'pipeline': [
+                    {'$group': {'_id': '$movie_id', 'likes_count': {'$sum': 0}, 'bookmarks_count': {'$sum': 1}}},
+                ],
+            },
+        },
+        {
+            '$group': {
+                '_id': '$_id',
+                'likes_count': {'$sum': '$likes_count'},
+                'bookmarks_count': {'$sum': '$bookmarks_count'},
+            },
+        },
+        {'$out': MovieStatsModel.collection_name},
+    ]
+
+
+async def rebuild_movie_stats(database: AgnosticDatabase) -> int:
+    await database['likes'].aggregate(build_rebuild_pipeline()).to_list(length=None)
+    await database[MIGRATIONS_COLLECTION].update_one(
+        {'_id': REBUILD_MIGRATION_ID},
+        {'$set': {'finished_at': datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+    return await database[MovieStatsModel.collection_name].count_documents({})
+
+
+async def ensure_movie_stats(database: AgnosticDatabase) -> None:
+    """
+    Rebuild the counters unless a rebuild has been recorded, or claimed by another worker.
+
+    The claim is the insert of the migration record, so only one of the workers starting together runs it.
+    """
+    migrations = database[MIGRATIONS_COLLECTION]
+    try:
+        await migrations.insert_one({'_id': REBUILD_MIGRATION_ID, 'started_at': datetime.now(timezone.utc)})
+    except DuplicateKeyError:
+        return
+    try:
+        movies_count = await rebuild_movie_stats(database)
+    except Exception:
+        # Released, so the next worker to start tries again.
+        await migrations.delete_one({'_id': REBUILD_MIGRATION_ID})
+        raise
+    logger.info('Rebuilt counters of %s movies on startup', movies_count)
+
+
+async def main() -> None:
+    client: AgnosticClient = AsyncIOMotorClient(settings.mongo_database_url)
+    with closing(client):
+        movies_count = await rebuild_movie_stats(client[settings.mongo_database])
+    logger.info('Rebuilt counters of %s movies', movies_count)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
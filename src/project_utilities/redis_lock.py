@@ -0,0 +1,53 @@
+from typing import List, NamedTuple
+from uuid import uuid4
+
+from redis.asyncio import Redis
+
+RELEASE_OWNED_LOCKS = """
+local released = 0
+for index, key in ipairs(KEYS) do
+    if redis.call('get', key) == ARGV[1] then
+        released = released + redis.call('del', key)
+    end
+end
+return released
+"""
+
+
+class RedisLockOptions(NamedTuple):
+    ttl_ms: int = 3000
+    wait_timeout: float = 2
+    poll_interval: float = 0.05
+
+
+class RedisLock:
+    """
+    Short-lived locks shared by all workers, used to let only one of them load a key.
+
+    Locks expire on their own after `ttl_ms` of the `options`, so a crashed holder never blocks
+    the others for long.
+    """
+
+    def __init__(self, redis_client: Redis, key_prefix: str = 'lock:', options: RedisLockOptions = RedisLockOptions()):
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self.ttl_ms = options.ttl_ms
+        self.wait_timeout = options.wait_timeout
+        self.poll_interval = options.poll_interval
+        self._owner_token = uuid4().hex
+        self._release_script = redis_client.register_script(RELEASE_OWNED_LOCKS)
+
+    async def acquire_many(self, keys: List[str]) -> List[str]:
+        """Try to take the lock of every key in one round trip, return the keys now owned by this worker."""
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for lock_key in self._lock_keys(keys):
+                await pipe.set(lock_key, self._owner_token, nx=True, px=self.ttl_ms)
+            acquired = await pipe.execute()
+        return [key for key, is_acquired in zip(keys, acquired) if is_acquired]
+
+    async def release_many(self, keys: List[str]) -> None:
+        if keys:
+            await self._release_script(keys=self._lock_keys(keys), args=[self._owner_token])
+
+    def _lock_keys(self, keys: List[str]) -> List[str]:
+        return [self.key_prefix + key for key in keys]
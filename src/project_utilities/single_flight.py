@@ -0,0 +1,73 @@
+import asyncio
+from functools import partial
+from typing import Awaitable, Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+FlightKey = TypeVar('FlightKey', bound=Hashable)
+FlightResult = TypeVar('FlightResult')
+
+Flight = asyncio.Future[Optional[FlightResult]]
+Loaded = Dict[FlightKey, Optional[FlightResult]]
+Loader = Callable[[], Awaitable[Optional[FlightResult]]]
+BatchLoad = Awaitable[Loaded[FlightKey, FlightResult]]
+BatchLoader = Callable[[List[FlightKey]], BatchLoad[FlightKey, FlightResult]]
+Batch = asyncio.Future[Loaded[FlightKey, FlightResult]]
+
+
+async def pick_loaded(batch: Batch[FlightKey, FlightResult], key: FlightKey) -> Optional[FlightResult]:
+    loaded = await asyncio.shield(batch)
+    return loaded.get(key)
+
+
+class SingleFlight(Generic[FlightKey, FlightResult]):
+    """
+    Shares one in-flight load per key between all concurrent callers of a worker.
+
+    Loads run as separate tasks: a caller that gets cancelled does not cancel
+    the load the other callers are waiting for.
+    """
+
+    def __init__(self) -> None:
+        self._in_flight: Dict[FlightKey, Flight[FlightResult]] = {}
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    async def load(self, key: FlightKey, loader: Loader[FlightResult]) -> Optional[FlightResult]:
+        flight = self._in_flight.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(loader())
+            self._register(key, flight)
+        return await asyncio.shield(flight)
+
+    async def load_many(
+        self,
+        keys: List[FlightKey],
+        loader: BatchLoader[FlightKey, FlightResult],
+    ) -> Loaded[FlightKey, FlightResult]:
+        """Join the loads already in flight and start a single batched load for the remaining keys."""
+        flights: Dict[FlightKey, Flight[FlightResult]] = {}
+        own_keys = []
+        for key in dict.fromkeys(keys):
+            joined_flight = self._in_flight.get(key)
+            if joined_flight is None:
+                own_keys.append(key)
+            else:
+                flights[key] = joined_flight
+
+        if own_keys:
+            batch = asyncio.ensure_future(loader(own_keys))
+            for own_key in own_keys:
+                flights[own_key] = asyncio.ensure_future(pick_loaded(batch, own_key))
+                self._register(own_key, flights[own_key])
+
+        shielded_flights = [asyncio.shield(flight) for flight in flights.values()]
+        flight_results = await asyncio.gather(*shielded_flights)
+        return dict(zip(flights.keys(), flight_results))
+
+    def _register(self, key: FlightKey, flight: Flight[FlightResult]) -> None:
+        self._in_flight[key] = flight
+        flight.add_done_callback(partial(self._forget, key))
+
+    def _forget(self, key: FlightKey, flight: Flight[FlightResult]) -> None:
+        if self._in_flight.get(key) is flight:
+            self._in_flight.pop(key)
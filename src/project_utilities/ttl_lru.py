@@ -0,0 +1,72 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Callable, Generic, Hashable, Optional, Tuple, TypeVar
+
+CachedValue = TypeVar('CachedValue')
+
+
+class TtlLruCache(Generic[CachedValue]):
+    """
+    Bounded in-process LRU mapping whose entries also expire after their own TTL.
+
+    With `max_bytes` set, entries are additionally accounted by `sizeof`
+    and the least recently used ones are evicted to stay within the budget.
+    """
+
+    def __init__(
+        self,
+        max_items: int,
+        ttl: float,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = len,
+    ):
+        self.max_items = max_items
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.current_bytes = 0
+        self._entries: 'OrderedDict[Hashable, Tuple[float, CachedValue, int]]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[CachedValue]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, cached_value, _ = entry
+        if expires_at <= monotonic():
+            self.pop(key)
+            return None
+        self._entries.move_to_end(key)
+        return cached_value
+
+    def set(self, key: Hashable, cached_value: CachedValue, ttl: Optional[float] = None) -> None:
+        self.pop(key)
+        entry_size = 0
+        if self.max_bytes is not None:
+            entry_size = self.sizeof(cached_value)
+            if entry_size > self.max_bytes:
+                return
+        if ttl is None:
+            ttl = self.ttl
+        expires_at = monotonic() + ttl
+        self._entries[key] = (expires_at, cached_value, entry_size)
+        self.current_bytes += entry_size
+        while len(self._entries) > self.max_items or self._is_over_budget():
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+
+    def pop(self, key: Hashable) -> Any:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        self.current_bytes -= entry[2]
+        return entry[1]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def _is_over_budget(self) -> bool:
+        return self.max_bytes is not None and self.current_bytes > self.max_bytes
@@ -0,0 +1,166 @@
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException, status
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+
+from src.auxiliary_services.jwt_verifier import JwtVerifier, load_verification_keys
+from src.core.settings import settings
+from src.dependencies import auth
+from src.main import check_token_auth_middleware
+
+USER_ID = '2f384bd0-97a7-45e1-9f9f-da79affa8048'
+RSA_PUBLIC_EXPONENT = 65537
+RSA_KEY_SIZE = 2048
+
+
+def generate_key() -> rsa.RSAPrivateKey:
+    return rsa.generate_private_key(public_exponent=RSA_PUBLIC_EXPONENT, key_size=RSA_KEY_SIZE)
+
+
+def sign(private_key: rsa.RSAPrivateKey, key_id: str, expires_in: int = 60) -> str:
+    """Authorization header with a token for USER_ID signed by the key."""
+    expires_at = int(time.time()) + expires_in
+    claims = {'sub': USER_ID, 'email': 'user@example.com', 'exp': expires_at}
+    token = jwt.encode(claims, private_key, algorithm='RS256', headers={'kid': key_id})
+    return 'Bearer {token}'.format(token=token)
+
+
+def write_jwks(path: Path, keys: Dict[str, rsa.RSAPrivateKey]) -> str:
+    jwk_list: List[Dict[str, Any]] = []
+    for key_id, private_key in keys.items():
+        jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+        jwk.update({'kid': key_id, 'alg': 'RS256', 'use': 'sig'})
+        jwk_list.append(jwk)
+    path.write_text(json.dumps({'keys': jwk_list}))
+    return str(path)
+
+
+def rejection_status(verifier: JwtVerifier, authorization: str) -> Optional[int]:
+    try:
+        verifier.verify(authorization)
+    except HTTPException as exc:
+        return exc.status_code
+    return None
+
+
+def make_request(authorization: Optional[str]) -> Request:
+    headers = [] if authorization is None else [(b'authorization', authorization.encode())]
+    return Request({
+        'type': 'http',
+        'method': 'GET',
+        'path': '{api_path}/like'.format(api_path=settings.api_path),
+        'root_path': '',
+        'query_string': b'',
+        'headers': headers,
+    })
+
+
+async def call_next(request: Request) -> Response:
+    return PlainTextResponse(request.state.user.id)
+
+
+def run_middleware(authorization: Optional[str]) -> Response:
+    return asyncio.run(check_token_auth_middleware(make_request(authorization), call_next))
+
+
+@pytest.fixture
+def private_key() -> rsa.RSAPrivateKey:
+    return generate_key()
+
+
+@pytest.fixture
+def verifier(tmp_path: Path, private_key: rsa.RSAPrivateKey) -> JwtVerifier:
+    jwks_path = write_jwks(tmp_path / 'jwks.json', {'current': private_key})
+    return JwtVerifier(load_verification_keys(jwks_path=jwks_path))
+
+
+@pytest.fixture
+def jwt_auth(monkeypatch: pytest.MonkeyPatch, verifier: JwtVerifier) -> JwtVerifier:
+    monkeypatch.setattr(settings, 'auth_enabled', value=True)
+    monkeypatch.setattr(auth, 'jwt_verifier', verifier)
+    monkeypatch.setattr(auth, 'auth_validator', None)
+    monkeypatch.setattr(auth, 'auth_api', None)
+    return verifier
+
+
+def test_valid_token(verifier: JwtVerifier, private_key: rsa.RSAPrivateKey) -> None:
+    user = verifier.verify(sign(private_key, key_id='current'))
+
+    assert user.id == USER_ID
+    assert user.email == 'user@example.com'
+
+
+def test_expired_token(verifier: JwtVerifier, private_key: rsa.RSAPrivateKey) -> None:
+    authorization = sign(private_key, key_id='current', expires_in=-60)
+
+    assert rejection_status(verifier, authorization) == status.HTTP_401_UNAUTHORIZED
+
+
+def test_bad_signature(verifier: JwtVerifier) -> None:
+    authorization = sign(generate_key(), key_id='current')
+
+    assert rejection_status(verifier, authorization) == status.HTTP_401_UNAUTHORIZED
+
+
+def test_jwks_rotation(tmp_path: Path, private_key: rsa.RSAPrivateKey) -> None:
+    next_key = generate_key()
+    old_token = sign(private_key, key_id='current')
+    new_token = sign(next_key, key_id='next')
+    jwks_path = tmp_path / 'jwks.json'
+
+    # While both keys are published, tokens signed with either of them are accepted.
+    during_rotation = JwtVerifier(
+        load_verification_keys(jwks_path=write_jwks(jwks_path, {'current': private_key, 'next': next_key})),
+    )
+    assert during_rotation.verify(old_token).id == USER_ID
+    assert during_rotation.verify(new_token).id == USER_ID
+
+    after_rotation = JwtVerifier(load_verification_keys(jwks_path=write_jwks(jwks_path, {'next': next_key})))
+    assert after_rotation.verify(new_token).id == USER_ID
+    assert rejection_status(after_rotation, old_token) == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.usefixtures('jwt_auth')
+def test_middleware_valid_token(private_key: rsa.RSAPrivateKey) -> None:
+    response = run_middleware(sign(private_key, key_id='current'))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.body == USER_ID.encode()
+
+
+@pytest.mark.usefixtures('jwt_auth')
+def test_middleware_expired_token(private_key: rsa.RSAPrivateKey) -> None:
+    response = run_middleware(sign(private_key, key_id='current', expires_in=-60))
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert json.loads(response.body) == {'message': 'Authentication Failed'}
+
+
+@pytest.mark.usefixtures('jwt_auth')
+def test_middleware_bad_signature() -> None:
+    response = run_middleware(sign(generate_key(), key_id='current'))
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert json.loads(response.body) == {'message': 'Authentication Failed'}
+
+
+@pytest.mark.usefixtures('jwt_auth')
+def test_middleware_unknown_key_id(private_key: rsa.RSAPrivateKey) -> None:
+    response = run_middleware(sign(private_key, key_id='retired'))
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.usefixtures('jwt_auth')
+def test_middleware_missing_header() -> None:
+    response = run_middleware(None)
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED